@@ -1,5 +1,6 @@
 # add_speaker_profile.py
 from src.audio.diarizer import SpeakerDiarizer
+from src.audio.profile_store import DEFAULT_STORE_PATH, LEGACY_PROFILES_PATH, ProfileStore
 from pathlib import Path
 import logging
 from pydub import AudioSegment
@@ -23,6 +24,10 @@ def add_speaker_profile():
     # Initialize diarizer
     diarizer = SpeakerDiarizer(auth_token=auth_token)
     
+    # Enrollments are appended to the shared profile store
+    ProfileStore.open(DEFAULT_STORE_PATH, legacy_path=LEGACY_PROFILES_PATH)
+    diarizer.load_speaker_profiles(DEFAULT_STORE_PATH)
+    
     # Reference audio directory
     ref_dir = Path("data/reference_audio")
     ref_dir.mkdir(parents=True, exist_ok=True)
@@ -54,10 +59,6 @@ def add_speaker_profile():
         
         print(f"Adding profile for {speaker_name} from {wav_file}")
         diarizer.add_speaker_profile(speaker_name, wav_file)
-        
-        # Save profiles
-        profiles_file = Path("data/speaker_profiles.pkl")
-        diarizer.speaker_identifier.save_profiles(profiles_file)
         print("Profile added and saved successfully!")
         
     except Exception as e:
@@ -0,0 +1,71 @@
+# benchmarks/bench_alignment.py
+"""Micro-benchmark for transcript/speaker-turn alignment on synthetic data.
+
+Run from the project root:
+    python -m benchmarks.bench_alignment --turns 10000 --spans 10000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from src.audio.segments import SpeakerSegment, align_transcript
+
+
+def make_turns(count: int, rng: random.Random) -> List[SpeakerSegment]:
+    turns, t = [], 0.0
+    for _ in range(count):
+        length = rng.uniform(0.5, 8.0)
+        # Occasionally overlap the previous turn, like crosstalk in pyannote output
+        start = max(0.0, t - rng.uniform(0.0, 1.0)) if rng.random() < 0.1 else t
+        turns.append(SpeakerSegment(speaker=f"SPEAKER_{rng.randrange(8):02d}", start=start, end=start + length))
+        t = start + length + rng.uniform(0.0, 0.5)
+    return turns
+
+
+def make_spans(count: int, duration: float, rng: random.Random) -> List[Dict]:
+    step = duration / count
+    return [
+        {"text": f" span {i}", "start": i * step, "end": i * step + step * rng.uniform(0.8, 1.0)}
+        for i in range(count)
+    ]
+
+
+def legacy_align(segments: List[SpeakerSegment], spans: List[Dict]) -> List[SpeakerSegment]:
+    """The original all-pairs loop, kept for comparison."""
+    for span in spans:
+        for segment in segments:
+            if min(segment.end, span["end"]) - max(segment.start, span["start"]) > 0:
+                segment.text = span["text"] if segment.text is None else segment.text + " " + span["text"]
+    return [s for s in segments if s.text is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alignment micro-benchmark")
+    parser.add_argument("--turns", type=int, default=10000)
+    parser.add_argument("--spans", type=int, default=10000)
+    parser.add_argument("--legacy-limit", type=int, default=2000,
+                        help="Only time the quadratic loop up to this many turns/spans")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    turns = make_turns(args.turns, rng)
+    spans = make_spans(args.spans, turns[-1].end, rng)
+
+    start = time.perf_counter()
+    aligned = align_transcript(turns, spans)
+    elapsed = time.perf_counter() - start
+    print(f"sweep-line  {args.turns}x{args.spans}: {elapsed * 1000:8.1f} ms ({len(aligned)} turns with text)")
+
+    n = min(args.legacy_limit, args.turns, args.spans)
+    legacy_turns = make_turns(n, random.Random(args.seed))
+    legacy_spans = make_spans(n, legacy_turns[-1].end, random.Random(args.seed))
+    start = time.perf_counter()
+    legacy_align(legacy_turns, legacy_spans)
+    elapsed = time.perf_counter() - start
+    print(f"all-pairs   {n}x{n}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_db_writes.py
+"""Transcript insert throughput: one connection and commit per row against batched transactions.
+
+Run from the project root:
+    python -m benchmarks.bench_db_writes --rows 2000 --batch 100
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.database.transcript_db import TranscriptDatabase, TranscriptEntry
+
+
+def make_entries(count: int, segments: int):
+    for i in range(count):
+        segs = [{"speaker": f"SPEAKER_{j % 3:02d}", "start": float(j), "end": j + 1.0, "text": f"segment {j} of {i}"}
+                for j in range(segments)]
+        yield TranscriptEntry(f"rec_{i}.wav", datetime.now(), " ".join(s["text"] for s in segs), json.dumps(segs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript database write benchmark")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=40, help="Segments per transcript")
+    parser.add_argument("--batch", type=int, default=100, help="Transcripts per add_transcripts call")
+    args = parser.parse_args()
+
+    entries = list(make_entries(args.rows, args.segments))
+    with tempfile.TemporaryDirectory() as tmp:
+        # Previous behaviour: a fresh connection, rollback journal and commit per transcript
+        db = TranscriptDatabase(Path(tmp) / "legacy.db")
+        db.connections.connection().execute("PRAGMA journal_mode = DELETE")
+        db.connections.close()
+        start = time.perf_counter()
+        for entry in entries:
+            with sqlite3.connect(db.db_path) as conn:
+                conn.execute(
+                    "INSERT INTO transcripts (file_name, timestamp, full_text, speaker_segments, summary) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (entry.file_name, entry.timestamp.isoformat(), entry.full_text, entry.speaker_segments, None))
+        legacy = time.perf_counter() - start
+
+        db = TranscriptDatabase(Path(tmp) / "wal.db")
+        start = time.perf_counter()
+        for entry in entries:
+            db.add_transcript(entry)
+        single = time.perf_counter() - start
+
+        db = TranscriptDatabase(Path(tmp) / "batched.db")
+        start = time.perf_counter()
+        for i in range(0, len(entries), args.batch):
+            db.add_transcripts(entries[i:i + args.batch])
+        batched = time.perf_counter() - start
+
+    print(f"{'mode':>24} {'rows/s':>9}")
+    for name, seconds in [("connect + commit per row", legacy), ("WAL, commit per row", single),
+                          (f"WAL, {args.batch} rows per commit", batched)]:
+        print(f"{name:>24} {args.rows / seconds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
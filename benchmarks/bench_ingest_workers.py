@@ -0,0 +1,79 @@
+# benchmarks/bench_ingest_workers.py
+"""Ingest throughput as worker processes are added, with a CPU-bound stand-in for the models.
+
+Each job multiplies float32 matrices with BLAS, as the Whisper and pyannote
+forward passes do. Workers get an even share of the cores and are pinned to
+them, so files/hour should grow close to linearly up to the core count.
+
+Run from the project root:
+    python -m benchmarks.bench_ingest_workers --jobs 64 --workers 1 2 4 8
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.database.job_queue import JOB_DONE, JobQueue, worker_id
+from src.database.transcript_db import TranscriptDatabase
+from src.utils.threads import available_cores
+from src.utils.worker_pool import WorkerPool
+
+
+def fake_ingest(index, stop, wake, db_path, size, rounds):
+    """Worker target: 'load a model' once, then burn CPU on every claimed job."""
+    jobs = JobQueue(TranscriptDatabase(db_path))
+    owner = worker_id()
+    weights = np.random.default_rng(index).standard_normal((size, size), dtype=np.float32)
+    while not stop.is_set():
+        wake.clear()
+        job = jobs.claim(owner)
+        if job is None:
+            wake.wait(0.05)
+            continue
+        x = weights
+        for _ in range(rounds):
+            x = np.tanh(x @ weights / size)
+        jobs.complete(job, owner)
+
+
+def run(workers: int, jobs_count: int, size: int, rounds: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "jobs.db"
+        jobs = JobQueue(TranscriptDatabase(db_path))
+        for i in range(jobs_count):
+            jobs.enqueue(f"{i:064x}", f"{i}.wav")
+
+        pool = WorkerPool(fake_ingest, args=(db_path, size, rounds), workers=workers)
+        pool.start()
+        start = time.perf_counter()
+        pool.wake()
+        while jobs.stats()[JOB_DONE] < jobs_count:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        pool.stop()
+    return jobs_count * 3600.0 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process ingest throughput benchmark")
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--size", type=int, default=512, help="Matrix size of the stand-in model")
+    parser.add_argument("--rounds", type=int, default=20, help="Matrix products per job")
+    args = parser.parse_args()
+
+    print(f"{len(available_cores())} cores")
+    print(f"{'workers':>8} {'threads':>8} {'files/hour':>11} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        # Time includes each worker's start-up, as a real deployment pays it once
+        rate = run(workers, args.jobs, args.size, args.rounds)
+        baseline = baseline or rate
+        threads = max(1, len(available_cores()) // workers)
+        print(f"{workers:>8} {threads:>8} {rate:>11.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
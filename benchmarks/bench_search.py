@@ -0,0 +1,72 @@
+# benchmarks/bench_search.py
+"""Latency of LIKE scans against the FTS5 index for transcript and segment search.
+
+Run from the project root:
+    python -m benchmarks.bench_search --transcripts 1000 10000
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.database.transcript_db import TranscriptDatabase, fts_query
+
+WORDS = ("budget review release customer meeting schedule design report hiring launch "
+         "quarter roadmap feedback contract invoice travel vendor support training demo").split()
+
+
+def populate(db: TranscriptDatabase, count: int, segments: int, rng: np.random.Generator) -> None:
+    rows = []
+    for i in range(count):
+        segs = [{"speaker": f"SPEAKER_{j % 3:02d}", "start": float(j), "end": j + 1.0,
+                 "text": " ".join(rng.choice(WORDS, 12)) + f" token{i * segments + j}"}
+                for j in range(segments)]
+        rows.append((f"rec_{i}.wav", datetime.now().isoformat(), " ".join(s["text"] for s in segs), json.dumps(segs)))
+    with sqlite3.connect(db.db_path) as conn:
+        conn.executemany(
+            "INSERT INTO transcripts (file_name, timestamp, full_text, speaker_segments) VALUES (?, ?, ?, ?)", rows)
+
+
+def timed(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript search benchmark")
+    parser.add_argument("--transcripts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--segments", type=int, default=40, help="Segments per transcript")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'transcripts':>11} {'like ms':>8} {'fts ms':>7} {'seg like ms':>12} {'seg fts ms':>11}")
+    for count in args.transcripts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TranscriptDatabase(Path(tmp) / "bench.db")
+            populate(db, count, args.segments, rng)
+            # A rare term: FTS reads one posting list, LIKE scans every row
+            term = f"token{count * args.segments // 2}"
+            with sqlite3.connect(db.db_path) as conn:
+                like = timed(lambda: conn.execute(
+                    "SELECT id FROM transcripts WHERE full_text LIKE ? OR summary LIKE ?",
+                    (f"%{term}%", f"%{term}%")).fetchall(), args.repeats)
+                segment_like = timed(lambda: conn.execute(
+                    "SELECT t.id, s.key FROM transcripts AS t, json_each(t.speaker_segments) AS s "
+                    "WHERE json_extract(s.value, '$.text') LIKE ?", (f"%{term}%",)).fetchall(), args.repeats)
+                fts = timed(lambda: conn.execute(
+                    "SELECT rowid FROM transcripts_fts WHERE transcripts_fts MATCH ? ORDER BY rank",
+                    (fts_query(term),)).fetchall(), args.repeats)
+            segment_fts = timed(lambda: db.search_segments(term), args.repeats)
+            print(f"{count:>11} {like:>8.2f} {fts:>7.2f} {segment_like:>12.2f} {segment_fts:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
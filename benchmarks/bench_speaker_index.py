@@ -0,0 +1,82 @@
+# benchmarks/bench_speaker_index.py
+"""Recall and latency of IVF speaker matching against exact matching.
+
+Both sides are timed end to end on a batch of queries: brute force is the
+exact row top-k (argpartition), exact match scores every speaker with
+ProfileMatrix.match, and the IVF path is the index shortlist plus the exact
+rerank over its candidates (ProfileMatrix.match_candidates).
+
+Run from the project root:
+    python -m benchmarks.bench_speaker_index --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.audio.profiles import ProfileMatrix, normalize_rows
+from src.audio.speaker_index import SpeakerIndex
+
+
+def make_roster(size: int, dim: int, per_speaker: int, rng: np.random.Generator):
+    """Clustered synthetic embeddings: `per_speaker` noisy samples around each speaker."""
+    speakers = max(1, size // per_speaker)
+    centres = rng.normal(size=(speakers, dim))
+    owners = np.arange(size) % speakers
+    vectors = centres[owners] + 0.8 * rng.normal(size=(size, dim))
+    queries_owner = rng.integers(0, speakers, 200)
+    queries = centres[queries_owner] + 0.8 * rng.normal(size=(200, dim))
+    return normalize_rows(vectors), owners, normalize_rows(queries)
+
+
+def top_k_rows(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """Exact top-k rows per query, best first."""
+    similarities = queries @ vectors.T
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    return [rows[np.argsort(-row[rows])] for rows, row in zip(top, similarities)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speaker index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--per-speaker", type=int, default=10)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=None, help="Lists scanned per query (default: adaptive)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'lists':>6} {'train s':>8} {'brute ms/q':>11} {'exact ms/q':>11} "
+          f"{'ivf ms/q':>9} {'speaker@1':>10} {f'recall@{args.k}':>10}")
+    for size in args.sizes:
+        vectors, owners, queries = make_roster(size, args.dim, args.per_speaker, rng)
+        labels = [str(o) for o in owners]
+        matrix = ProfileMatrix([str(s) for s in range(owners.max() + 1)], owners, vectors, normalized=True)
+
+        start = time.perf_counter()
+        exact_rows = top_k_rows(vectors, queries, args.k)
+        brute_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        start = time.perf_counter()
+        exact = matrix.match(queries, threshold=-1.0)
+        exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        index = SpeakerIndex(args.dim, nprobe=args.nprobe)
+        index.add(vectors, labels)
+        start = time.perf_counter()
+        index.train()
+        train_s = time.perf_counter() - start
+
+        # Shortlist and exact rerank, as SpeakerIdentifier.match_batch runs them
+        start = time.perf_counter()
+        approximate = matrix.match_candidates(queries, index.candidate_labels(queries, args.k), threshold=-1.0)
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        speaker_1 = np.mean([a[0] == e[0] for a, e in zip(approximate, exact)])
+        searched = index.search(queries, args.k)
+        recall_k = np.mean([len(set(a[0]) & set(e)) / args.k for a, e in zip(searched, exact_rows)])
+        print(f"{size:>8} {len(index.centroids):>6} {train_s:>8.2f} {brute_ms:>11.3f} {exact_ms:>11.3f} "
+              f"{ivf_ms:>9.3f} {speaker_1:>10.3f} {recall_k:>10.3f}")
+
+if __name__ == "__main__":
+    main()
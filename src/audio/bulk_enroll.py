@@ -0,0 +1,171 @@
+# src/audio/bulk_enroll.py
+"""
+Enroll many reference clips into the speaker profile store in one run.
+
+    python -m src.audio.bulk_enroll data/reference_audio
+    python -m src.audio.bulk_enroll enrollment.csv --workers 8
+    python -m src.audio.bulk_enroll data/reference_audio --embedding-space pipeline
+
+A directory is read as <directory>/<speaker name>/<clip>. A CSV manifest has
+`path` and `name` columns; relative paths resolve against the manifest's
+folder. Only the speaker embedding model is loaded, clips already enrolled
+(by content hash) are skipped, and the store is written once at the end.
+Profiles are matched only within the embedding space they were enrolled in:
+use `--embedding-space pipeline` (which loads the diarization pipeline for its
+embedding model) for a diarizer with reuse_pipeline_embeddings.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import argparse
+import csv
+import logging
+import os
+import sys
+import numpy as np
+import torch
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.audio.diarizer import SpeakerDiarizer
+from src.audio.loader import file_sha256, load_audio, SAMPLE_RATE
+from src.audio.profile_store import DEFAULT_STORE_PATH, LEGACY_PROFILES_PATH, ProfileStore
+from src.audio.profiles import DEFAULT_EMBEDDING_SPACE
+from src.audio.speaker_identity import SpeakerIdentifier
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg"}
+
+logger = logging.getLogger(__name__)
+
+
+def collect_clips(source: Path) -> List[Tuple[Path, str]]:
+    """(clip path, speaker name) pairs from a speaker-per-folder directory or a CSV manifest."""
+    if source.is_dir():
+        return sorted(
+            (path, speaker_dir.name)
+            for speaker_dir in source.iterdir() if speaker_dir.is_dir()
+            for path in speaker_dir.iterdir() if path.suffix.lower() in AUDIO_EXTENSIONS
+        )
+    with open(source, newline="", encoding="utf-8") as f:
+        return [
+            ((source.parent / row["path"]).resolve(), row["name"].strip())
+            for row in csv.DictReader(f)
+        ]
+
+
+def _hash(path: Path) -> Optional[str]:
+    try:
+        return file_sha256(path)
+    except OSError as e:
+        logger.warning(f"Skipping {path}: {e}")
+        return None
+
+
+def _decode(path: Path) -> Optional[np.ndarray]:
+    """Decode one clip in a worker thread; ffmpeg runs outside the GIL."""
+    try:
+        return load_audio(path, SAMPLE_RATE)
+    except (FileNotFoundError, RuntimeError) as e:
+        logger.warning(f"Skipping {path}: {e}")
+        return None
+
+
+def enroll(
+    identifier: SpeakerIdentifier,
+    store: ProfileStore,
+    clips: List[Tuple[Path, str]],
+    workers: int = 4,
+    batch_size: int = 32
+) -> int:
+    """
+    Embed and enroll clips that are not in the store yet.
+
+    Clips are decoded `batch_size` at a time in a thread pool, one batch ahead
+    of the embedding model, and every batch is embedded with batched
+    inference. All new embeddings are appended to the store in one write.
+
+    Returns:
+        Number of clips enrolled
+    """
+    known = store.content_hashes(identifier.embedding_space)
+    with ThreadPoolExecutor(workers) as pool:
+        hashes = list(pool.map(_hash, [path for path, _ in clips]))
+
+        pending = []
+        for (path, name), content_hash in zip(clips, hashes):
+            if content_hash is None or content_hash in known:
+                logger.debug(f"Already enrolled: {path}")
+                continue
+            known.add(content_hash)  # Duplicate files within this run are enrolled once
+            pending.append((path, name, content_hash))
+        logger.info(f"Enrolling {len(pending)} of {len(clips)} clips")
+
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        names, embeddings, samples, extra = [], [], [], []
+        decoding = [pool.submit(_decode, path) for path, _, _ in batches[0]] if batches else []
+        for index, batch in enumerate(batches):
+            waveforms = [future.result() for future in decoding]
+            if index + 1 < len(batches):
+                decoding = [pool.submit(_decode, path) for path, _, _ in batches[index + 1]]
+
+            decoded = [(clip, waveform) for clip, waveform in zip(batch, waveforms) if waveform is not None]
+            vectors = identifier.embed_waveforms([waveform for _, waveform in decoded], batch_size)
+            for ((path, name, content_hash), _), vector in zip(decoded, vectors):
+                if np.isnan(vector).any():
+                    logger.warning(f"Skipping {path}: no usable speech")
+                    continue
+                names.append(name)
+                embeddings.append(vector)
+                samples.append(str(path))
+                extra.append({"hash": content_hash})
+            logger.info(f"Embedded {min((index + 1) * batch_size, len(pending))}/{len(pending)} clips")
+
+    if names:
+        store.append(names, np.stack(embeddings), samples, identifier.embedding_space, extra)
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk speaker enrollment')
+    parser.add_argument('source', type=Path,
+                        help='Directory of <speaker>/<clip> files or a CSV manifest with path,name columns')
+    parser.add_argument('--store', type=Path, default=DEFAULT_STORE_PATH,
+                        help=f'Profile store directory (default: {DEFAULT_STORE_PATH})')
+    parser.add_argument('--auth-token', default=os.environ.get('HF_TOKEN'),
+                        help='HuggingFace token (default: $HF_TOKEN)')
+    parser.add_argument('--device', default=None, help='Device for the embedding model')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help='Threads hashing and decoding clips')
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help='Clips decoded, and windows embedded, per batch')
+    parser.add_argument('--embedding-space', choices=[DEFAULT_EMBEDDING_SPACE, 'pipeline'],
+                        default=DEFAULT_EMBEDDING_SPACE,
+                        help="Model to enroll with: the standalone embedding model, or the diarization "
+                             "pipeline's own (for reuse_pipeline_embeddings)")
+
+    args = parser.parse_args()
+
+    clips = collect_clips(args.source)
+    if not clips:
+        print(f"No reference clips found in {args.source}")
+        sys.exit(1)
+
+    device = torch.device(args.device) if args.device else None
+    if args.embedding_space == 'pipeline':
+        identifier = SpeakerDiarizer(args.auth_token, device, reuse_pipeline_embeddings=True).speaker_identifier
+    else:
+        identifier = SpeakerIdentifier(args.auth_token, device)
+    logger.info(f"Enrolling in {identifier.embedding_space}")
+    store = ProfileStore.open(args.store, legacy_path=LEGACY_PROFILES_PATH)
+
+    enrolled = enroll(identifier, store, clips, args.workers, args.batch_size)
+    speakers = len({name for _, name in clips})
+    print(f"Enrolled {enrolled} new clips ({len(clips) - enrolled} skipped) for {speakers} speakers")
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -1,34 +1,66 @@
 # src/audio/diarizer.py
 import os
-from pyannote.audio import Pipeline
+from pyannote.audio import Audio, Pipeline
+from pyannote.core import Segment
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 import torch
 import logging
-from dataclasses import dataclass
 import numpy as np
-import soundfile as sf
+from .segments import SpeakerCluster, SpeakerSegment, align_transcript, format_transcript
 from .speaker_identity import SpeakerIdentifier
-from pydub import AudioSegment
-import tempfile
+from .loader import load_audio, SAMPLE_RATE
+
+# Formats pyannote's own loader reads with every torchaudio backend; others are decoded with ffmpeg
+PYANNOTE_FORMATS = {".wav", ".flac"}
 
 # Set environment Variable to disable symLinks
 os.environ["HF_HUB_DISABLE_SYMLINKS"] = "1"
 
 
-@dataclass
-class SpeakerSegment:
-    """Represents a segment of speech from a single speaker"""
-    speaker: str
-    start: float
-    end: float
-    text: Optional[str] = None
-    confidence: Optional[float] = None
-
-
 class SpeakerDiarizer:
-    def __init__(self, auth_token: str, device: Optional[torch.device] = None):
+    def __init__(
+        self,
+        auth_token: str,
+        device: Optional[torch.device] = None,
+        identification_mode: str = "cluster",
+        cluster_sample_seconds: float = 30.0,
+        turn_override_threshold: Optional[float] = None,
+        reuse_pipeline_embeddings: bool = False,
+        profile_mode: str = "exemplars",
+        adapt_threshold: Optional[float] = None,
+        use_index: bool = False,
+        index_min_embeddings: int = 2000,
+        index_top_k: int = 20
+    ):
+        """
+        Args:
+            auth_token: HuggingFace token for the pyannote models
+            device: Device to run the models on
+            identification_mode: "cluster" identifies each diarization cluster
+                once from a sample of its speech; "turn" identifies every turn
+            cluster_sample_seconds: Upper bound on the speech embedded per cluster
+            turn_override_threshold: In cluster mode, re-identify the turns of
+                clusters whose confidence is below this, one turn at a time
+            reuse_pipeline_embeddings: Match the per-cluster embeddings the
+                pipeline computes for clustering, and enroll profiles with the
+                pipeline's embedding model, instead of loading a second model
+            profile_mode: "exemplars" or "centroid"; see SpeakerIdentifier
+            adapt_threshold: In centroid mode, confidence at which production
+                identifications update the speaker's centroid
+            use_index: Shortlist candidate speakers with the approximate
+                nearest-neighbour index; see SpeakerIdentifier
+            index_min_embeddings: Enrolled embeddings below which the index is skipped
+            index_top_k: Nearest embeddings whose speakers are re-ranked exactly
+        """
         self.logger = logging.getLogger(__name__)
+        
+        if identification_mode not in ("cluster", "turn"):
+            raise ValueError(f"Unknown identification mode: {identification_mode}")
+        self.identification_mode = identification_mode
+        self.cluster_sample_seconds = cluster_sample_seconds
+        self.turn_override_threshold = turn_override_threshold
+        self.reuse_pipeline_embeddings = reuse_pipeline_embeddings
 
         if device is None:
             device = torch.device(
@@ -49,36 +81,30 @@ class SpeakerDiarizer:
                 cache_dir=cache_dir
             ).to(self.device)
 
-            self.speaker_identifier = SpeakerIdentifier(auth_token, device)
+            self.audio_reader = Audio(sample_rate=SAMPLE_RATE, mono="downmix")
+            identifier_options = dict(
+                profile_mode=profile_mode,
+                adapt_threshold=adapt_threshold,
+                use_index=use_index,
+                index_min_embeddings=index_min_embeddings,
+                index_top_k=index_top_k
+            )
+            if reuse_pipeline_embeddings:
+                self.speaker_identifier = SpeakerIdentifier(
+                    auth_token,
+                    device,
+                    embedding_model=self.pipeline._embedding,
+                    embedding_space=str(self.pipeline.embedding),
+                    window_seconds=self.pipeline._segmentation.duration,
+                    **identifier_options
+                )
+            else:
+                self.speaker_identifier = SpeakerIdentifier(auth_token, device, **identifier_options)
             self.logger.info("Diarization pipeline loaded successfully")
         except Exception as e:
             self.logger.error(f"Failed to load diarization pipeline: {str(e)}")
             raise
 
-    def _convert_to_wav(self, audio_path: Path) -> Path:
-        """Convert audio file to WAV format."""
-        try:
-            self.logger.info(f"Converting {audio_path} to WAV format...")
-
-            # Load Audio File
-            audio = AudioSegment.from_file(str(audio_path))
-            self.logger.info(
-                f"Successfully loaded audio file: {len(audio)}ms duration")
-
-            # Create temporary WAV file
-            temp_dir = Path("temp")
-            temp_dir.mkdir(exist_ok=True)
-            wav_path = temp_dir / f"{audio_path.stem}_temp.wav"
-
-            # Export as Wav
-            audio.export(wav_path, format="wav")
-            self.logger.info(f"Successfully exported to: {wav_path}")
-
-            return wav_path
-        except Exception as e:
-            self.logger.error(f"Audio conversion failed: {str(e)}")
-            raise
-
     def load_speaker_profiles(self, path: Path) -> None:
         """Load known speaker profiles."""
         self.speaker_identifier.load_profiles(path)
@@ -87,64 +113,245 @@ class SpeakerDiarizer:
         """Add a new speaker profile."""
         self.speaker_identifier.add_speaker(name, audio_path)
 
-    def diarize(self, audio_path: Path) -> List[SpeakerSegment]:
-        """Perform speaker diarization on an audio file."""
+    @staticmethod
+    def _waveform_file(audio: np.ndarray, sample_rate: int) -> Dict:
+        """Wrap a mono buffer in the in-memory file format pyannote expects."""
+        waveform = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+        return {"waveform": waveform.unsqueeze(0), "sample_rate": sample_rate}
+
+    @staticmethod
+    def _cluster_label(speaker: str) -> str:
+        """Normalise a pyannote label to the SPEAKER_xx form."""
+        speaker = str(speaker)
+        return speaker if speaker.startswith("SPEAKER_") else f"SPEAKER_{speaker.split('#')[-1]}"
+
+    def _turn_waveform(self, turn, audio, file: Dict, sample_rate: int) -> np.ndarray:
+        """Audio of one turn, as a view of the buffer or cropped from disk."""
+        if isinstance(audio, np.ndarray):
+            return audio[int(turn.start * sample_rate):int(turn.end * sample_rate)]
+        waveform, _ = self.audio_reader.crop(file, Segment(turn.start, turn.end))
+        return waveform[0].numpy()
+
+    def _identify_turns(self, tracks: List, indices, audio, file: Dict, sample_rate: int) -> List:
+        """Identify the given turns individually with batched inference."""
+        waveforms = [self._turn_waveform(tracks[i][0], audio, file, sample_rate) for i in indices]
+        return self.speaker_identifier.identify_speakers(waveforms)
+
+    def _cluster_embeddings(
+        self,
+        clusters: Dict[str, List[int]],
+        tracks: List,
+        audio,
+        file: Dict,
+        sample_rate: int,
+        centroids: Optional[Dict[str, np.ndarray]] = None
+    ) -> Dict[str, Optional[np.ndarray]]:
+        """
+        One embedding per diarization cluster.
+        
+        A cluster is represented by the mean of the normalised embeddings of its
+        longest turns, up to `cluster_sample_seconds` of speech, so embedding
+        work is bounded per speaker rather than growing with the number of turns.
+        When the pipeline's own `centroids` are given they are used directly and
+        no audio is embedded.
+        """
+        if centroids is not None:
+            return {label: centroids.get(label) for label in clusters}
+        return self._sample_cluster_embeddings(clusters, tracks, audio, file, sample_rate)
+
+    def _identify_clusters(
+        self,
+        tracks: List,
+        clusters: Dict[str, List[int]],
+        cluster_embeddings: Dict[str, Optional[np.ndarray]],
+        audio,
+        file: Dict,
+        sample_rate: int
+    ) -> List:
+        """Identify each diarization cluster once and apply the name to all of its turns."""
+        # Match every cluster in one batch
+        cluster_identities = {label: (None, 0.0) for label in clusters}
+        matchable = [
+            label for label, embedding in cluster_embeddings.items()
+            if embedding is not None and not np.isnan(embedding).any()
+        ]
+        if matchable:
+            matches = self.speaker_identifier.match_batch(
+                np.stack([cluster_embeddings[label] for label in matchable]))
+            for label, identity in zip(matchable, matches):
+                cluster_identities[label] = identity
+                self.logger.info(
+                    f"Cluster {self._cluster_label(label)} ({len(clusters[label])} turns): "
+                    f"{identity[0] or 'unknown'} ({identity[1]:.2%})")
+        
+        identities = [cluster_identities[label] for _, _, label in tracks]
+        
+        # Fall back to per-turn identification for weakly matched clusters
+        if self.turn_override_threshold is not None:
+            weak = [
+                i for i, (_, _, label) in enumerate(tracks)
+                if cluster_identities[label][1] < self.turn_override_threshold
+            ]
+            if weak:
+                self.logger.info(f"Re-identifying {len(weak)} turns from low-confidence clusters")
+                for i, (name, confidence) in zip(weak, self._identify_turns(tracks, weak, audio, file, sample_rate)):
+                    if name and confidence > identities[i][1]:
+                        identities[i] = (name, confidence)
+        
+        return identities
+
+    def _sample_cluster_embeddings(
+        self,
+        clusters: Dict[str, List[int]],
+        tracks: List,
+        audio,
+        file: Dict,
+        sample_rate: int
+    ) -> Dict[str, Optional[np.ndarray]]:
+        """Embed a bounded sample of each cluster's turns and average them per cluster."""
+        # Pick a bounded sample of each cluster's speech, longest turns first
+        samples: Dict[str, List[int]] = {}
+        for label, indices in clusters.items():
+            chosen, total = [], 0.0
+            for i in sorted(indices, key=lambda i: tracks[i][0].duration, reverse=True):
+                chosen.append(i)
+                total += tracks[i][0].duration
+                if total >= self.cluster_sample_seconds:
+                    break
+            samples[label] = chosen
+        
+        # One batched inference call covers every cluster
+        flat = [i for label in clusters for i in samples[label]]
+        embeddings = self.speaker_identifier.embed_waveforms(
+            [self._turn_waveform(tracks[i][0], audio, file, sample_rate) for i in flat])
+        
+        cluster_embeddings = {}
+        position = 0
+        for label in clusters:
+            turn_embeddings = embeddings[position:position + len(samples[label])]
+            position += len(samples[label])
+            
+            turn_embeddings = turn_embeddings[~np.isnan(turn_embeddings).any(axis=1)]
+            if len(turn_embeddings) == 0:
+                cluster_embeddings[label] = None
+                continue
+            norms = np.linalg.norm(turn_embeddings, axis=1, keepdims=True)
+            cluster_embeddings[label] = np.mean(turn_embeddings / np.maximum(norms, 1e-10), axis=0)
+        
+        return cluster_embeddings
+
+    def _summarise_clusters(
+        self,
+        segments: List[SpeakerSegment],
+        cluster_embeddings: Dict[str, Optional[np.ndarray]]
+    ) -> List[SpeakerCluster]:
+        """Per-cluster identity (the name covering most of its speech), embedding and turns."""
+        durations: Dict[str, Dict[str, float]] = {}
+        confidences: Dict[str, Dict[str, float]] = {}
+        turns: Dict[str, List[Tuple[float, float]]] = {}
+        for segment in segments:
+            turns.setdefault(segment.cluster, []).append((segment.start, segment.end))
+            names = durations.setdefault(segment.cluster, {})
+            names[segment.speaker] = names.get(segment.speaker, 0.0) + segment.end - segment.start
+            best = confidences.setdefault(segment.cluster, {})
+            best[segment.speaker] = max(best.get(segment.speaker, 0.0), segment.confidence or 0.0)
+        
+        embeddings = {self._cluster_label(label): e for label, e in cluster_embeddings.items()}
+        clusters = []
+        for label, names in durations.items():
+            speaker = max(names, key=names.get)
+            identified = speaker != label
+            clusters.append(SpeakerCluster(
+                label=label,
+                speaker=speaker if identified else None,
+                confidence=confidences[label][speaker] if identified else 0.0,
+                embedding=embeddings.get(label),
+                embedding_space=self.speaker_identifier.embedding_space,
+                turns=turns[label]
+            ))
+        return clusters
+
+    def diarize(
+        self,
+        audio: Union[Path, np.ndarray],
+        sample_rate: int = SAMPLE_RATE,
+        stream: bool = False,
+        return_clusters: bool = False
+    ) -> Union[List[SpeakerSegment], Tuple[List[SpeakerSegment], List[SpeakerCluster]]]:
+        """
+        Perform speaker diarization on an audio file or decoded buffer.
+
+        Args:
+            audio: Path to audio file, or a float32 mono array
+            sample_rate: Sample rate of `audio` when it is an array
+            stream: When `audio` is a WAV or FLAC path, let pyannote read the
+                file itself and crop each turn from disk instead of decoding it
+                up front. Other formats are decoded to float32 with ffmpeg
+            return_clusters: Also return one SpeakerCluster per diarization
+                cluster with its embedding, even when no profiles are loaded
+
+        Returns:
+            List of speaker segments, and the clusters if `return_clusters`
+        """
+        source = "in-memory audio" if isinstance(audio, np.ndarray) else str(audio)
         try:
-            self.logger.info(f"Starting diarization for: {audio_path}")
+            self.logger.info(f"Starting diarization for: {source}")
         
-            # Convert to WAV if needed
-            if audio_path.suffix.lower() != '.wav':
-                self.logger.info("Converting audio to WAV format...")
-                wav_path = self._convert_to_wav(audio_path)
-                self.logger.info(f"Audio converted: {wav_path}")
+            if isinstance(audio, np.ndarray):
+                file = self._waveform_file(audio, sample_rate)
+            elif stream and Path(audio).suffix.lower() in PYANNOTE_FORMATS:
+                file = {"audio": str(audio)}
             else:
-                wav_path = audio_path
+                # Decode once if we were given a path
+                audio = load_audio(audio, SAMPLE_RATE)
+                sample_rate = SAMPLE_RATE
+                file = self._waveform_file(audio, sample_rate)
         
-            # Run diarization
-            diarization = self.pipeline(str(wav_path))
+            # Run diarization, keeping the pipeline's cluster embeddings if we reuse them
+            centroids = None
+            if self.reuse_pipeline_embeddings:
+                diarization, embeddings = self.pipeline(file, return_embeddings=True)
+                if embeddings is not None:
+                    centroids = dict(zip(diarization.labels(), embeddings))
+            else:
+                diarization = self.pipeline(file)
         
-            # Load audio for speaker identification
-            audio, sample_rate = sf.read(str(wav_path))
+            tracks = list(diarization.itertracks(yield_label=True))
+            clusters: Dict[str, List[int]] = {}
+            for i, (_, _, label) in enumerate(tracks):
+                clusters.setdefault(label, []).append(i)
+            
+            identities = [(None, 0.0)] * len(tracks)
+            cluster_embeddings: Dict[str, Optional[np.ndarray]] = {}
+            has_profiles = bool(self.speaker_identifier.speakers)
+            try:
+                if return_clusters or (has_profiles and self.identification_mode == "cluster"):
+                    cluster_embeddings = self._cluster_embeddings(
+                        clusters, tracks, audio, file, sample_rate, centroids)
+                if has_profiles and self.identification_mode == "cluster":
+                    identities = self._identify_clusters(
+                        tracks, clusters, cluster_embeddings, audio, file, sample_rate)
+                elif has_profiles:
+                    identities = self._identify_turns(tracks, range(len(tracks)), audio, file, sample_rate)
+            except Exception as e:
+                self.logger.warning(f"Speaker identification failed: {e}")
         
             # Convert results to speaker segments
             segments = []
-            for turn, _, speaker in diarization.itertracks(yield_label=True):
-                # Extract audio segment
-                start_sample = int(turn.start * sample_rate)
-                end_sample = int(turn.end * sample_rate)
-                segment_audio = audio[start_sample:end_sample]
-            
-                # Try to identify the speaker
-                identified_name = None
-                confidence = 0.0
-            
-                if hasattr(self, 'speaker_identifier'):
-                    try:
-                        identified_name, confidence = self.speaker_identifier.identify_speaker(
-                            segment_audio, sample_rate)
-                        if identified_name:
-                            self.logger.info(f"Identified speaker {identified_name} with confidence {confidence:.2%}")
-                    except Exception as e:
-                        self.logger.warning(f"Speaker identification failed for segment: {e}")
-
+            for (turn, _, speaker), (identified_name, confidence) in zip(tracks, identities):
                 # Use identified name or default speaker label
-                speaker_label = identified_name if identified_name else f"SPEAKER_{speaker.split('#')[-1]}"
+                cluster = self._cluster_label(speaker)
+                speaker_label = identified_name if identified_name else cluster
             
                 segment = SpeakerSegment(
                     speaker=speaker_label,
                     start=turn.start,
                     end=turn.end,
-                    confidence=confidence
+                    confidence=confidence,
+                    cluster=cluster
                 )
                 segments.append(segment)
         
-            # Clean up temporary file
-            if audio_path.suffix.lower() != '.wav':
-                try:
-                    wav_path.unlink()
-                except:
-                    pass
-        
             # Log statistics
             num_speakers = len(set(s.speaker for s in segments))
             identified_segments = [s for s in segments if not s.speaker.startswith("SPEAKER_")]
@@ -154,10 +361,12 @@ class SpeakerDiarizer:
                 avg_confidence = sum(s.confidence for s in identified_segments) / len(identified_segments)
                 self.logger.info(f"Successfully identified {len(identified_segments)} segments "f"with average confidence {avg_confidence:.2%}")
         
+            if return_clusters:
+                return segments, self._summarise_clusters(segments, cluster_embeddings)
             return segments
         
         except Exception as e:
-            self.logger.error(f"Diarization failed for {audio_path}: {str(e)}")
+            self.logger.error(f"Diarization failed for {source}: {str(e)}")
             raise
 
     def identify_speaker(self, audio_segment: np.ndarray) -> tuple[Optional[str], float]:
@@ -167,7 +376,7 @@ class SpeakerDiarizer:
             return None, 0.0
         
         try:
-            identified_name, confidence = self.speaker_identifier.identify_speaker(segment_audio)
+            identified_name, confidence = self.speaker_identifier.identify_speaker(audio_segment)
             if identified_name:
                 self.logger.debug(f"Identified speaker: {identified_name} (confidence: {confidence:.2%})")
             return identified_name, confidence
@@ -178,42 +387,18 @@ class SpeakerDiarizer:
     def assign_transcription_to_segments(
         self,
         segments: List[SpeakerSegment],
-        transcription_segments: List[Dict]
+        transcription_segments: List[Dict],
+        split_words: bool = False
     ) -> List[SpeakerSegment]:
         """
         Assign transcribed text to speaker segments based on timestamp overlap.
+        
+        Each transcript segment goes to the speaker turn with the largest
+        overlap (see `align_transcript`). With `split_words`, word timestamps
+        are used to split segments that span a speaker change.
         """
-        for trans_seg in transcription_segments:
-            trans_start = trans_seg["start"]
-            trans_end = trans_seg["end"]
-            trans_text = trans_seg["text"]
-
-            # Find overlapping speaker segments
-            for segment in segments:
-                # Check for significant overlap
-                overlap_start = max(segment.start, trans_start)
-                overlap_end = min(segment.end, trans_end)
-                overlap = overlap_end - overlap_start
-
-                if overlap > 0:
-                    # If segment has no text, assign it
-                    if segment.text is None:
-                        segment.text = trans_text
-                    # If segment already has text, append new text
-                    else:
-                        segment.text += " " + trans_text
-
-        # Remove segments without text
-        segments = [s for s in segments if s.text is not None]
-
-        return segments
+        return align_transcript(segments, transcription_segments, split_words)
 
     def format_transcript(self, segments: List[SpeakerSegment]) -> str:
         """Format speaker segments into a readable transcript."""
-        transcript = []
-        for segment in segments:
-            timestamp = f"[{segment.start:.1f}s - {segment.end:.1f}s]"
-            confidence_str = f"({segment.confidence:.1%})" if segment.confidence > 0 else "(Unknown)"
-            transcript.append(
-                f"{segment.speaker} {confidence_str} {timestamp}: {segment.text}")
-        return "\n".join(transcript)
+        return format_transcript(segments)
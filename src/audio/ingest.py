@@ -0,0 +1,140 @@
+# src/audio/ingest.py
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+import logging
+from .processor import AudioProcessor, PIPELINE_VERSION
+from ..database.transcript_db import FILE_DONE, FILE_FAILED, TranscriptDatabase, TranscriptEntry, file_name_for, transcript_path_for
+from ..database.job_queue import Job, JobQueue, LeaseLost, worker_id
+
+
+def segment_to_dict(segment) -> Dict:
+    """Convert SpeakerSegment to dictionary"""
+    return {
+        'speaker': segment.speaker,
+        'start': segment.start,
+        'end': segment.end,
+        'text': segment.text,
+        'confidence': segment.confidence,
+        'cluster': segment.cluster
+    }
+
+
+class IngestWorker:
+    """
+    Claims jobs from the queue and runs them through its own AudioProcessor.
+
+    Every worker process has one, so the models are loaded once per process
+    and jobs are spread over the processes by their leases: each claim hands
+    the next job to exactly one worker.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        watch_dir: Path,
+        output_dir: Path,
+        auth_token: str,
+        processor_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            db_path: Database holding the job queue and transcripts
+            watch_dir: Watched directory; recordings are named by their path relative to it
+            output_dir: Directory for formatted transcripts, mirroring the watched subdirectories
+            auth_token: HuggingFace token for the diarization models
+            processor_options: Extra AudioProcessor arguments
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db = TranscriptDatabase(db_path)
+        self.jobs = JobQueue(self.db)
+        self.owner = worker_id()
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.processor = AudioProcessor(auth_token=auth_token, **(processor_options or {}))
+
+    def run(self, stop, wake, poll_interval: float = 5.0) -> None:
+        """
+        Process jobs until `stop` is set.
+
+        Args:
+            stop: Event set when the worker should exit (after its current job)
+            wake: Event set when new jobs may be ready
+            poll_interval: Seconds between checks for jobs that became ready
+                (retries after backoff, expired leases)
+        """
+        self.logger.info(f"Ingest worker {self.owner} ready")
+        while not stop.is_set():
+            wake.clear()
+            job = self.jobs.claim(self.owner)
+            if job is None:
+                wake.wait(poll_interval)
+                continue
+            self.ingest(job)
+        self.processor.close()
+        self.db.connections.close()
+
+    def save_transcript(self, file_path: Path, result: Dict) -> Path:
+        """Write the formatted transcript of a processed file to the output directory."""
+        transcript_path = transcript_path_for(self.output_dir, file_name_for(file_path, self.watch_dir))
+        transcript_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write(result["formatted_transcript"])
+        self.logger.info(f"Processed and saved transcript: {transcript_path}")
+        return transcript_path
+
+    def ingest(self, job: Job) -> None:
+        """Run the pipeline for a job, resuming from its checkpoints, and store the result"""
+        file_path = Path(job.path)
+        if job.checkpoints:
+            self.logger.info(f"Resuming file: {file_path} (attempt {job.attempts}, after {job.stage})")
+        else:
+            self.logger.info(f"Processing file: {file_path} (attempt {job.attempts})")
+
+        with self.jobs.keep_alive(job, self.owner):
+            try:
+                result = self.processor.process_audio(
+                    file_path, language="en",
+                    checkpoint=partial(self.jobs.checkpoint, job, self.owner),
+                    resume=job.checkpoints
+                )
+                self.save_transcript(file_path, result)
+
+                # Convert speaker segments to JSON-serializable format
+                serializable_segments = [segment_to_dict(segment) for segment in result["speaker_segments"]]
+                entry = TranscriptEntry(
+                    file_name=file_name_for(file_path, self.watch_dir),
+                    timestamp=datetime.now(),
+                    full_text=result["full_transcript"],
+                    speaker_segments=json.dumps(serializable_segments),
+                )
+                # Transcript, segments, clusters, file status and job completion commit together
+                with self.db.connections.transaction():
+                    transcript_id = self.db.add_transcript(entry)
+                    self.db.add_speaker_clusters(transcript_id, result["speaker_clusters"])
+                    self.db.set_file_status(job.content_hash, FILE_DONE, PIPELINE_VERSION, transcript_id)
+                    self.jobs.complete(job, self.owner)
+            except LeaseLost as e:
+                self.logger.warning(f"Abandoning {file_path}: {e}")
+            except Exception as e:
+                self.logger.error(f"Failed to process {file_path}: {e}")
+                if not self.jobs.fail(job, self.owner, str(e)):
+                    self.db.set_file_status(job.content_hash, FILE_FAILED, PIPELINE_VERSION, error=str(e))
+
+
+def run_ingest_worker(
+    index: int,
+    stop,
+    wake,
+    db_path: Path,
+    watch_dir: Path,
+    output_dir: Path,
+    auth_token: str,
+    poll_interval: float = 5.0,
+    processor_options: Optional[Dict[str, Any]] = None
+) -> None:
+    """WorkerPool target: load the models once, then process jobs until stopped."""
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [ingest-{index}] %(name)s: %(message)s")
+    IngestWorker(db_path, watch_dir, output_dir, auth_token, processor_options).run(stop, wake, poll_interval)
@@ -0,0 +1,171 @@
+# src/audio/loader.py
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+import hashlib
+import subprocess
+import wave
+import numpy as np
+
+# Whisper and pyannote both operate on 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+
+def _ffmpeg_command(audio_path: Path, sample_rate: int) -> list:
+    """Build an ffmpeg command that decodes to raw 16-bit mono PCM on stdout."""
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel", "error",
+        "-threads", "0",
+        "-i", str(audio_path),
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-"
+    ]
+
+
+def load_audio(audio_path: Union[str, Path], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an audio file once into a float32 mono array.
+
+    Args:
+        audio_path: Path to any audio file ffmpeg can read
+        sample_rate: Target sample rate
+
+    Returns:
+        Float32 array in [-1, 1] resampled to `sample_rate`
+    """
+    audio_path = Path(audio_path)
+    if not audio_path.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    try:
+        output = subprocess.run(
+            _ffmpeg_command(audio_path, sample_rate),
+            capture_output=True,
+            check=True
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+
+    return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+
+
+def probe_duration(audio_path: Union[str, Path], timeout: float = 10.0) -> Optional[float]:
+    """
+    Duration in seconds from the container metadata, without decoding.
+
+    PCM WAV headers are read directly; anything else goes through ffprobe.
+
+    Returns:
+        None if the duration cannot be determined
+    """
+    audio_path = Path(audio_path)
+    if audio_path.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(audio_path), "rb") as f:
+                return f.getnframes() / f.getframerate()
+        except (wave.Error, EOFError, OSError):
+            pass  # Not plain PCM (e.g. float or extensible WAV); ask ffprobe
+
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(audio_path)],
+            capture_output=True,
+            check=True,
+            timeout=timeout
+        ).stdout
+        return float(output.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_exact(stream: BinaryIO, num_bytes: int) -> bytes:
+    """Read up to `num_bytes` from a pipe, stopping early only at EOF."""
+    chunks = []
+    remaining = num_bytes
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def stream_audio(
+    audio_path: Union[str, Path],
+    window_seconds: float = 300.0,
+    overlap_seconds: float = 5.0,
+    sample_rate: int = SAMPLE_RATE
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Decode an audio file incrementally in fixed, overlapping windows.
+
+    Only one window is held in memory at a time, so peak memory does not
+    depend on the length of the recording.
+
+    Args:
+        audio_path: Path to any audio file ffmpeg can read
+        window_seconds: Length of each window
+        overlap_seconds: Overlap between consecutive windows
+        sample_rate: Target sample rate
+
+    Yields:
+        (offset in seconds, float32 window) tuples
+    """
+    audio_path = Path(audio_path)
+    if not audio_path.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    if overlap_seconds >= window_seconds:
+        raise ValueError("overlap_seconds must be smaller than window_seconds")
+
+    window = int(window_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    hop = window - overlap
+
+    process = subprocess.Popen(
+        _ffmpeg_command(audio_path, sample_rate),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        buffer = np.zeros(0, dtype=np.float32)
+        offset = 0
+        while True:
+            needed = window - len(buffer)
+            raw = _read_exact(process.stdout, needed * 2)
+            chunk = np.frombuffer(raw[:len(raw) - len(raw) % 2], np.int16).astype(np.float32) / 32768.0
+            buffer = np.concatenate([buffer, chunk])
+            at_end = len(raw) < needed * 2
+
+            # The tail of the last window may already be covered by the overlap
+            if len(buffer) > 0 and (offset == 0 or len(buffer) > overlap):
+                yield offset / sample_rate, buffer
+            if at_end:
+                break
+
+            buffer = buffer[hop:].copy()
+            offset += hop
+
+        process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"Failed to decode audio: {process.stderr.read().decode(errors='ignore')}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
@@ -0,0 +1,135 @@
+# src/audio/parallel.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import logging
+import multiprocessing
+import numpy as np
+import torch
+from .transcriber import AudioPreprocessor, WhisperTranscriber
+from .loader import SAMPLE_RATE
+from ..utils.threads import available_cores
+
+# Each worker process keeps its own preloaded model between chunks
+_worker_transcriber: Optional[WhisperTranscriber] = None
+
+
+def _init_worker(model_name: str, device: str, num_threads: int) -> None:
+    """Load the Whisper model once per worker process."""
+    global _worker_transcriber
+    torch.set_num_threads(num_threads)
+    _worker_transcriber = WhisperTranscriber(model_name, device)
+
+
+def _transcribe_chunk(
+    audio: np.ndarray,
+    offset: float,
+    language: Optional[str],
+    preprocess: bool,
+    options: Dict
+) -> Dict:
+    """Transcribe one chunk in a worker and move its segments to file time."""
+    result = _worker_transcriber.transcribe(
+        audio,
+        language=language,
+        preprocess=preprocess,
+        **options
+    )
+    result["segments"] = [
+        WhisperTranscriber._shift_segment(segment, offset)
+        for segment in result["segments"]
+    ]
+    return result
+
+
+def merge_transcriptions(results: List[Dict]) -> Dict:
+    """Merge per-chunk Whisper results, in order, into one result."""
+    segments = []
+    for result in results:
+        segments.extend(result["segments"])
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+
+    languages = [r.get("language") for r in results if r.get("language")]
+    return {
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": languages[0] if languages else None
+    }
+
+
+class ParallelTranscriber:
+    def __init__(
+        self,
+        model_name: str = "large",
+        num_workers: Optional[int] = None,
+        device: str = "cpu"
+    ):
+        """
+        Transcribe a single recording across a pool of worker processes.
+
+        Args:
+            model_name: Whisper model size loaded by every worker
+            num_workers: Number of worker processes (defaults to a quarter of the usable cores)
+            device: Device the workers run on
+        """
+        self.logger = logging.getLogger(__name__)
+
+        # Workers inherit this process's affinity, so share only the cores it may use
+        cores = len(available_cores())
+        self.num_workers = num_workers or max(1, cores // 4)
+        threads_per_worker = max(1, cores // self.num_workers)
+
+        self.logger.info(
+            f"Starting {self.num_workers} transcription workers "
+            f"with {threads_per_worker} threads each")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, str(device), threads_per_worker)
+        )
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        preprocess: bool = True,
+        chunk_seconds: float = 300.0,
+        **kwargs
+    ) -> Dict:
+        """
+        Split a decoded recording at silences and transcribe the chunks in parallel.
+
+        Args:
+            audio: Float32 16 kHz mono array
+            language: Optional language code
+            preprocess: Whether workers preprocess their chunk
+            chunk_seconds: Target chunk length; cuts snap to the nearest silence
+            **kwargs: Additional arguments to pass to whisper.transcribe
+
+        Returns:
+            Dictionary with the same {"text", "segments"} shape as `WhisperTranscriber.transcribe`
+        """
+        cuts = AudioPreprocessor.find_split_points(audio, SAMPLE_RATE, chunk_seconds)
+        self.logger.info(f"Transcribing {len(cuts) - 1} chunks across {self.num_workers} workers")
+
+        # Interleaved progress output from several workers is unreadable
+        options = {"verbose": None}
+        options.update(kwargs)
+
+        futures = [
+            self.executor.submit(
+                _transcribe_chunk,
+                audio[start:end],
+                start / SAMPLE_RATE,
+                language,
+                preprocess,
+                options
+            )
+            for start, end in zip(cuts[:-1], cuts[1:])
+        ]
+        return merge_transcriptions([future.result() for future in futures])
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        self.executor.shutdown(wait=True)
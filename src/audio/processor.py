@@ -1,19 +1,79 @@
 # src/audio/processor.py
 from pathlib import Path
-from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import json
 import logging
+import numpy as np
 import torch
-from .transcriber import WhisperTranscriber
+from .transcriber import AudioPreprocessor, WhisperTranscriber
 from .diarizer import SpeakerDiarizer
+from .loader import load_audio, SAMPLE_RATE
+from .parallel import ParallelTranscriber
+from .profile_store import DEFAULT_STORE_PATH, LEGACY_PROFILES_PATH, ProfileStore
+from .segments import SpeakerCluster, SpeakerSegment, format_transcript
+from ..utils.threads import available_cores
+
+# Recorded with every processed file; bump when output for the same audio would change
+PIPELINE_VERSION = "1"
+
+def _json_default(value):
+    """Encode numpy scalars and arrays found in stage results."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot checkpoint {type(value).__name__}")
+
+
+def _encode_clusters(clusters: List[SpeakerCluster]) -> List[Dict]:
+    return [dict(asdict(c), embedding=None if c.embedding is None else np.asarray(c.embedding).tolist())
+            for c in clusters]
+
+
+def _decode_clusters(data: List[Dict]) -> List[SpeakerCluster]:
+    return [SpeakerCluster(**dict(c, embedding=None if c["embedding"] is None
+                                  else np.asarray(c["embedding"], dtype=np.float32),
+                                  turns=[tuple(turn) for turn in c["turns"]]))
+            for c in data]
+
 
 class AudioProcessor:
+    """
+    Transcription and diarization pipeline with its models loaded once.
+
+    With `concurrent_stages`, processing sets torch's process-wide intra-op
+    thread count, so only one AudioProcessor may run per process at a time.
+    Run several in separate processes (see WorkerPool) to process files in
+    parallel.
+    """
+
     def __init__(
         self,
         auth_token: str,
         whisper_model: str = "large",
-        device: Optional[Union[str, torch.device]] = None
+        device: Optional[Union[str, torch.device]] = None,
+        parallel_workers: Optional[int] = None,
+        concurrent_stages: bool = True,
+        stage_threads: Optional[int] = None,
+        reuse_pipeline_embeddings: bool = False,
+        profile_mode: str = "exemplars",
+        adapt_threshold: Optional[float] = None,
+        use_index: bool = False,
+        index_min_embeddings: int = 2000,
+        index_top_k: int = 20
     ):
         self.logger = logging.getLogger(__name__)
+        self.whisper_model = whisper_model
+        self.parallel_workers = parallel_workers
+        
+        # Transcription and diarization run side by side, each limited to
+        # `stage_threads` intra-op threads (half the cores this process may use by default)
+        self.concurrent_stages = concurrent_stages
+        self.stage_threads = stage_threads or max(1, len(available_cores()) // 2)
+        self.parallel_transcriber: Optional[ParallelTranscriber] = None
         
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -25,18 +85,75 @@ class AudioProcessor:
         
         # Initialize components
         self.transcriber = WhisperTranscriber(whisper_model, device)
-        self.diarizer = SpeakerDiarizer(auth_token, device)
+        self.diarizer = SpeakerDiarizer(
+            auth_token,
+            device,
+            reuse_pipeline_embeddings=reuse_pipeline_embeddings,
+            profile_mode=profile_mode,
+            adapt_threshold=adapt_threshold,
+            use_index=use_index,
+            index_min_embeddings=index_min_embeddings,
+            index_top_k=index_top_k
+        )
+        
+        # Load speaker profiles, migrating the legacy pickle on first run
+        ProfileStore.open(DEFAULT_STORE_PATH, legacy_path=LEGACY_PROFILES_PATH)
+        self.diarizer.load_speaker_profiles(DEFAULT_STORE_PATH)
+        self.logger.info(f"Loaded {len(self.diarizer.speaker_identifier.speakers)} speaker profiles")
+
+    def _get_parallel_transcriber(self) -> ParallelTranscriber:
+        """Start the transcription worker pool on first use."""
+        if self.parallel_transcriber is None:
+            self.parallel_transcriber = ParallelTranscriber(
+                self.whisper_model,
+                num_workers=self.parallel_workers,
+                device=str(self.device)
+            )
+        return self.parallel_transcriber
+
+    def close(self) -> None:
+        """Write pending speaker adaptation and release worker processes held by the processor."""
+        self.diarizer.speaker_identifier.flush_centroids()
+        if self.parallel_transcriber is not None:
+            self.parallel_transcriber.close()
+            self.parallel_transcriber = None
+
+    def _run_stages(
+        self,
+        transcribe: Callable[[], Dict],
+        diarize: Callable[[], List]
+    ) -> Tuple[Dict, List]:
+        """Run transcription and diarization, concurrently when enabled."""
+        if not self.concurrent_stages:
+            self.logger.info("Starting transcription...")
+            transcription = transcribe()
+            self.logger.info("Starting speaker diarization...")
+            return transcription, diarize()
         
-        # Load any existing speaker profiles
-        profiles_path = Path("data/speaker_profiles.pkl")
-        if profiles_path.exists():
-            self.diarizer.load_speaker_profiles(profiles_path)
-            self.logger.info("Loaded existing speaker profiles")
+        # torch's intra-op pool is per process, and each calling thread gets a
+        # team of this size, so two stages together stay within the core count
+        previous_threads = torch.get_num_threads()
+        torch.set_num_threads(self.stage_threads)
+        try:
+            self.logger.info(
+                f"Starting transcription and speaker diarization concurrently "
+                f"({self.stage_threads} threads each)...")
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="stage") as executor:
+                transcription = executor.submit(transcribe)
+                speaker_segments = executor.submit(diarize)
+                return transcription.result(), speaker_segments.result()
+        finally:
+            torch.set_num_threads(previous_threads)
 
     def process_audio(
         self,
         audio_path: Union[str, Path],
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        stream: bool = False,
+        parallel: bool = False,
+        vad: bool = False,
+        checkpoint: Optional[Callable[[str, Any], None]] = None,
+        resume: Optional[Dict[str, Any]] = None
     ) -> Dict:
         """
         Process audio file with transcription and speaker diarization.
@@ -44,24 +161,126 @@ class AudioProcessor:
         Args:
             audio_path: Path to audio file
             language: Optional language code
+            stream: Transcribe in fixed overlapping windows so memory stays
+                bounded on multi-hour recordings
+            parallel: Split the recording at silences and transcribe the
+                chunks in a pool of worker processes
+            vad: Skip non-speech before transcription and diarization;
+                timestamps are still reported in original file time. Needs
+                the decoded recording, so it cannot be combined with `stream`
+            checkpoint: Called as checkpoint(stage, state) after the decode,
+                transcribe, diarize and merge stages; the state is JSON-serialisable
+            resume: Stage states saved by an earlier, interrupted attempt.
+                Completed stages are not run again, and decoding is skipped
+                when neither model stage needs the audio
             
         Returns:
-            Dictionary containing processed results
+            Dictionary containing processed results. `speaker_clusters` holds
+            one embedding per diarization cluster, and `speech_ratio` is the
+            fraction of the file detected as speech when `vad` is enabled.
+
+        Raises:
+            ValueError: If both `stream` and `vad` are set
         """
+        if stream and vad:
+            raise ValueError("vad needs the whole decoded recording and cannot be combined with stream")
+        speech_map = None
+        speech_ratio = None
+        resume = resume or {}
+        
+        def save(stage: str, state: Any) -> None:
+            if checkpoint is not None:
+                checkpoint(stage, json.loads(json.dumps(state, default=_json_default)))
+        
+        def stage(name: str, run: Callable, encode: Callable, decode: Callable) -> Callable:
+            """Wrap a stage so it is restored from `resume` or checkpointed after running."""
+            def wrapped():
+                if name in resume:
+                    self.logger.info(f"Resuming {Path(audio_path).name} after the {name} stage")
+                    return decode(resume[name])
+                result = run()
+                save(name, encode(result))
+                return result
+            return wrapped
+        
         try:
-            # Step 1: Transcribe audio
-            self.logger.info("Starting transcription...")
-            transcription = self.transcriber.transcribe(
-                audio_path,
-                language=language,
-                preprocess=True
+            if "merge" in resume:
+                # Everything but storing the result was done by an earlier attempt
+                merged = resume["merge"]
+                labeled_segments = [SpeakerSegment(**segment) for segment in merged["speaker_segments"]]
+                return {
+                    "full_transcript": merged["full_transcript"],
+                    "speaker_segments": labeled_segments,
+                    "formatted_transcript": format_transcript(labeled_segments),
+                    "speaker_clusters": _decode_clusters(merged["speaker_clusters"]),
+                    "speech_ratio": merged["speech_ratio"]
+                }
+            
+            if stream:
+                # Decode and transcribe window by window; pyannote reads the file lazily
+                transcribe = partial(
+                    self.transcriber.transcribe_stream,
+                    audio_path,
+                    language=language,
+                    preprocess=True
+                )
+                diarize = partial(self.diarizer.diarize, Path(audio_path), stream=True, return_clusters=True)
+            elif not vad and "transcribe" in resume and "diarize" in resume:
+                # Both model stages are restored, so the audio is not needed
+                transcribe = diarize = None
+            else:
+                # Step 1: Decode once into a shared 16 kHz mono buffer
+                self.logger.info(f"Decoding audio: {audio_path}")
+                audio = load_audio(audio_path, SAMPLE_RATE)
+                
+                # Optionally keep only the speech regions
+                if vad:
+                    speech_map = AudioPreprocessor.build_speech_map(audio, SAMPLE_RATE)
+                    speech_ratio = speech_map.speech_ratio
+                    self.logger.info(
+                        f"Speech ratio for {Path(audio_path).name}: {speech_ratio:.1%} "
+                        f"({speech_map.speech_duration:.1f}s of {speech_map.duration:.1f}s)")
+                    audio = speech_map.compact(audio)
+                
+                transcriber = self._get_parallel_transcriber() if parallel else self.transcriber
+                transcribe = partial(
+                    transcriber.transcribe,
+                    audio,
+                    language=language,
+                    preprocess=True
+                )
+                diarize = partial(self.diarizer.diarize, audio, SAMPLE_RATE, return_clusters=True)
+                save("decode", {"duration": len(audio) / SAMPLE_RATE, "speech_ratio": speech_ratio})
+            
+            # Model stages report speech-only time with VAD; they are checkpointed before remapping
+            transcribe = stage("transcribe", transcribe, lambda t: t, lambda t: t)
+            diarize = stage(
+                "diarize", diarize,
+                lambda result: {"segments": [asdict(s) for s in result[0]], "clusters": _encode_clusters(result[1])},
+                lambda state: ([SpeakerSegment(**s) for s in state["segments"]], _decode_clusters(state["clusters"]))
             )
             
-            # Step 2: Perform speaker diarization
-            self.logger.info("Starting speaker diarization...")
-            speaker_segments = self.diarizer.diarize(audio_path)
+            if speech_map is not None and speech_map.speech_duration == 0:
+                self.logger.info("No speech detected, skipping transcription and diarization")
+                transcription = {"text": "", "segments": []}
+                speaker_segments, speaker_clusters = [], []
+            else:
+                # Steps 2-3: Transcription and speaker diarization
+                transcription, (speaker_segments, speaker_clusters) = self._run_stages(transcribe, diarize)
             
-            # Step 3: Combine results
+            # Map speech-only timestamps back to file time
+            if speech_map is not None:
+                speech_map.remap_transcription(transcription)
+                for segment in speaker_segments:
+                    segment.start = float(speech_map.to_original(segment.start))
+                    segment.end = float(speech_map.to_original(segment.end, end=True))
+                for cluster in speaker_clusters:
+                    cluster.turns = [
+                        (float(speech_map.to_original(start)), float(speech_map.to_original(end, end=True)))
+                        for start, end in cluster.turns
+                    ]
+            
+            # Step 4: Combine results
             self.logger.info("Combining transcription with speaker segments...")
             transcript_segments = self.transcriber.get_segments(transcription)
             labeled_segments = self.diarizer.assign_transcription_to_segments(
@@ -69,13 +288,22 @@ class AudioProcessor:
                 transcript_segments
             )
             
+            save("merge", {
+                "full_transcript": transcription["text"],
+                "speaker_segments": [asdict(segment) for segment in labeled_segments],
+                "speaker_clusters": _encode_clusters(speaker_clusters),
+                "speech_ratio": speech_ratio
+            })
+            
             # Format results
             formatted_transcript = self.diarizer.format_transcript(labeled_segments)
             
             return {
                 "full_transcript": transcription["text"],
                 "speaker_segments": labeled_segments,
-                "formatted_transcript": formatted_transcript
+                "formatted_transcript": formatted_transcript,
+                "speaker_clusters": speaker_clusters,
+                "speech_ratio": speech_ratio
             }
             
         except Exception as e:
@@ -0,0 +1,329 @@
+# src/audio/profile_store.py
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import json
+import logging
+import os
+import pickle
+import numpy as np
+from filelock import FileLock
+from .profiles import DEFAULT_EMBEDDING_SPACE, ProfileMatrix, SpeakerProfile, embedding_vector, normalize_rows
+
+DEFAULT_STORE_PATH = Path("data/speaker_store")
+LEGACY_PROFILES_PATH = Path("data/speaker_profiles.pkl")
+
+
+class ProfileStore:
+    """
+    Append-only, memory-mapped speaker embedding store.
+
+    Layout of the store directory:
+        manifest.json   version, dimension, committed row count and byte sizes,
+                        a generation counter for the rows and a separate
+                        version of the centroids; replaced atomically
+        embeddings.f32  L2-normalised float32 rows, appended in place
+        index.jsonl     one metadata line (name, sample, space, ...) per row
+        centroids.npz   optional running centroids per speaker; replaced atomically
+        store.lock      inter-process lock held by writers
+
+    Writers append under the lock and only then publish the new row count in
+    the manifest, so readers never see a torn row. Readers map the embedding
+    file instead of loading it and reload when the generation changes; a
+    centroid update only makes them re-read centroids.npz.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_STORE_PATH):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.path / "manifest.json"
+        self.embeddings_path = self.path / "embeddings.f32"
+        self.index_path = self.path / "index.jsonl"
+        self.centroids_path = self.path / "centroids.npz"
+        self.lock = FileLock(str(self.path / "store.lock"))
+
+        self.dim = 0
+        self.generation = -1
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.records: List[Dict] = []
+        self.centroids: Dict[str, Dict] = {}
+        self.centroids_version = 0
+        self._manifest_stat = None
+        self._rows: Optional[Dict[str, Tuple[str, List[int]]]] = None  # speaker_rows() of this generation
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _read_manifest(self) -> Dict:
+        if not self.manifest_path.exists():
+            return {"version": self.VERSION, "dim": 0, "count": 0,
+                    "embeddings_bytes": 0, "index_bytes": 0, "generation": 0}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.VERSION:
+            raise ValueError(f"Unsupported profile store version: {manifest.get('version')}")
+        return manifest
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        temp_path = self.manifest_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.manifest_path)
+
+    def _read_centroids(self) -> Dict[str, Dict]:
+        if not self.centroids_path.exists():
+            return {}
+        with np.load(self.centroids_path) as data:
+            return {
+                str(name): {"space": str(space), "centroid": centroid, "count": int(count), "rows": int(rows)}
+                for name, space, centroid, count, rows in zip(
+                    data["names"], data["spaces"], data["centroids"], data["counts"], data["rows"])
+            }
+
+    def refresh(self) -> bool:
+        """
+        Pick up rows appended by other processes.
+
+        Cheap when nothing changed: only the manifest is stat-ed.
+
+        Returns:
+            True if the store was reloaded
+        """
+        try:
+            stat = self.manifest_path.stat()
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        if stat_key == self._manifest_stat and self.generation >= 0:
+            return False
+
+        manifest = self._read_manifest()
+        self._manifest_stat = stat_key
+        if manifest["generation"] == self.generation:
+            if manifest.get("centroids_version", 0) == self.centroids_version:
+                return False
+            self.centroids = self._read_centroids()
+            self.centroids_version = manifest.get("centroids_version", 0)
+            return True
+
+        count, dim = manifest["count"], manifest["dim"]
+        if count:
+            # Rows past `count` belong to an append that has not been published yet
+            self.embeddings = np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(count, dim))
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.records = [json.loads(line) for line, _ in zip(f, range(count))]
+        else:
+            self.embeddings = np.zeros((0, dim), dtype=np.float32)
+            self.records = []
+        self.centroids = self._read_centroids()
+        self.centroids_version = manifest.get("centroids_version", 0)
+        self._rows = None
+
+        self.dim = dim
+        self.generation = manifest["generation"]
+        self.logger.debug(f"Loaded profile store generation {self.generation} ({count} embeddings)")
+        return True
+
+    def append(
+        self,
+        names: List[str],
+        embeddings: np.ndarray,
+        samples: Optional[List[Optional[str]]] = None,
+        embedding_space: str = DEFAULT_EMBEDDING_SPACE,
+        extra: Optional[List[Dict]] = None
+    ) -> None:
+        """
+        Atomically append embeddings and their metadata.
+
+        Args:
+            names: Speaker name for each row
+            embeddings: (rows, dimension) array; stored L2-normalised
+            samples: Reference audio path for each row (None if unknown)
+            embedding_space: Model that produced the embeddings
+            extra: Additional metadata to store with each row
+        """
+        embeddings = normalize_rows(np.atleast_2d(embeddings))
+        samples = samples or [""] * len(names)
+        extra = extra or [{}] * len(names)
+        if not len(names):
+            return
+
+        with self.lock:
+            manifest = self._read_manifest()
+            if manifest["dim"] and manifest["dim"] != embeddings.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {embeddings.shape[1]} does not match store dimension {manifest['dim']}")
+
+            lines = "".join(
+                json.dumps({"name": name, "sample": "" if sample is None else str(sample), "space": embedding_space, **info}) + "\n"
+                for name, sample, info in zip(names, samples, extra)
+            ).encode("utf-8")
+
+            # Anything past the committed sizes is a torn write from a crashed writer
+            for path, committed, data in (
+                (self.embeddings_path, manifest["embeddings_bytes"], embeddings.tobytes()),
+                (self.index_path, manifest["index_bytes"], lines),
+            ):
+                with open(path, "ab") as f:
+                    f.truncate(committed)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            manifest.update({
+                "dim": embeddings.shape[1],
+                "count": manifest["count"] + len(names),
+                "embeddings_bytes": manifest["embeddings_bytes"] + embeddings.nbytes,
+                "index_bytes": manifest["index_bytes"] + len(lines),
+                "generation": manifest["generation"] + 1
+            })
+            self._write_manifest(manifest)
+
+        self.refresh()
+
+    def merge_centroids(self, deltas: Dict[str, np.ndarray], embedding_space: str) -> None:
+        """
+        Add the centroid changes of online adaptation to the stored centroids.
+
+        Each delta is what one process moved a speaker's centroid by since its
+        last merge. It is applied under the lock to the centroid as stored now
+        (with rows appended since folded in), so several processes adapting
+        the same speaker add up instead of overwriting each other. Only the
+        centroid version is bumped; readers do not reload the rows.
+        """
+        with self.lock:
+            # Another process may have written since the last stat
+            self._manifest_stat = None
+            self.refresh()
+            centroids = self._read_centroids()
+            self.centroids = centroids
+            rows = self.speaker_rows()
+            for name, delta in deltas.items():
+                space, speaker_rows = rows.get(name, (None, []))
+                if space != embedding_space:
+                    continue  # Re-enrolled in another space since
+                centroid, count = self._centroid(name, space, speaker_rows)
+                centroids[name] = {"space": space, "centroid": (centroid + delta).astype(np.float32),
+                                   "count": count, "rows": len(self)}
+            if not centroids:
+                return
+
+            temp_path = self.centroids_path.with_suffix(".tmp.npz")
+            np.savez(
+                temp_path,
+                names=np.asarray(list(centroids), dtype=str),
+                spaces=np.asarray([c["space"] for c in centroids.values()], dtype=str),
+                centroids=np.stack([c["centroid"] for c in centroids.values()]).astype(np.float32),
+                counts=np.asarray([c["count"] for c in centroids.values()], dtype=np.int64),
+                rows=np.asarray([c["rows"] for c in centroids.values()], dtype=np.int64)
+            )
+            os.replace(temp_path, self.centroids_path)
+
+            manifest = self._read_manifest()
+            manifest["centroids_version"] = manifest.get("centroids_version", 0) + 1
+            self._write_manifest(manifest)
+            self.centroids_version = manifest["centroids_version"]
+
+        self.refresh()
+
+    def update_centroids(self, profiles: Dict[str, SpeakerProfile]) -> None:
+        """Bring the running centroids of `profiles` (built by to_profiles) up to date with the store."""
+        for name, (space, rows) in self.speaker_rows().items():
+            profile = profiles.get(name)
+            if profile is not None and profile.centroid is not None and profile.embedding_space == space:
+                profile.centroid, profile.count = self._centroid(name, space, rows)
+
+    def import_profiles(self, profiles: Dict[str, SpeakerProfile]) -> None:
+        """Append every embedding of in-memory (e.g. pickled) profiles in one write."""
+        by_space: Dict[str, List] = {}
+        for name, profile in profiles.items():
+            # Older pickles may hold fewer samples than embeddings; keep every embedding
+            samples = list(profile.audio_samples[:len(profile.embeddings)])
+            samples += [None] * (len(profile.embeddings) - len(samples))
+            for embedding, sample in zip(profile.embeddings, samples):
+                by_space.setdefault(profile.embedding_space, []).append((name, embedding_vector(embedding), sample))
+        for space, rows in by_space.items():
+            names, embeddings, samples = zip(*rows)
+            self.append(list(names), np.stack(embeddings), list(samples), space)
+
+    @classmethod
+    def open(
+        cls,
+        path: Union[str, Path] = DEFAULT_STORE_PATH,
+        legacy_path: Optional[Union[str, Path]] = LEGACY_PROFILES_PATH
+    ) -> "ProfileStore":
+        """Open (or create) a store, importing the legacy pickle the first time."""
+        store = cls(path)
+        if legacy_path is not None and len(store) == 0 and Path(legacy_path).exists():
+            with store.lock:
+                store.refresh()
+                if len(store) == 0:
+                    with open(legacy_path, "rb") as f:
+                        store.import_profiles(pickle.load(f))
+                    store.logger.info(f"Migrated {len(store)} embeddings from {legacy_path} to {store.path}")
+        return store
+
+    def content_hashes(self, embedding_space: str) -> set:
+        """Content hashes of the reference clips already enrolled in `embedding_space`."""
+        return {r["hash"] for r in self.records if r.get("hash") and r["space"] == embedding_space}
+
+    def speaker_rows(self) -> Dict[str, Tuple[str, List[int]]]:
+        """Embedding space and store rows of each speaker (its latest space only, if re-enrolled)."""
+        if self._rows is None:
+            rows: Dict[str, Tuple[str, List[int]]] = {}
+            for row, record in enumerate(self.records):
+                space, speaker_rows = rows.get(record["name"], (None, None))
+                if space != record["space"]:
+                    speaker_rows = []
+                    rows[record["name"]] = (record["space"], speaker_rows)
+                speaker_rows.append(row)
+            self._rows = rows
+        return self._rows
+
+    def to_profiles(self, reservoir_size: Optional[int] = None) -> Dict[str, SpeakerProfile]:
+        """
+        SpeakerProfile view of the store; embeddings are views into the memory map.
+
+        With `reservoir_size`, each profile carries a running centroid (the
+        persisted one with any later rows folded in) and only a fixed-size,
+        uniformly sampled reservoir of its rows as exemplars.
+        """
+        profiles: Dict[str, SpeakerProfile] = {}
+        rng = np.random.default_rng(0)  # Same reservoir in every process
+        for name, (space, rows) in self.speaker_rows().items():
+            profile = profiles[name] = SpeakerProfile(
+                name=name, embeddings=[], audio_samples=[], embedding_space=space)
+            keep = rows
+            if reservoir_size is not None:
+                if len(keep) > reservoir_size:
+                    keep = sorted(rng.choice(keep, reservoir_size, replace=False))
+                profile.centroid, profile.count = self._centroid(name, space, rows)
+            profile.embeddings = [self.embeddings[row] for row in keep]
+            profile.audio_samples = [self.records[row]["sample"] for row in keep]
+        return profiles
+
+    def _centroid(self, name: str, embedding_space: str, rows: List[int]):
+        """Persisted centroid of a speaker brought up to date with its newer rows."""
+        saved = self.centroids.get(name)
+        if saved is not None and saved["space"] == embedding_space:
+            centroid, count = saved["centroid"].astype(np.float64), saved["count"]
+            rows = [row for row in rows if row >= saved["rows"]]
+        else:
+            centroid, count = np.zeros(self.dim), 0
+        if rows:
+            centroid = (centroid * count + self.embeddings[rows].sum(axis=0)) / (count + len(rows))
+            count += len(rows)
+        return centroid.astype(np.float32), count
+
+    def profile_matrix(self, embedding_space: str) -> ProfileMatrix:
+        """Compile the rows of one embedding space; zero-copy when the store holds a single space."""
+        rows = [i for i, record in enumerate(self.records) if record["space"] == embedding_space]
+        names: Dict[str, int] = {}
+        row_speakers = np.asarray([names.setdefault(self.records[i]["name"], len(names)) for i in rows], dtype=np.int64)
+        matrix = self.embeddings if len(rows) == len(self.records) else self.embeddings[rows]
+        return ProfileMatrix(list(names), row_speakers, matrix, normalized=True)
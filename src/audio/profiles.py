@@ -0,0 +1,222 @@
+# src/audio/profiles.py
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+DEFAULT_EMBEDDING_SPACE = "pyannote/embedding"
+DEFAULT_SIMILARITY_THRESHOLD = 0.3  # Adjust this for stricter/looser matching
+
+
+@dataclass
+class SpeakerProfile:
+    name: str
+    embeddings: List[np.ndarray]
+    audio_samples: List[str]  # Paths to reference audio files
+    embedding_space: str = DEFAULT_EMBEDDING_SPACE  # Model that produced the embeddings
+    centroid: Optional[np.ndarray] = None  # Running mean of the normalised embeddings (centroid mode)
+    count: int = 0  # Embeddings folded into the centroid
+
+    def mean_embedding(self) -> np.ndarray:
+        """The running centroid, or the mean of the normalised exemplars if none is kept."""
+        if self.centroid is not None:
+            return self.centroid
+        return normalize_rows(np.stack([embedding_vector(e) for e in self.embeddings])).mean(axis=0)
+
+    def observe(self, embedding: np.ndarray, sample: str, reservoir_size: int, rng: np.random.Generator) -> None:
+        """
+        Fold an enrollment embedding into the centroid and the exemplar reservoir.
+
+        The centroid is the exact mean of every embedding observed, while the
+        reservoir keeps a uniform sample of at most `reservoir_size` of them.
+        """
+        vector = normalize_rows(embedding_vector(embedding))
+        if self.centroid is None:
+            self.centroid = self.mean_embedding() if self.embeddings else np.zeros_like(vector)
+            self.count = len(self.embeddings)
+        self.count += 1
+        self.centroid = (self.centroid + (vector - self.centroid) / self.count).astype(np.float32)
+
+        if len(self.embeddings) < reservoir_size:
+            self.embeddings.append(embedding)
+            self.audio_samples.append(sample)
+        else:
+            slot = int(rng.integers(self.count))
+            if slot < len(self.embeddings):
+                self.embeddings[slot] = embedding
+                self.audio_samples[slot] = sample
+
+    def adapt(self, embedding: np.ndarray, rate: float) -> None:
+        """Move the centroid a step of `rate` toward a confidently identified embedding."""
+        vector = normalize_rows(embedding_vector(embedding))
+        if self.centroid is None:
+            self.count = len(self.embeddings)
+        self.centroid = ((1 - rate) * self.mean_embedding() + rate * vector).astype(np.float32)
+
+
+def embedding_vector(embedding) -> np.ndarray:
+    """Stored embedding as a 1-D array; very old profiles hold pyannote SlidingWindowFeature objects."""
+    return np.asarray(embedding) if isinstance(embedding, np.ndarray) else np.mean(embedding.data, axis=0)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise each row as float32; zero rows stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-10)
+
+
+class ProfileMatrix:
+    """
+    Speaker profiles compiled for matching.
+
+    Every reference embedding is one row of a contiguous float32 matrix of
+    L2-normalised vectors, and `row_speakers` maps rows to speaker indices.
+    Scoring a batch of queries is one matmul followed by a sparse per-speaker
+    average, which equals the mean cosine similarity over a speaker's
+    reference embeddings.
+    """
+
+    def __init__(self, names: List[str], row_speakers: np.ndarray, matrix: np.ndarray, normalized: bool = False):
+        """
+        Args:
+            names: Speaker names, indexed by `row_speakers`
+            row_speakers: Speaker index of every matrix row
+            matrix: (rows, dimension) reference embeddings
+            normalized: Rows are already in scoring form (float32, L2-normalised
+                or means of L2-normalised vectors), so `matrix` (e.g. a memory
+                map) is used as is instead of copied
+        """
+        self.names = names
+        self.row_speakers = np.asarray(row_speakers, dtype=np.int64)
+        if not len(matrix):
+            self.matrix = np.zeros((0, 0), np.float32)
+        elif normalized:
+            self.matrix = matrix
+        else:
+            self.matrix = np.ascontiguousarray(normalize_rows(matrix))
+
+        self.speaker_index = {name: i for i, name in enumerate(names)}
+        self._speaker_rows: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        # (rows x speakers) averaging operator: 1 / count for each speaker's rows
+        counts = np.bincount(self.row_speakers, minlength=len(names)).astype(np.float32)
+        self.counts = counts
+        weights = 1.0 / counts[self.row_speakers] if len(self.row_speakers) else np.zeros(0, np.float32)
+        self.averaging = sparse.csr_matrix(
+            (weights, (np.arange(len(self.row_speakers)), self.row_speakers)),
+            shape=(len(self.row_speakers), len(names))
+        )
+
+    @classmethod
+    def from_profiles(
+        cls,
+        profiles: Dict[str, SpeakerProfile],
+        embedding_space: Optional[str] = None
+    ) -> "ProfileMatrix":
+        """Compile profiles, keeping only those enrolled in `embedding_space` if given."""
+        names, rows, row_speakers = [], [], []
+        for name, profile in profiles.items():
+            if embedding_space is not None and profile.embedding_space != embedding_space:
+                continue
+            embeddings = [embedding_vector(e) for e in profile.embeddings]
+            if not embeddings:
+                continue
+            rows.extend(embeddings)
+            row_speakers.extend([len(names)] * len(embeddings))
+            names.append(name)
+        matrix = np.stack(rows) if rows else np.zeros((0, 0), np.float32)
+        return cls(names, np.asarray(row_speakers, dtype=np.int64), matrix)
+
+    @classmethod
+    def from_centroids(
+        cls,
+        profiles: Dict[str, SpeakerProfile],
+        embedding_space: Optional[str] = None
+    ) -> "ProfileMatrix":
+        """
+        Compile one row per speaker: the mean of its normalised embeddings.
+
+        A normalised query dotted with that mean is the mean cosine similarity
+        to the speaker's embeddings, so scores agree with `from_profiles` while
+        matching costs one row per speaker however many samples were enrolled.
+        """
+        names, rows = [], []
+        for name, profile in profiles.items():
+            if embedding_space is not None and profile.embedding_space != embedding_space:
+                continue
+            if profile.centroid is None and not profile.embeddings:
+                continue
+            rows.append(profile.mean_embedding())
+            names.append(name)
+        matrix = np.stack(rows).astype(np.float32) if rows else np.zeros((0, 0), np.float32)
+        return cls(names, np.arange(len(names), dtype=np.int64), matrix, normalized=True)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Mean cosine similarity of each query (row) to each speaker, shape (queries, speakers)."""
+        similarities = normalize_rows(np.atleast_2d(queries)) @ self.matrix.T
+        return np.asarray(self.averaging.T.dot(similarities.T).T)
+
+    def match(self, queries: np.ndarray, threshold: float) -> List[Tuple[Optional[str], float]]:
+        """
+        Best speaker for each query embedding.
+
+        Returns (name, similarity) per query, or (None, -1.0) when no speaker
+        scores above `threshold`; NaN queries and an empty roster give (None, 0.0).
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        results: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(queries)
+        valid = ~np.isnan(queries).any(axis=1)
+        if not len(self.names) or not valid.any():
+            return results
+
+        scores = self.scores(queries[valid])
+        best = np.argmax(scores, axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+        for i, speaker, score in zip(np.flatnonzero(valid), best, best_scores):
+            results[i] = (self.names[speaker], float(score)) if score > threshold else (None, -1.0)
+        return results
+
+    def speaker_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows grouped by speaker, and where each speaker's group starts.
+
+        Speaker `s` owns rows `order[bounds[s]:bounds[s + 1]]`. Computed once,
+        so candidate matching gathers only its candidates' rows.
+        """
+        if self._speaker_rows is None:
+            order = np.argsort(self.row_speakers, kind="stable")
+            bounds = np.searchsorted(self.row_speakers[order], np.arange(len(self.names) + 1))
+            self._speaker_rows = (order, bounds)
+        return self._speaker_rows
+
+    def match_candidates(
+        self,
+        queries: np.ndarray,
+        candidates: List[List[str]],
+        threshold: float
+    ) -> List[Tuple[Optional[str], float]]:
+        """
+        Like `match`, but only score each query against its candidate speakers,
+        e.g. the ones an approximate index returned. Scores are exact.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        order, bounds = self.speaker_rows()
+        results: List[Tuple[Optional[str], float]] = []
+        for query, names in zip(queries, candidates):
+            speakers = np.asarray([self.speaker_index[n] for n in names if n in self.speaker_index], dtype=np.int64)
+            if np.isnan(query).any() or len(speakers) == 0:
+                results.append((None, 0.0))
+                continue
+            rows = np.concatenate([order[bounds[s]:bounds[s + 1]] for s in speakers])
+            offsets = np.concatenate([[0], np.cumsum(bounds[speakers + 1] - bounds[speakers])[:-1]])
+            scores = np.add.reduceat(self.matrix[rows] @ query, offsets) / self.counts[speakers]
+            best = int(np.argmax(scores))
+            if scores[best] > threshold:
+                results.append((self.names[speakers[best]], float(scores[best])))
+            else:
+                results.append((None, -1.0))
+        return results
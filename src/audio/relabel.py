@@ -0,0 +1,145 @@
+# src/audio/relabel.py
+"""
+Re-identify the speakers of stored transcripts against the current profiles.
+
+    python -m src.audio.relabel --db data/transcripts.db --transcripts data/transcripts
+
+Only the cluster embeddings stored with each transcript are rematched, so no
+audio is decoded and no model is loaded.
+"""
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import sys
+import numpy as np
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.audio.profiles import DEFAULT_EMBEDDING_SPACE, DEFAULT_SIMILARITY_THRESHOLD, ProfileMatrix
+from src.audio.profile_store import DEFAULT_STORE_PATH, ProfileStore
+from src.audio.segments import SpeakerSegment, format_transcript
+from src.database.transcript_db import SpeakerClusterEntry, TranscriptDatabase, transcript_path_for
+
+logger = logging.getLogger(__name__)
+
+
+def relabel_transcript(
+    segments: List[SpeakerSegment],
+    clusters: List[SpeakerClusterEntry],
+    matches: List
+) -> bool:
+    """
+    Apply new cluster identities to a transcript's segments in place.
+
+    A segment is relabeled only if it still carries its cluster's previous
+    label (name, global ID or diarization label), so turns that were
+    identified individually keep their own name. Unmatched clusters show
+    their global ID when they have been linked.
+
+    Returns:
+        True if any segment changed
+    """
+    changed = False
+    for cluster, (name, confidence) in zip(clusters, matches):
+        previous = {cluster.speaker, cluster.global_id, cluster.label} - {None}
+        speaker = name or cluster.global_id or cluster.label
+        for segment in segments:
+            if segment.cluster != cluster.label or segment.speaker not in previous:
+                continue
+            if segment.speaker != speaker or segment.confidence != confidence:
+                segment.speaker = speaker
+                segment.confidence = confidence
+                changed = True
+    return changed
+
+
+def relabel(
+    db: TranscriptDatabase,
+    matrix: ProfileMatrix,
+    embedding_space: str = DEFAULT_EMBEDDING_SPACE,
+    threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    transcripts_dir: Optional[Path] = None,
+    batch_size: int = 500
+) -> int:
+    """
+    Rematch every stored cluster embedding and rewrite the transcripts whose speakers changed.
+
+    All clusters are matched in one batch; segments, cluster identities and
+    (if `transcripts_dir` is given) the formatted transcript files are
+    rewritten only for transcripts that changed.
+
+    Returns:
+        Number of transcripts rewritten
+    """
+    clusters = [c for c in db.get_speaker_clusters(embedding_space) if c.embedding is not None]
+    if not clusters:
+        return 0
+    matches = matrix.match(np.stack([c.embedding for c in clusters]), threshold)
+
+    by_transcript: Dict[int, List[int]] = {}
+    for i, cluster in enumerate(clusters):
+        by_transcript.setdefault(cluster.transcript_id, []).append(i)
+
+    rewritten = 0
+    transcript_ids = list(by_transcript)
+    for start in range(0, len(transcript_ids), batch_size):
+        chunk = transcript_ids[start:start + batch_size]
+        with db.connections.transaction():  # One commit per chunk
+            for transcript_id, (file_name, segments_json) in db.get_speaker_segments(chunk).items():
+                indices = by_transcript[transcript_id]
+                segments = [SpeakerSegment(**segment) for segment in json.loads(segments_json)]
+                if not relabel_transcript(segments, [clusters[i] for i in indices], [matches[i] for i in indices]):
+                    continue
+
+                db.update_speakers(
+                    transcript_id,
+                    json.dumps([asdict(segment) for segment in segments]),
+                    [(matches[i][0], matches[i][1], clusters[i].id) for i in indices]
+                )
+                if transcripts_dir is not None:
+                    transcript_path = transcript_path_for(transcripts_dir, file_name)
+                    transcript_path.parent.mkdir(parents=True, exist_ok=True)
+                    transcript_path.write_text(format_transcript(segments), encoding="utf-8")
+                rewritten += 1
+
+    logger.info(f"Relabeled {rewritten} of {len(by_transcript)} transcripts")
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relabel stored transcripts with the current speaker profiles')
+    parser.add_argument('--db', type=Path, default=Path('data/transcripts.db'),
+                        help='Path to transcript database')
+    parser.add_argument('--transcripts', type=Path, default=Path('data/transcripts'),
+                        help='Directory of formatted transcript files to rewrite')
+    parser.add_argument('--store', type=Path, default=DEFAULT_STORE_PATH, help='Profile store directory')
+    parser.add_argument('--embedding-space', default=DEFAULT_EMBEDDING_SPACE,
+                        help='Embedding model the clusters were identified with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                        help='Minimum similarity to name a speaker')
+    parser.add_argument('--profile-mode', choices=['exemplars', 'centroid'], default='exemplars',
+                        help='Score every enrolled embedding or one centroid per speaker')
+
+    args = parser.parse_args()
+
+    store = ProfileStore(args.store)
+    if args.profile_mode == 'centroid':
+        matrix = ProfileMatrix.from_centroids(store.to_profiles(reservoir_size=0), args.embedding_space)
+    else:
+        matrix = store.profile_matrix(args.embedding_space)
+
+    rewritten = relabel(TranscriptDatabase(args.db), matrix, args.embedding_space, args.threshold,
+                        args.transcripts if args.transcripts.exists() else None)
+    print(f"Relabeled {rewritten} transcripts")
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -0,0 +1,129 @@
+# src/audio/segments.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+@dataclass
+class SpeakerSegment:
+    """Represents a segment of speech from a single speaker"""
+    speaker: str
+    start: float
+    end: float
+    text: Optional[str] = None
+    confidence: Optional[float] = None
+    cluster: Optional[str] = None  # Diarization cluster label, e.g. SPEAKER_00
+
+
+@dataclass
+class SpeakerCluster:
+    """A diarization cluster of one recording and the embedding that represents it"""
+    label: str  # Per-file cluster label, e.g. SPEAKER_01
+    speaker: Optional[str] = None  # Identified profile name, if any
+    confidence: float = 0.0
+    embedding: Optional[np.ndarray] = None
+    embedding_space: Optional[str] = None
+    turns: List[Tuple[float, float]] = field(default_factory=list)  # (start, end) of every turn
+
+
+def _text_units(transcription_segments: List[Dict], split_words: bool) -> List[Tuple[float, float, str, bool]]:
+    """Flatten transcript segments (or their words) into sorted (start, end, text, is_word) units."""
+    units = []
+    for segment in transcription_segments:
+        if split_words and segment.get("words"):
+            units.extend(
+                (word["start"], word["end"], word["word"], True)
+                for word in segment["words"]
+            )
+        else:
+            units.append((segment["start"], segment["end"], segment["text"], False))
+    units.sort(key=lambda unit: unit[0])
+    return units
+
+
+def align_transcript(
+    segments: List[SpeakerSegment],
+    transcription_segments: List[Dict],
+    split_words: bool = False
+) -> List[SpeakerSegment]:
+    """
+    Assign each transcript span to the speaker turn it overlaps most.
+
+    Turns and spans are both swept in start order while keeping only the turns
+    that are still open, so the cost is O((N + M) log(N + M)) for N turns and
+    M spans rather than comparing every pair. Every span lands in exactly one
+    turn; a span that overlaps no turn goes to the nearest one in time. A
+    zero-length span (Whisper words often have start == end) goes to a turn
+    that contains its point.
+
+    Args:
+        segments: Speaker turns from diarization; their `text` is filled in
+        transcription_segments: Whisper segments with "text", "start", "end"
+            and optionally "words"
+        split_words: Assign individual words instead of whole segments, so a
+            segment spanning a speaker change is split at word boundaries
+
+    Returns:
+        The turns that received text, in their original order
+    """
+    if not segments:
+        return []
+
+    order = sorted(range(len(segments)), key=lambda i: segments[i].start)
+    pieces: Dict[int, List[Tuple[str, bool]]] = {}
+
+    active: List[int] = []
+    next_turn = 0
+    last_closed: Optional[int] = None
+
+    for start, end, text, is_word in _text_units(transcription_segments, split_words):
+        # Open every turn that starts before this span ends (or at its start)
+        while next_turn < len(order) and (segments[order[next_turn]].start < end
+                                          or segments[order[next_turn]].start <= start):
+            active.append(order[next_turn])
+            next_turn += 1
+
+        # Close turns that ended before this span starts; spans only move forward
+        still_open = []
+        for i in active:
+            if segments[i].end > start or segments[i].end >= end:
+                still_open.append(i)
+            elif last_closed is None or segments[i].end > segments[last_closed].end:
+                last_closed = i
+        active = still_open
+
+        best, best_overlap = None, 0.0
+        for i in active:
+            overlap = min(segments[i].end, end) - max(segments[i].start, start)
+            contains = segments[i].start <= start and end <= segments[i].end
+            if overlap > best_overlap or (best is None and contains):
+                best, best_overlap = i, overlap
+
+        if best is None:
+            # No overlap: fall back to the closest turn in time. Every turn is active,
+            # closed (the latest is last_closed) or upcoming, so there is always one.
+            upcoming = order[next_turn] if next_turn < len(order) else None
+            candidates = active + [i for i in (last_closed, upcoming) if i is not None]
+            best = min(candidates, key=lambda i: max(segments[i].start - end, start - segments[i].end, 0.0))
+
+        pieces.setdefault(best, []).append((text, is_word))
+
+    for i, turn_pieces in pieces.items():
+        text = ""
+        for piece, is_word in turn_pieces:
+            # Whisper words carry their own leading space; segments are space-joined
+            text += piece if is_word or not text else " " + piece
+        segments[i].text = text.strip() if split_words else text
+
+    return [segment for i, segment in enumerate(segments) if i in pieces]
+
+
+def format_transcript(segments: List[SpeakerSegment]) -> str:
+    """Format speaker segments into a readable transcript."""
+    transcript = []
+    for segment in segments:
+        timestamp = f"[{segment.start:.1f}s - {segment.end:.1f}s]"
+        confidence_str = f"({segment.confidence:.1%})" if segment.confidence > 0 else "(Unknown)"
+        transcript.append(
+            f"{segment.speaker} {confidence_str} {timestamp}: {segment.text}")
+    return "\n".join(transcript)
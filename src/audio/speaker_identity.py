@@ -1,118 +1,353 @@
 # src/audio/speaker_identity.py
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 import torch
 from pyannote.audio import Inference
 import pickle
-from dataclasses import dataclass
-import soundfile as sf
-import tempfile
-import os
-
-
-@dataclass
-class SpeakerProfile:
-    name: str
-    embeddings: List[np.ndarray]
-    audio_samples: List[str]  # Paths to reference audio files
+import logging
+import time
+from .loader import file_sha256, load_audio, SAMPLE_RATE
+from .profiles import DEFAULT_EMBEDDING_SPACE, DEFAULT_SIMILARITY_THRESHOLD, ProfileMatrix, SpeakerProfile
+from .profile_store import ProfileStore
+from .speaker_index import SpeakerIndex
 
 
 class SpeakerIdentifier:
-    def __init__(self, auth_token: str, device: Optional[torch.device] = None):
+    def __init__(
+        self,
+        auth_token: str,
+        device: Optional[torch.device] = None,
+        embedding_model: Optional[Any] = None,
+        embedding_space: str = DEFAULT_EMBEDDING_SPACE,
+        window_seconds: Optional[float] = None,
+        use_index: bool = False,
+        index_min_embeddings: int = 2000,
+        index_top_k: int = 20,
+        profile_mode: str = "exemplars",
+        reservoir_size: int = 16,
+        adapt_threshold: Optional[float] = None,
+        adapt_rate: float = 0.05,
+        centroid_flush_interval: float = 30.0
+    ):
+        """
+        Args:
+            auth_token: HuggingFace token for the embedding model
+            device: Device to run the model on
+            embedding_model: An already loaded embedding model to use instead of
+                loading `pyannote/embedding`, e.g. the diarization pipeline's own.
+                It is called as `embedding_model(waveforms, masks=masks)`.
+            embedding_space: Name of the model that produced the embeddings;
+                only profiles enrolled in the same space are matched
+            window_seconds: Window length used with `embedding_model`
+            use_index: Shortlist candidate speakers with an approximate
+                nearest-neighbour index before exact scoring
+            index_min_embeddings: Below this many enrolled embeddings the
+                index is skipped and every profile is scored
+            index_top_k: Nearest embeddings whose speakers are re-ranked exactly
+            profile_mode: "exemplars" scores every enrolled embedding;
+                "centroid" keeps a running centroid and a bounded reservoir of
+                exemplars per speaker and scores only the centroid
+            reservoir_size: Exemplars kept per speaker in centroid mode
+            adapt_threshold: In centroid mode, identifications at or above this
+                similarity move the speaker's centroid toward the new embedding
+            adapt_rate: Step size of that update
+            centroid_flush_interval: Seconds between merges of adapted
+                centroids into a profile store (see flush_centroids)
+        """
+        self.logger = logging.getLogger(__name__)
+        if profile_mode not in ("exemplars", "centroid"):
+            raise ValueError(f"Unknown profile mode: {profile_mode}")
         self.device = device or torch.device(
             "cuda" if torch.cuda.is_available() else "cpu")
-        # Load the embedding model
-        self.embedding_model = Inference(
-            "pyannote/embedding",
-            use_auth_token=auth_token
-        ).to(self.device)
+        self.embedding_space = embedding_space
+        
+        if embedding_model is None:
+            # Load the embedding model
+            self.embedding_model = Inference(
+                DEFAULT_EMBEDDING_SPACE,
+                use_auth_token=auth_token
+            ).to(self.device)
+            self.window_seconds = self.embedding_model.duration
+            self.step_seconds = self.embedding_model.step
+        else:
+            self.embedding_model = embedding_model
+            self.window_seconds = window_seconds or 10.0
+            self.step_seconds = self.window_seconds / 2
 
         self.speakers: Dict[str, SpeakerProfile] = {}
-        self.similarity_threshold = 0.3  # Adjust this for stricter/looser matching
+        self.store: Optional[ProfileStore] = None  # Set when profiles come from a profile store
+        self._store_generation = -1  # Store generation `speakers` was built from
+        self._store_centroids_version = -1  # Store centroid version `speakers` reflects
+        self.similarity_threshold = DEFAULT_SIMILARITY_THRESHOLD
+        
+        self.profile_mode = profile_mode
+        self.reservoir_size = reservoir_size
+        self.adapt_threshold = adapt_threshold
+        self.adapt_rate = adapt_rate
+        self._rng = np.random.default_rng()
+        self._profile_version = 0  # Bumped when centroids change in memory
+        self.centroid_flush_interval = centroid_flush_interval
+        self._centroid_deltas: Dict[str, np.ndarray] = {}  # Adaptation not yet merged into the store
+        self._last_centroid_flush = time.monotonic()
+        
+        # Compiled profile matrix and the roster state it was built from
+        self._profile_matrix: Optional[ProfileMatrix] = None
+        self._profile_matrix_key = None
+        
+        # Optional approximate nearest-neighbour index over the same embeddings
+        self.use_index = use_index
+        self.index_min_embeddings = index_min_embeddings
+        self.index_top_k = index_top_k
+        self.index: Optional[SpeakerIndex] = None
+        self._index_key = None  # Profile matrix key a centroid-mode index was built from
+
+    @property
+    def profile_matrix(self) -> ProfileMatrix:
+        """Profiles compiled for matching, rebuilt only when the roster changes."""
+        if self.store is not None:
+            self._sync_store()
+            key = ("store", self.store.generation, self._profile_version)
+        else:
+            key = (id(self.speakers), self._profile_version,
+                   tuple((name, len(p.embeddings)) for name, p in self.speakers.items()))
+        if self._profile_matrix is None or key != self._profile_matrix_key:
+            if self.profile_mode == "centroid":
+                self._profile_matrix = ProfileMatrix.from_centroids(self.speakers, self.embedding_space)
+            elif self.store is not None:
+                # Scores straight from the memory-mapped store without copying it
+                self._profile_matrix = self.store.profile_matrix(self.embedding_space)
+            else:
+                self._profile_matrix = ProfileMatrix.from_profiles(self.speakers, self.embedding_space)
+            self._profile_matrix_key = key
+            self.logger.debug(
+                f"Compiled {len(self._profile_matrix)} profiles "
+                f"({len(self._profile_matrix.row_speakers)} embeddings)")
+        return self._profile_matrix
+
+    def _sync_store(self) -> None:
+        """Hot-reload profiles appended, and centroids adapted, by other processes."""
+        self.store.refresh()
+        if self.store.generation != self._store_generation:
+            self.speakers = self.store.to_profiles(self._store_reservoir)
+            self._store_generation = self.store.generation
+        elif self.store.centroids_version != self._store_centroids_version:
+            self.store.update_centroids(self.speakers)
+            self._profile_version += 1
+        else:
+            return
+        self._store_centroids_version = self.store.centroids_version
+        # Keep this process's adaptation that has not been merged yet
+        for name, delta in self._centroid_deltas.items():
+            profile = self.speakers.get(name)
+            if profile is not None and profile.centroid is not None:
+                profile.centroid = (profile.centroid + delta).astype(np.float32)
+
+    @property
+    def _store_reservoir(self) -> Optional[int]:
+        return self.reservoir_size if self.profile_mode == "centroid" else None
+
+    def _ensure_index(self) -> SpeakerIndex:
+        """Build (or retrain) the index so it covers every embedding in the matrix."""
+        matrix = self.profile_matrix
+        # Centroid rows move on every enrollment and adaptation, so that index is rebuilt from the matrix
+        stale = self.profile_mode == "centroid" and self._index_key != self._profile_matrix_key
+        if self.index is None or stale or len(self.index) != len(matrix.row_speakers):
+            self.index = SpeakerIndex(matrix.matrix.shape[1])
+            self.index.add(matrix.matrix, [matrix.names[i] for i in matrix.row_speakers])
+            self._index_key = self._profile_matrix_key
+        if self.index.needs_training:
+            self.index.train()
+        return self.index
+
+    @staticmethod
+    def _index_path(path: Path) -> Path:
+        """The index is stored next to the profile file or store directory."""
+        return Path(path).with_suffix(".index.npz")
+
+    def _infer(self, chunks: torch.Tensor, masks: torch.Tensor) -> np.ndarray:
+        """Run one batch of (batch, 1, samples) chunks through the embedding model."""
+        if isinstance(self.embedding_model, Inference):
+            return self.embedding_model.infer(chunks)
+        # Pipeline embedding models take masks so zero padding is ignored
+        return self.embedding_model(chunks.to(self.device), masks=masks.to(self.device))
+
+    def embed_waveforms(self, waveforms: List[np.ndarray], batch_size: int = 32) -> np.ndarray:
+        """
+        Compute one embedding per in-memory 16 kHz mono waveform.
+        
+        Each waveform is cut into windows of the model's duration (the last
+        one aligned to the end, short ones zero-padded), all windows are run
+        through the model in batches, and the window embeddings are averaged
+        per waveform. Nothing is written to disk.
+        
+        Returns:
+            Array of shape (len(waveforms), dimension); rows are NaN for
+            waveforms that produced no usable embedding
+        """
+        window = int(self.window_seconds * SAMPLE_RATE)
+        step = max(1, int(self.step_seconds * SAMPLE_RATE))
+        
+        chunks, lengths, owners = [], [], []
+        for index, waveform in enumerate(waveforms):
+            if len(waveform) <= window:
+                starts = [0]
+            else:
+                starts = list(range(0, len(waveform) - window, step)) + [len(waveform) - window]
+            for start in starts:
+                chunk = waveform[start:start + window]
+                lengths.append(len(chunk))
+                if len(chunk) < window:
+                    chunk = np.pad(chunk, (0, window - len(chunk)))
+                chunks.append(chunk)
+                owners.append(index)
+        
+        sums, counts = None, np.zeros(len(waveforms))
+        for start in range(0, len(chunks), batch_size):
+            batch = torch.from_numpy(np.stack(chunks[start:start + batch_size]).astype(np.float32))
+            masks = torch.from_numpy(
+                np.arange(window)[None, :] < np.asarray(lengths[start:start + batch_size])[:, None]
+            ).float()
+            embeddings = self._infer(batch.unsqueeze(1), masks)
+            if sums is None:
+                sums = np.zeros((len(waveforms), embeddings.shape[1]))
+            
+            # Silent windows can produce NaN embeddings; leave them out of the mean
+            valid = ~np.isnan(embeddings).any(axis=1)
+            batch_owners = np.asarray(owners[start:start + batch_size])[valid]
+            np.add.at(sums, batch_owners, embeddings[valid])
+            np.add.at(counts, batch_owners, 1)
+        
+        if sums is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (sums / counts[:, None]).astype(np.float32)
 
     def add_speaker(self, name: str, audio_path: Path) -> None:
         """Add a new speaker profile from reference audio."""
-        embedding_feature = self.embedding_model({"audio": str(audio_path)})
-        # Convert SlidingWindowFeature to numpy array
-        embedding = np.mean(embedding_feature.data, axis=0)
+        embedding = self.embed_waveforms([load_audio(audio_path, SAMPLE_RATE)])[0]
+
+        if self.store is not None:
+            # Appended atomically; other processes pick it up on their next match
+            self.store.append([name], embedding[None, :], [str(audio_path)], self.embedding_space,
+                              [{"hash": file_sha256(audio_path)}])
+            self._sync_store()
+            if self.index is not None and self.profile_mode == "exemplars":
+                self.index.add(embedding, [name])
+            return
 
-        if name in self.speakers:
-            self.speakers[name].embeddings.append(embedding)
-            self.speakers[name].audio_samples.append(str(audio_path))
+        if name in self.speakers and self.speakers[name].embedding_space == self.embedding_space:
+            profile = self.speakers[name]
         else:
-            self.speakers[name] = SpeakerProfile(
+            if name in self.speakers:
+                self.index = None  # Replaced embeddings cannot be removed incrementally
+                self.logger.warning(
+                    f"Re-enrolling {name} in {self.embedding_space}; "
+                    f"embeddings from {self.speakers[name].embedding_space} are replaced")
+            profile = self.speakers[name] = SpeakerProfile(
                 name=name,
-                embeddings=[embedding],
-                audio_samples=[str(audio_path)]
+                embeddings=[],
+                audio_samples=[],
+                embedding_space=self.embedding_space
             )
+        
+        if self.profile_mode == "centroid":
+            profile.observe(embedding, str(audio_path), self.reservoir_size, self._rng)
+            self._profile_version += 1
+        else:
+            profile.embeddings.append(embedding)
+            profile.audio_samples.append(str(audio_path))
+        if self.index is not None and self.profile_mode == "exemplars":
+            self.index.add(embedding, [name])
+
+    def match(self, segment_embedding: np.ndarray) -> Tuple[Optional[str], float]:
+        """Match an embedding against the known speaker profiles."""
+        return self.match_batch(segment_embedding[None, :])[0]
 
-    def identify_speaker(self, audio_segment: np.ndarray, sample_rate: int = 16000) -> Tuple[Optional[str], float]:
-        """Identify a speaker from an audio segment."""
+    def match_batch(self, embeddings: np.ndarray) -> List[Tuple[Optional[str], float]]:
+        """Match a batch of embeddings (one per row) with a single matrix product."""
+        matrix = self.profile_matrix
         if not self.speakers:
-            print("No speaker profiles loaded!")
-            return None, 0.0
-            
+            return [(None, 0.0)] * len(embeddings)
+        
+        if self.use_index and len(matrix.row_speakers) >= self.index_min_embeddings:
+            candidates = self._ensure_index().candidate_labels(embeddings, self.index_top_k)
+            results = matrix.match_candidates(embeddings, candidates, self.similarity_threshold)
+        else:
+            results = matrix.match(embeddings, self.similarity_threshold)
+        self._adapt(embeddings, results)
+        return results
+
+    def _adapt(self, embeddings: np.ndarray, results: List[Tuple[Optional[str], float]]) -> None:
+        """Pull the centroids of confidently identified speakers toward their new embeddings."""
+        if self.profile_mode != "centroid" or self.adapt_threshold is None:
+            return
+        adapted = set()
+        for embedding, (name, score) in zip(embeddings, results):
+            if name is not None and score >= self.adapt_threshold:
+                profile = self.speakers[name]
+                before = profile.mean_embedding()
+                profile.adapt(embedding, self.adapt_rate)
+                if self.store is not None:
+                    self._centroid_deltas[name] = self._centroid_deltas.get(name, 0.0) + (profile.centroid - before)
+                adapted.add(name)
+        if not adapted:
+            return
+        self._profile_version += 1
+        self.logger.debug(f"Adapted centroids of {', '.join(sorted(adapted))}")
+        if time.monotonic() - self._last_centroid_flush >= self.centroid_flush_interval:
+            self.flush_centroids()
+
+    def flush_centroids(self) -> None:
+        """
+        Merge the centroid adaptation made since the last flush into the profile store.
+
+        Adaptation accumulates in memory and is written at most once every
+        `centroid_flush_interval` seconds, as a delta added to the stored
+        centroids, so concurrent processes adapting the same speaker do not
+        overwrite each other and readers do not reload the embeddings.
+        """
+        self._last_centroid_flush = time.monotonic()
+        if self.store is None or not self._centroid_deltas:
+            return
+        deltas, self._centroid_deltas = self._centroid_deltas, {}
+        self.store.merge_centroids(deltas, self.embedding_space)
+        # Our own write: pick up the merged centroids without rebuilding the profiles
+        if self.store.generation == self._store_generation:
+            self.store.update_centroids(self.speakers)
+            self._store_centroids_version = self.store.centroids_version
+            self._profile_version += 1
+
+    def identify_speakers(
+        self,
+        waveforms: List[np.ndarray],
+        batch_size: int = 32
+    ) -> List[Tuple[Optional[str], float]]:
+        """Identify the speaker of many in-memory segments with batched inference."""
+        if self.store is not None:
+            self._sync_store()
+        if not self.speakers:
+            self.logger.debug("No speaker profiles loaded")
+            return [(None, 0.0)] * len(waveforms)
+        if not waveforms:
+            return []
+        
+        embeddings = self.embed_waveforms(waveforms, batch_size)
+        return self.match_batch(embeddings)
+
+    def identify_speaker(self, audio_segment: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[Optional[str], float]:
+        """
+        Identify a speaker from an audio segment.
+
+        Raises:
+            ValueError: If `sample_rate` is not SAMPLE_RATE; resample with load_audio first
+        """
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Expected {SAMPLE_RATE} Hz audio, got {sample_rate} Hz")
         try:
-            print(f"Available speakers: {list(self.speakers.keys())}")
-            
-            # Save the audio segment temporarily
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                sf.write(tmp_file.name, audio_segment, sample_rate)
-                print(f"Saved temporary segment to {tmp_file.name}")
-                
-            # Get embedding for the segment
-            embedding_feature = self.embedding_model({"audio": tmp_file.name})
-            segment_embedding = np.mean(embedding_feature.data, axis=0)
-            print(f"Generated embedding with shape: {segment_embedding.shape}")
-            print(f"Embedding type: {type(segment_embedding)}")
-            print(f"Embedding dtype: {segment_embedding.dtype}")
-            
-            # Clean up temporary file
-            os.unlink(tmp_file.name)
-            
-            # Compare with known speakers
-            best_match = None
-            highest_similarity = -1.0
-            
-            for name, profile in self.speakers.items():
-                similarities = []
-                for ref_embedding in profile.embeddings:
-                    if hasattr(ref_embedding, 'data'):
-                        ref_embedding = np.mean(ref_embedding.data, axis=0)
-                    print(f"Reference embedding shape: {ref_embedding.shape}")
-                    print(f"Reference embedding type: {type(ref_embedding)}")
-                    
-                    try:
-                        similarity = self.cosine_similarity(segment_embedding, ref_embedding)
-                        print(f"Raw similarity value: {similarity}, type: {type(similarity)}")
-                        similarities.append(float(similarity))
-                        print(f"Similarity with {name}: {float(similarity):.3f}")
-                    except Exception as e:
-                        print(f"Error calculating similarity: {e}")
-                        print(f"Segment embedding example values: {segment_embedding[:5]}")
-                        print(f"Reference embedding example values: {ref_embedding[:5]}")
-                        continue
-                
-                if similarities:
-                    avg_similarity = sum(similarities) / len(similarities)
-                    print(f"Average similarity for {name}: {avg_similarity:.3f}")
-                    
-                    if avg_similarity > highest_similarity and avg_similarity > self.similarity_threshold:
-                        highest_similarity = avg_similarity
-                        best_match = name
-            
-            if best_match:
-                print(f"Identified speaker: {best_match} with confidence: {highest_similarity:.3f}")
-            else:
-                print(f"No speaker identified (highest similarity: {highest_similarity:.3f})")
-                
-            return best_match, highest_similarity
-                
+            return self.identify_speakers([audio_segment])[0]
         except Exception as e:
-            print(f"Error in speaker identification: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            self.logger.error(f"Error in speaker identification: {str(e)}")
             return None, 0.0
 
     @staticmethod
@@ -125,11 +360,53 @@ class SpeakerIdentifier:
         return similarity  # Will be a scalar value
 
     def save_profiles(self, path: Path) -> None:
-        """Save speaker profiles to disk."""
-        with open(path, 'wb') as f:
-            pickle.dump(self.speakers, f)
+        """
+        Save speaker profiles to disk.
+
+        A `.pkl` path writes the legacy pickle. Any other path is a profile
+        store directory: a store that is already attached there is written on
+        every enrollment, otherwise the current profiles are appended to it.
+        """
+        path = Path(path)
+        if path.suffix == ".pkl":
+            with open(path, 'wb') as f:
+                pickle.dump(self.speakers, f)
+        elif self.store is None or self.store.path.resolve() != path.resolve():
+            ProfileStore(path).import_profiles(self.speakers)
+        if self.index is not None:
+            self.index.save(self._index_path(path))
 
     def load_profiles(self, path: Path) -> None:
-        """Load speaker profiles from disk."""
-        with open(path, 'rb') as f:
-            self.speakers = pickle.load(f)
+        """
+        Load speaker profiles from disk.
+
+        A `.pkl` path is read once into memory. Any other path is opened as a
+        profile store (created if missing): its embeddings are memory-mapped
+        and changes made by other processes are picked up automatically.
+        """
+        path = Path(path)
+        if path.suffix == ".pkl":
+            self.store = None
+            with open(path, 'rb') as f:
+                self.speakers = pickle.load(f)
+        else:
+            self.store = ProfileStore(path)
+            self._store_generation = -1
+            self._sync_store()
+        self._profile_matrix = None
+        self._profile_matrix_key = None
+        
+        # A stale index is detected by its size and rebuilt on first use
+        self.index = None
+        index_path = self._index_path(path)
+        if self.use_index and index_path.exists():
+            self.index = SpeakerIndex.load(index_path)
+        
+        other_spaces = [
+            name for name, profile in self.speakers.items()
+            if profile.embedding_space != self.embedding_space
+        ]
+        if other_spaces:
+            self.logger.warning(
+                f"Ignoring {len(other_spaces)} profiles not enrolled in {self.embedding_space}; "
+                f"re-enroll them to match with this model: {', '.join(other_spaces)}")
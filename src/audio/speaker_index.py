@@ -0,0 +1,203 @@
+# src/audio/speaker_index.py
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import logging
+import numpy as np
+from .profiles import normalize_rows
+
+
+class SpeakerIndex:
+    """
+    Inverted-file (IVF-flat) index over L2-normalised speaker embeddings.
+
+    Vectors are partitioned by their nearest k-means centroid. A search only
+    scans the lists of the `nprobe` centroids closest to the query, so cost
+    grows with roughly N * nprobe / nlist rather than N. Vectors are stored
+    uncompressed, so the similarities it returns are exact.
+    """
+
+    def __init__(self, dim: int, nlist: Optional[int] = None, nprobe: Optional[int] = None, seed: int = 0):
+        """
+        Args:
+            dim: Embedding dimension
+            nlist: Number of inverted lists (defaults to sqrt of the size at training)
+            nprobe: Lists scanned per query (defaults to a tenth of the lists, at least 8)
+            seed: Seed for k-means initialisation
+        """
+        self.logger = logging.getLogger(__name__)
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+
+        self._buffer = np.zeros((0, dim), dtype=np.float32)  # Grows geometrically on insert
+        self.labels: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int64)  # Inverted list of every vector
+        self._lists: Optional[List[np.ndarray]] = None
+        self._list_vectors: Dict[int, np.ndarray] = {}  # Contiguous copy of each probed list
+        self.trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._buffer[:len(self.labels)]
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def needs_training(self) -> bool:
+        """True once the index has grown well past the size it was trained at."""
+        return len(self) > 0 and (not self.is_trained or len(self) > 4 * max(self.trained_size, 1))
+
+    def train(self, iterations: int = 10, max_samples: int = 65536) -> None:
+        """Fit centroids with spherical k-means on (a sample of) the stored vectors."""
+        if len(self) == 0:
+            return
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(np.sqrt(len(self))))
+        nlist = min(nlist, len(self))
+
+        sample = self.vectors
+        if len(sample) > max_samples:
+            sample = sample[rng.choice(len(sample), max_samples, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            counts = np.bincount(nearest, minlength=nlist)
+            # Re-seed empty lists from random samples
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self.assignments = self._assign(self.vectors)
+        self._lists = None
+        self._list_vectors = {}
+        self.trained_size = len(self)
+        self.logger.info(f"Trained speaker index: {len(self)} vectors in {nlist} lists")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if len(vectors) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int64)
+
+    @property
+    def lists(self) -> List[np.ndarray]:
+        """Row indices belonging to each inverted list."""
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def add(self, vectors: np.ndarray, labels: List[str]) -> None:
+        """Insert vectors incrementally; they go straight into their nearest list."""
+        vectors = normalize_rows(np.atleast_2d(vectors))
+        size = len(self.labels)
+        if size + len(vectors) > len(self._buffer):
+            grown = np.zeros((max(2 * len(self._buffer), size + len(vectors), 64), self.dim), dtype=np.float32)
+            grown[:size] = self.vectors
+            self._buffer = grown
+        self._buffer[size:size + len(vectors)] = vectors
+        self.labels.extend(labels)
+        if self.is_trained:
+            assignments = self._assign(vectors)
+            self.assignments = np.concatenate([self.assignments, assignments])
+            for list_id in np.unique(assignments):
+                self._list_vectors.pop(int(list_id), None)
+            if self._lists is not None:
+                # Extend the affected lists instead of regrouping every row
+                for row, list_id in enumerate(assignments, start=size):
+                    self._lists[list_id] = np.append(self._lists[list_id], row)
+
+    def _list_block(self, list_id: int) -> np.ndarray:
+        """Vectors of one inverted list as a contiguous matrix."""
+        block = self._list_vectors.get(list_id)
+        if block is None:
+            block = self._list_vectors[list_id] = self.vectors[self.lists[list_id]]
+        return block
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k rows by cosine similarity for each query.
+
+        Queries are grouped by the lists they probe, so every probed list is
+        scanned once for the whole batch with one matrix product.
+
+        Returns:
+            One (row indices, similarities) pair per query, best first
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if self.is_trained:
+            nprobe = nprobe or self.nprobe or max(8, len(self.centroids) // 10)
+            nprobe = min(nprobe, len(self.centroids))
+        else:
+            nprobe = 0
+
+        if nprobe:
+            rows: List[List[np.ndarray]] = [[] for _ in queries]
+            scores: List[List[np.ndarray]] = [[] for _ in queries]
+            probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            order = np.argsort(probes, axis=None, kind="stable")
+            probed = probes.ravel()[order]
+            starts = np.flatnonzero(np.concatenate([[True], probed[1:] != probed[:-1]]))
+            for start, stop in zip(starts, np.append(starts[1:], len(order))):
+                list_id = int(probed[start])
+                members = order[start:stop] // nprobe
+                similarities = queries[members] @ self._list_block(list_id).T
+                for query, row in zip(members, similarities):
+                    rows[query].append(self.lists[list_id])
+                    scores[query].append(row)
+            candidates = [np.concatenate(r) for r in rows]
+            similarities = [np.concatenate(s) for s in scores]
+        else:
+            all_rows = np.arange(len(self))
+            candidates = [all_rows] * len(queries)
+            similarities = list(queries @ self.vectors.T)
+
+        results = []
+        for rows_i, similarities_i in zip(candidates, similarities):
+            top = min(k, len(rows_i))
+            best = np.argpartition(-similarities_i, top - 1)[:top] if top else np.zeros(0, dtype=np.int64)
+            best = best[np.argsort(-similarities_i[best])]
+            results.append((rows_i[best], similarities_i[best]))
+        return results
+
+    def candidate_labels(self, queries: np.ndarray, k: int = 10) -> List[List[str]]:
+        """Distinct labels among the approximate top-k rows of each query."""
+        return [
+            list(dict.fromkeys(self.labels[row] for row in rows))
+            for rows, _ in self.search(queries, k)
+        ]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the index as a single .npz file."""
+        np.savez(
+            path,
+            vectors=self.vectors,
+            labels=np.asarray(self.labels, dtype=str),
+            centroids=self.centroids if self.is_trained else np.zeros((0, self.dim), np.float32),
+            assignments=self.assignments,
+            params=np.asarray([self.nlist or 0, self.nprobe or 0, self.trained_size, self.seed])
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SpeakerIndex":
+        with np.load(path) as data:
+            nlist, nprobe, trained_size, seed = (int(v) for v in data["params"])
+            index = cls(data["vectors"].shape[1], nlist or None, nprobe or None, seed)
+            index._buffer = data["vectors"]
+            index.labels = [str(label) for label in data["labels"]]
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                index.assignments = data["assignments"]
+            index.trained_size = trained_size
+        return index
@@ -2,18 +2,22 @@
 import whisper
 import torch
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Union
 import logging
 import numpy as np
-import soundfile as sf
 from scipy import signal
+from .loader import load_audio, stream_audio, SAMPLE_RATE
+from .vad import SpeechMap
 
 class AudioPreprocessor:
     @staticmethod
     def normalize_audio(audio: np.ndarray) -> np.ndarray:
         """Normalize audio to -20dB"""
         target_dB = -20
-        current_dB = 20 * np.log10(np.sqrt(np.mean(audio**2)))
+        rms = np.sqrt(np.mean(audio**2))
+        if rms == 0:
+            return audio
+        current_dB = 20 * np.log10(rms)
         adjustment = target_dB - current_dB
         return audio * (10 ** (adjustment / 20))
 
@@ -24,7 +28,126 @@ class AudioPreprocessor:
         nyquist = sr // 2
         cutoff = 100 / nyquist
         b, a = signal.butter(4, cutoff, btype='high')
-        return signal.filtfilt(b, a, audio)
+        return signal.filtfilt(b, a, audio).astype(np.float32)
+
+    @staticmethod
+    def frame_energy(audio: np.ndarray, sr: int, frame_ms: float = 30.0) -> np.ndarray:
+        """Per-frame RMS energy in dB over non-overlapping frames"""
+        frame = max(1, int(sr * frame_ms / 1000))
+        num_frames = len(audio) // frame
+        frames = audio[:num_frames * frame].reshape(num_frames, frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        return 20 * np.log10(rms + 1e-10)
+
+    @staticmethod
+    def find_split_points(
+        audio: np.ndarray,
+        sr: int,
+        target_seconds: float = 300.0,
+        search_seconds: float = 15.0,
+        frame_ms: float = 30.0
+    ) -> List[int]:
+        """
+        Choose chunk boundaries at the quietest frame near every multiple of
+        `target_seconds`, so chunks can be transcribed independently.
+        
+        Returns:
+            Sorted sample indices, starting with 0 and ending with len(audio)
+        """
+        frame = max(1, int(sr * frame_ms / 1000))
+        energy = AudioPreprocessor.frame_energy(audio, sr, frame_ms)
+        target = int(target_seconds * 1000 / frame_ms)
+        search = int(search_seconds * 1000 / frame_ms)
+        
+        cuts = [0]
+        position = target
+        while position < len(energy) - search:
+            lo = max(cuts[-1] // frame + 1, position - search)
+            hi = position + search
+            quietest = lo + int(np.argmin(energy[lo:hi]))
+            cuts.append(quietest * frame)
+            position = quietest + target
+        cuts.append(len(audio))
+        return cuts
+
+    @staticmethod
+    def build_speech_map(
+        audio: np.ndarray,
+        sr: int,
+        frame_ms: float = 30.0,
+        threshold_db: Optional[float] = None,
+        min_speech_ms: float = 250.0,
+        min_silence_ms: float = 500.0,
+        padding_ms: float = 200.0,
+        min_speech_ratio: float = 0.01
+    ) -> SpeechMap:
+        """
+        Energy-based voice activity detection.
+        
+        Frames louder than `threshold_db` count as speech. By default the
+        threshold adapts to the recording: 12 dB above its noise floor (10th
+        percentile frame energy), but never below -50 dB. Gaps shorter than
+        `min_silence_ms` are bridged, bursts shorter than `min_speech_ms` are
+        dropped, and each region is padded by `padding_ms` on both sides.
+        
+        The adaptive threshold needs quiet stretches to find the floor, so a
+        recording is kept whole rather than risk dropping its speech when its
+        90th percentile frame is above -50 dB but within 12 dB of the 10th
+        (speech without pauses, speech over loud noise), or when it has sound
+        above -50 dB but the detected speech covers less than
+        `min_speech_ratio` of it.
+        """
+        duration = len(audio) / sr
+        energy = AudioPreprocessor.frame_energy(audio, sr, frame_ms)
+        if len(energy) == 0:
+            return SpeechMap(np.zeros((0, 2)), duration, sr)
+        
+        margin_db, silence_db = 12.0, -50.0
+        whole = SpeechMap(np.array([[0.0, duration]]), duration, sr)
+        fallback = False
+        if threshold_db is None:
+            floor_db, loud_db = np.percentile(energy, [10, 90])
+            fallback = energy.max() > silence_db
+            if loud_db > silence_db and loud_db - floor_db < margin_db:
+                logging.getLogger(__name__).warning(
+                    "No quiet frames to calibrate speech detection, keeping the whole recording")
+                return whole
+            threshold_db = max(floor_db + margin_db, silence_db)
+        is_speech = energy > threshold_db
+        
+        # Run-length encode the frame decisions into [start, end) frame regions
+        edges = np.diff(np.concatenate([[0], is_speech.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        
+        # Bridge short pauses inside speech
+        if len(starts) > 1:
+            keep = (starts[1:] - ends[:-1]) * frame_ms >= min_silence_ms
+            starts = starts[np.concatenate([[True], keep])]
+            ends = ends[np.concatenate([keep, [True]])]
+        
+        # Drop isolated clicks and bumps
+        long_enough = (ends - starts) * frame_ms >= min_speech_ms
+        starts, ends = starts[long_enough], ends[long_enough]
+        
+        # Pad, clip to the recording and merge regions that now touch
+        regions = np.stack([
+            np.maximum(starts * frame_ms - padding_ms, 0) / 1000,
+            np.minimum(ends * frame_ms + padding_ms, duration * 1000) / 1000
+        ], axis=1)
+        if len(regions) > 1:
+            separate = regions[1:, 0] > regions[:-1, 1]
+            regions = np.stack([
+                regions[np.concatenate([[True], separate]), 0],
+                regions[np.concatenate([separate, [True]]), 1]
+            ], axis=1)
+        
+        speech_map = SpeechMap(regions, duration, sr)
+        if fallback and speech_map.speech_ratio < min_speech_ratio:
+            logging.getLogger(__name__).warning(
+                f"Speech detection found only {speech_map.speech_ratio:.1%} speech, keeping the whole recording")
+            return whole
+        return speech_map
 
 class WhisperTranscriber:
     def __init__(self, model_name: str = "large", device: Optional[str] = None):
@@ -50,44 +173,47 @@ class WhisperTranscriber:
             self.logger.error(f"Failed to load Whisper model: {str(e)}")
             raise
 
-    def preprocess_audio(self, audio_path: Path) -> Path:
-        """Preprocess audio file and return path to processed version"""
+    def preprocess_audio(self, audio: np.ndarray, sr: int = SAMPLE_RATE) -> np.ndarray:
+        """Preprocess an in-memory audio buffer and return the processed copy"""
         try:
             self.logger.info("Starting audio preprocessing...")
             
-            # Read audio file
-            audio, sr = sf.read(str(audio_path))
-            
-            # Convert to mono if stereo
-            if len(audio.shape) > 1:
-                audio = audio.mean(axis=1)
-            
             # Apply preprocessing
-            audio = AudioPreprocessor.remove_noise(audio, sr)
-            audio = AudioPreprocessor.normalize_audio(audio)
-            
-            # Save processed audio
-            processed_path = audio_path.parent / f"processed_{audio_path.name}"
-            sf.write(str(processed_path), audio, sr)
+            processed = AudioPreprocessor.remove_noise(audio, sr)
+            processed = AudioPreprocessor.normalize_audio(processed)
             
             self.logger.info("Audio preprocessing completed")
-            return processed_path
+            return processed.astype(np.float32, copy=False)
             
         except Exception as e:
             self.logger.error(f"Preprocessing failed: {str(e)}")
-            self.logger.warning("Falling back to original audio file")
-            return audio_path
+            self.logger.warning("Falling back to original audio")
+            return audio
+
+    def _transcription_options(self, language: Optional[str], **kwargs) -> Dict:
+        """Default Whisper decoding options, overridden by `kwargs`."""
+        options = {
+            "language": language,
+            "task": "transcribe",
+            "verbose": True,
+            "best_of": 5,  # Increased beam search
+            "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],  # Temperature search
+            "compression_ratio_threshold": 2.4,
+            "condition_on_previous_text": True,
+        }
+        options.update(kwargs)
+        return options
 
     def transcribe(self, 
-                  audio_path: Union[str, Path], 
+                  audio: Union[str, Path, np.ndarray], 
                   language: Optional[str] = None,
                   preprocess: bool = True,
                   **kwargs) -> Dict:
         """
-        Transcribe an audio file.
+        Transcribe an audio file or an already decoded buffer.
         
         Args:
-            audio_path: Path to audio file
+            audio: Path to audio file, or a float32 16 kHz mono array
             language: Optional language code (e.g., "en" for English)
             preprocess: Whether to apply audio preprocessing
             **kwargs: Additional arguments to pass to whisper.transcribe
@@ -95,53 +221,132 @@ class WhisperTranscriber:
         Returns:
             Dictionary containing transcription results
         """
-        audio_path = Path(audio_path).resolve()
-        if not audio_path.exists():
-            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        if isinstance(audio, np.ndarray):
+            source = "in-memory audio"
+        else:
+            audio_path = Path(audio).resolve()
+            if not audio_path.exists():
+                raise FileNotFoundError(f"Audio file not found: {audio_path}")
+            source = str(audio_path)
+            audio = load_audio(audio_path)
             
         try:
-            self.logger.info(f"Starting transcription of: {audio_path}")
+            self.logger.info(f"Starting transcription of: {source}")
             
             # Preprocess audio if requested
             if preprocess:
-                audio_path = self.preprocess_audio(audio_path)
+                audio = self.preprocess_audio(audio)
             
             # Set default transcription options
-            options = {
-                "language": language,
-                "task": "transcribe",
-                "verbose": True,
-                "best_of": 5,  # Increased beam search
-                "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],  # Temperature search
-                "compression_ratio_threshold": 2.4,
-                "condition_on_previous_text": True,
-            }
-            options.update(kwargs)
+            options = self._transcription_options(language, **kwargs)
             
             # Perform transcription
-            result = self.model.transcribe(str(audio_path), **options)
+            result = self.model.transcribe(audio, **options)
             
-            self.logger.info(f"Transcription completed for: {audio_path}")
+            self.logger.info(f"Transcription completed for: {source}")
             return result
             
         except Exception as e:
-            self.logger.error(f"Transcription failed for {audio_path}: {str(e)}")
+            self.logger.error(f"Transcription failed for {source}: {str(e)}")
             raise
-        finally:
-            # Clean up processed file if it exists
-            if preprocess and 'processed_' in str(audio_path):
-                try:
-                    audio_path.unlink()
-                except:
-                    pass
+
+    def transcribe_stream(self,
+                          audio_path: Union[str, Path],
+                          language: Optional[str] = None,
+                          preprocess: bool = True,
+                          window_seconds: float = 300.0,
+                          overlap_seconds: float = 5.0,
+                          **kwargs) -> Dict:
+        """
+        Transcribe a long audio file window by window with bounded memory.
+        
+        The file is decoded in fixed windows that overlap by `overlap_seconds`.
+        Each window is preprocessed and decoded on its own, and segments are
+        shifted back to file time. Inside an overlap, a segment belongs to the
+        window whose half of the overlap contains its midpoint.
+        
+        Args:
+            audio_path: Path to audio file
+            language: Optional language code (e.g., "en" for English)
+            preprocess: Whether to apply audio preprocessing per window
+            window_seconds: Length of each decoding window
+            overlap_seconds: Overlap between consecutive windows
+            **kwargs: Additional arguments to pass to whisper.transcribe
+            
+        Returns:
+            Dictionary with the same shape as `transcribe`
+        """
+        audio_path = Path(audio_path).resolve()
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+            
+        try:
+            self.logger.info(f"Starting streaming transcription of: {audio_path}")
+            options = self._transcription_options(language, **kwargs)
+            
+            segments = []
+            detected_language = language
+            for offset, window in stream_audio(audio_path, window_seconds, overlap_seconds):
+                if preprocess:
+                    window = self.preprocess_audio(window)
+                
+                # Drop what the previous window decoded past the middle of the overlap
+                cutoff = offset + overlap_seconds / 2 if offset > 0 else 0.0
+                segments = [s for s in segments if (s["start"] + s["end"]) / 2 < cutoff]
+                
+                # Carry context across window boundaries
+                window_options = dict(options)
+                if options["condition_on_previous_text"] and segments:
+                    window_options["initial_prompt"] = "".join(s["text"] for s in segments[-3:])
+                if detected_language:
+                    window_options["language"] = detected_language
+                
+                self.logger.info(f"Transcribing window at {offset:.1f}s")
+                result = self.model.transcribe(window, **window_options)
+                detected_language = detected_language or result.get("language")
+                
+                for segment in result["segments"]:
+                    segment = self._shift_segment(segment, offset)
+                    if (segment["start"] + segment["end"]) / 2 >= cutoff:
+                        segments.append(segment)
+            
+            for i, segment in enumerate(segments):
+                segment["id"] = i
+            
+            self.logger.info(f"Streaming transcription completed for: {audio_path}")
+            return {
+                "text": "".join(s["text"] for s in segments),
+                "segments": segments,
+                "language": detected_language
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Streaming transcription failed for {audio_path}: {str(e)}")
+            raise
+
+    @staticmethod
+    def _shift_segment(segment: Dict, offset: float) -> Dict:
+        """Return a copy of a Whisper segment moved by `offset` seconds."""
+        shifted = dict(segment)
+        shifted["start"] = segment["start"] + offset
+        shifted["end"] = segment["end"] + offset
+        if "words" in segment:
+            shifted["words"] = [
+                {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                for word in segment["words"]
+            ]
+        return shifted
 
     def get_segments(self, transcription: Dict) -> list:
-        """Extract segments with timestamps from transcription."""
-        return [
-            {
+        """Extract segments with timestamps (and word timings, if any) from transcription."""
+        segments = []
+        for segment in transcription["segments"]:
+            entry = {
                 "text": segment["text"],
                 "start": segment["start"],
                 "end": segment["end"]
             }
-            for segment in transcription["segments"]
-        ]
\ No newline at end of file
+            if segment.get("words"):
+                entry["words"] = segment["words"]
+            segments.append(entry)
+        return segments
\ No newline at end of file
@@ -0,0 +1,202 @@
+# src/audio/unknown_speakers.py
+"""
+Link unidentified speakers across recordings under stable global IDs.
+
+    python -m src.audio.unknown_speakers --db data/transcripts.db
+    python -m src.audio.unknown_speakers --db data/transcripts.db --promote UNKNOWN_0042 --name "Alice"
+"""
+from pathlib import Path
+from typing import Dict, Optional, Set
+import argparse
+import logging
+import os
+import sys
+import numpy as np
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.audio.profiles import DEFAULT_EMBEDDING_SPACE, normalize_rows
+from src.audio.profile_store import DEFAULT_STORE_PATH, ProfileStore
+from src.audio.speaker_index import SpeakerIndex
+from src.database.transcript_db import TranscriptDatabase
+
+UNKNOWN_PREFIX = "UNKNOWN_"
+
+
+class UnknownSpeakerLinker:
+    """
+    Incremental archive-wide clustering of unidentified diarization clusters.
+
+    Every cluster no profile matched keeps the embedding it was identified by.
+    Each new one is compared with the unknown speakers linked so far: an IVF
+    index shortlists the closest stored clusters, and the new cluster joins
+    the candidate whose members it is most similar to on average, if that is
+    above `threshold`; otherwise it starts a new global ID. Only stored
+    embeddings are used, so no audio is decoded, and existing assignments
+    never change.
+
+    The index and per-ID sums are kept between runs: each run loads only the
+    clusters linked since the last one (by cluster id), and the index is
+    retrained only once it has grown well past its trained size. If the
+    linked clusters in the database no longer add up to the ones held (e.g.
+    an ID was promoted to a profile), everything is reloaded.
+    """
+
+    def __init__(
+        self,
+        db: TranscriptDatabase,
+        embedding_space: str = DEFAULT_EMBEDDING_SPACE,
+        threshold: float = 0.5,
+        top_k: int = 20
+    ):
+        """
+        Args:
+            db: Database holding the speaker clusters of every transcript
+            embedding_space: Only clusters embedded by this model are linked
+            threshold: Minimum mean cosine similarity to join an existing ID
+            top_k: Nearest stored clusters whose IDs are considered
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db = db
+        self.embedding_space = embedding_space
+        self.threshold = threshold
+        self.top_k = top_k
+        self._reset()
+
+    def _reset(self) -> None:
+        self._index: Optional[SpeakerIndex] = None
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._used: Dict[int, Set[str]] = {}  # IDs already present in each recording
+        self._size = 0  # Linked clusters held
+        self._last_id = 0  # Highest cluster id held
+
+    def _add(self, vector: np.ndarray, global_id: str, transcript_id: int, cluster_id: int) -> None:
+        if self._index is None:
+            self._index = SpeakerIndex(len(vector))
+        self._index.add(vector, [global_id])
+        self._sums[global_id] = self._sums.get(global_id, 0.0) + vector
+        self._counts[global_id] = self._counts.get(global_id, 0) + 1
+        self._used.setdefault(transcript_id, set()).add(global_id)
+        self._size += 1
+        self._last_id = max(self._last_id, cluster_id)
+
+    def _load_linked(self) -> None:
+        """Bring the held clusters up to date with the linked clusters in the database."""
+        for attempt in range(2):
+            linked = self.db.get_speaker_clusters(
+                self.embedding_space, unknown_only=True, linked=True, after_id=self._last_id)
+            if linked:
+                vectors = normalize_rows(np.stack([c.embedding for c in linked]))
+                for cluster, vector in zip(linked, vectors):
+                    self._add(vector, cluster.global_id, cluster.transcript_id, cluster.id)
+            if self._size == self.db.count_speaker_clusters(self.embedding_space, unknown_only=True, linked=True):
+                break
+            self.logger.info("Linked clusters changed outside this linker, reloading")
+            self._reset()
+        if self._index is not None and self._index.needs_training:
+            self._index.train()
+
+    def _next_number(self) -> int:
+        numbers = [
+            int(global_id[len(UNKNOWN_PREFIX):]) for global_id in self.db.get_global_ids()
+            if global_id.startswith(UNKNOWN_PREFIX) and global_id[len(UNKNOWN_PREFIX):].isdigit()
+        ]
+        return max(numbers, default=0) + 1
+
+    def run(self) -> int:
+        """
+        Assign global IDs to every unknown cluster that has none yet.
+
+        Returns:
+            Number of clusters linked
+        """
+        pending = self.db.get_speaker_clusters(self.embedding_space, unknown_only=True, linked=False)
+        if not pending:
+            return 0
+        self._load_linked()
+
+        next_number = self._next_number()
+        assignments = []
+        for cluster in pending:
+            vector = normalize_rows(cluster.embedding)
+            if np.isnan(vector).any():
+                continue
+            best, best_score = None, self.threshold
+            candidates = self._index.candidate_labels(vector, self.top_k)[0] if self._index is not None else []
+            for global_id in candidates:
+                # Diarization already separated the clusters of one recording
+                if global_id in self._used.get(cluster.transcript_id, ()):
+                    continue
+                score = float(self._sums[global_id] @ vector) / self._counts[global_id]
+                if score >= best_score:
+                    best, best_score = global_id, score
+            if best is None:
+                best = f"{UNKNOWN_PREFIX}{next_number:04d}"
+                next_number += 1
+
+            self._add(vector, best, cluster.transcript_id, cluster.id)
+            if self._index.needs_training:
+                self._index.train()
+            assignments.append((best, cluster.id))
+
+        self.db.set_cluster_global_ids(assignments)
+        self.logger.info(
+            f"Linked {len(assignments)} unknown clusters "
+            f"({len(self._counts)} unknown speakers across the archive)")
+        return len(assignments)
+
+    def promote(self, global_id: str, name: str, store: ProfileStore) -> int:
+        """
+        Enroll an unknown speaker as a named profile from its stored cluster embeddings.
+
+        Returns:
+            Number of embeddings enrolled
+        """
+        clusters = [
+            c for c in self.db.get_speaker_clusters(self.embedding_space, global_id=global_id)
+            if c.embedding is not None
+        ]
+        if not clusters:
+            raise ValueError(f"No clusters found for {global_id} in {self.embedding_space}")
+        store.append(
+            [name] * len(clusters),
+            np.stack([c.embedding for c in clusters]),
+            [f"transcript:{c.transcript_id}/{c.label}" for c in clusters],
+            self.embedding_space
+        )
+        self.db.name_global_id(global_id, name)
+        self.logger.info(f"Promoted {global_id} to profile {name} ({len(clusters)} embeddings)")
+        return len(clusters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Link unknown speakers across recordings')
+    parser.add_argument('--db', type=Path, default=Path('data/transcripts.db'),
+                        help='Path to transcript database')
+    parser.add_argument('--embedding-space', default=DEFAULT_EMBEDDING_SPACE,
+                        help='Embedding model whose clusters are linked')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Minimum similarity to join an existing unknown speaker')
+    parser.add_argument('--promote', metavar='GLOBAL_ID', help='Unknown speaker to enroll as a profile')
+    parser.add_argument('--name', help='Profile name for --promote')
+    parser.add_argument('--store', type=Path, default=DEFAULT_STORE_PATH, help='Profile store directory')
+
+    args = parser.parse_args()
+
+    linker = UnknownSpeakerLinker(TranscriptDatabase(args.db), args.embedding_space, args.threshold)
+    if args.promote:
+        if not args.name:
+            parser.error('--promote requires --name')
+        enrolled = linker.promote(args.promote, args.name, ProfileStore(args.store))
+        print(f"Enrolled {enrolled} embeddings of {args.promote} as {args.name}")
+    else:
+        print(f"Linked {linker.run()} unknown speaker clusters")
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -0,0 +1,60 @@
+# src/audio/vad.py
+from dataclasses import dataclass
+from typing import Dict
+import numpy as np
+
+
+@dataclass
+class SpeechMap:
+    """Speech regions of a recording and the mapping between the compacted
+    speech-only timeline and original file time."""
+    regions: np.ndarray  # (K, 2) start/end in seconds of original file time
+    duration: float  # Length of the original recording in seconds
+    sample_rate: int
+
+    @property
+    def speech_duration(self) -> float:
+        return float(np.sum(self.regions[:, 1] - self.regions[:, 0])) if len(self.regions) else 0.0
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_duration / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def _compact_starts(self) -> np.ndarray:
+        """Start of each region on the compacted timeline."""
+        lengths = self.regions[:, 1] - self.regions[:, 0]
+        return np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        """Concatenate the speech regions of `audio` into one buffer."""
+        if len(self.regions) == 0:
+            return audio[:0]
+        bounds = np.round(self.regions * self.sample_rate).astype(np.int64)
+        return np.concatenate([audio[start:end] for start, end in bounds])
+
+    def to_original(self, times: np.ndarray, end: bool = False) -> np.ndarray:
+        """
+        Map times on the compacted timeline back to original file time.
+
+        A time that falls exactly on the seam between two regions is ambiguous;
+        `end=True` maps it to the end of the earlier region instead of the start
+        of the later one.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if len(self.regions) == 0:
+            return times
+        starts = self._compact_starts
+        side = "left" if end else "right"
+        index = np.clip(np.searchsorted(starts, times, side=side) - 1, 0, len(starts) - 1)
+        return self.regions[index, 0] + (times - starts[index])
+
+    def remap_transcription(self, transcription: Dict) -> Dict:
+        """Move Whisper segment (and word) timestamps back to original file time."""
+        for segment in transcription["segments"]:
+            segment["start"] = float(self.to_original(segment["start"]))
+            segment["end"] = float(self.to_original(segment["end"], end=True))
+            for word in segment.get("words", []):
+                word["start"] = float(self.to_original(word["start"]))
+                word["end"] = float(self.to_original(word["end"], end=True))
+        return transcription
@@ -9,19 +9,30 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from src.chat.transcript_query import TranscriptQuery
+from src.database.transcript_db import TranscriptDatabase
 
 def main():
     parser = argparse.ArgumentParser(description='Transcript Chat CLI')
     parser.add_argument('--model', default='llama3.2', 
                        help='Ollama model name (default: llama3.2)')
     parser.add_argument('--db', required=True, help='Path to transcript database')
-    parser.add_argument('--mode', choices=['chat', 'actions', 'speaker'], 
+    parser.add_argument('--mode', choices=['chat', 'actions', 'speaker', 'search'], 
                        default='chat', help='Operation mode')
-    parser.add_argument('--speaker', help='Speaker name for speaker analysis mode')
+    parser.add_argument('--speaker', help='Speaker name for speaker analysis mode (or to filter search hits)')
+    parser.add_argument('--query', help='Text to look up in search mode')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum number of search hits')
     
     args = parser.parse_args()
     
     try:
+        if args.mode == 'search':
+            # Full-text search runs locally and needs no model
+            hits = TranscriptDatabase(Path(args.db)).search_segments(args.query or '', args.speaker, args.limit)
+            for hit in hits:
+                print(f"{hit.file_name} [{hit.start:.1f}s - {hit.end:.1f}s] {hit.speaker}: {hit.snippet}")
+            print(f"\n{len(hits)} matching segments")
+            return
+        
         # Initialize query system
         query_system = TranscriptQuery(
             db_path=Path(args.db),
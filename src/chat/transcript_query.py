@@ -1,12 +1,12 @@
 from typing import List, Dict, Optional
 from pathlib import Path
 import json
-import sqlite3
 from datetime import datetime
 import logging
 import requests
 import subprocess
 import time
+from src.database.transcript_db import TranscriptDatabase, fts_query
 
 class TranscriptQuery:
     def __init__(self, db_path: Path, model_name: str = "llama2:3.2"):
@@ -19,6 +19,7 @@ class TranscriptQuery:
         """
         self.logger = logging.getLogger(__name__)
         self.db_path = db_path
+        self.db = TranscriptDatabase(db_path)  # Also brings older databases up to the current schema
         
         # Check available models and validate model name
         self.model_name = self._validate_model(model_name)
@@ -109,30 +110,33 @@ class TranscriptQuery:
     def _fetch_transcripts(self, query: Optional[str] = None) -> List[Dict]:
         """Fetch transcripts from database with optional search query."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                if query:
-                    sql = """
-                        SELECT * FROM transcripts 
-                        WHERE full_text LIKE ? OR summary LIKE ?
-                    """
-                    cursor = conn.execute(sql, (f"%{query}%", f"%{query}%"))
-                else:
-                    cursor = conn.execute("SELECT * FROM transcripts")
+            conn = self.db.connections.connection()
+            if query:
+                # Full-text index, best bm25 match first
+                sql = """
+                    SELECT t.* FROM transcripts_fts
+                    JOIN transcripts AS t ON t.id = transcripts_fts.rowid
+                    WHERE transcripts_fts MATCH ?
+                    ORDER BY rank
+                """
+                cursor = conn.execute(sql, (fts_query(query),))
+            else:
+                cursor = conn.execute("SELECT * FROM transcripts")
                 
-                results = []
-                for row in cursor.fetchall():
-                    # Parse speaker segments from JSON string
-                    segments = json.loads(row[4])  # speaker_segments column
+            results = []
+            for row in cursor.fetchall():
+                # Parse speaker segments from JSON string
+                segments = json.loads(row[4])  # speaker_segments column
                     
-                    results.append({
-                        "file_name": row[1],
-                        "timestamp": datetime.fromisoformat(row[2]),
-                        "full_text": row[3],
-                        "speaker_segments": segments,
-                        "summary": row[5]
-                    })
+                results.append({
+                    "file_name": row[1],
+                    "timestamp": datetime.fromisoformat(row[2]),
+                    "full_text": row[3],
+                    "speaker_segments": segments,
+                    "summary": row[5]
+                })
                 
-                return results
+            return results
         except Exception as e:
             self.logger.error(f"Database query failed: {str(e)}")
             raise
@@ -240,18 +244,12 @@ class TranscriptQuery:
 
     def get_speaker_summary(self, speaker_name: str) -> Dict:
         """Get a summary of a specific speaker's contributions."""
-        transcripts = self._fetch_transcripts()
-        
-        # Collect all statements by the speaker
-        statements = []
-        for transcript in transcripts:
-            for segment in transcript['speaker_segments']:
-                if segment['speaker'].lower() == speaker_name.lower():
-                    statements.append({
-                        'text': segment['text'],
-                        'date': transcript['timestamp'],
-                        'file': transcript['file_name']
-                    })
+        # Collect all statements by the speaker (indexed, case-insensitive lookup)
+        statements = [{
+            'text': segment.text,
+            'date': segment.timestamp,
+            'file': segment.file_name
+        } for segment in self.db.get_segments(speaker=speaker_name)]
         
         if not statements:
             return {"error": f"No statements found for speaker {speaker_name}"}
@@ -0,0 +1,126 @@
+# src/database/connection.py
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+
+
+class ConnectionManager:
+    """
+    Long-lived SQLite connections to one database file, one per thread.
+
+    Connections are opened on first use in each thread and reused afterwards.
+    Each one runs in WAL mode: readers never block the writer and vice versa.
+    It uses synchronous=NORMAL, so a commit appends to the log without an
+    fsync of the main file. A busy timeout makes concurrent writers wait for
+    the lock instead of failing with "database is locked". A child process
+    that inherits the manager through fork opens fresh connections rather
+    than sharing its parent's.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        busy_timeout: float = 30.0,
+        cache_size_kib: int = 64 * 1024,
+        mmap_size: int = 256 * 1024 * 1024
+    ):
+        """
+        Args:
+            db_path: Database file
+            busy_timeout: Seconds to wait for a lock held by another connection
+            cache_size_kib: Page cache per connection
+            mmap_size: Bytes of the database file read through a memory map
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self.busy_timeout = busy_timeout
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Tuple[weakref.ref, sqlite3.Connection]] = []  # (owning thread, connection)
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly by transaction(). Each connection is
+        # only used by the thread that opened it; the check is off so close() can run anywhere.
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection. Statements outside transaction() commit on their own."""
+        if os.getpid() != self._pid:
+            # Forked: the inherited connections belong to the parent
+            with self._lock:
+                if os.getpid() != self._pid:
+                    self._local = threading.local()
+                    self._connections = []
+                    self._pid = os.getpid()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                # Short-lived threads (e.g. pipeline stages) leave their connections behind
+                alive = []
+                for thread, other in self._connections:
+                    if thread() is not None and thread().is_alive():
+                        alive.append((thread, other))
+                    else:
+                        other.close()
+                alive.append((weakref.ref(threading.current_thread()), conn))
+                self._connections = alive
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run a block of writes as one transaction, committed on success and rolled back on error.
+
+        The write lock is taken up front (BEGIN IMMEDIATE), so waiting for a
+        concurrent writer is covered by the busy timeout. Nested blocks join
+        the enclosing transaction.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+
+    def close(self) -> None:
+        """Close every connection opened by this manager (in any thread)."""
+        with self._lock:
+            for _, conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,404 @@
+# src/database/job_queue.py
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import numpy as np
+from .transcript_db import TranscriptDatabase
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Pipeline stages, in order. Every stage but the last can be checkpointed; storing
+# the result commits together with complete(), so it never needs resuming.
+STAGES = ("decode", "transcribe", "diarize", "merge", "store")
+
+# Scheduling policies: arrival order, or shortest recording first (with aging)
+FIFO = "fifo"
+SJF = "sjf"
+
+_JOB_COLUMNS = ("id, content_hash, path, status, priority, attempts, max_attempts, "
+                "available_at, lease_owner, lease_expires, stage, error, duration, started_at, finished_at")
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker may have claimed it."""
+
+
+class QueueFull(Exception):
+    """The queue already holds `max_pending` unfinished jobs."""
+
+
+@dataclass
+class Job:
+    id: int
+    content_hash: str
+    path: str
+    status: str
+    priority: int
+    attempts: int  # Including the current one while running
+    max_attempts: int
+    available_at: float  # Unix time before which the job is not handed out
+    lease_owner: Optional[str]
+    lease_expires: Optional[float]
+    stage: Optional[str]  # Last checkpointed stage
+    error: Optional[str]
+    duration: Optional[float] = None  # Seconds of audio, from the container metadata
+    started_at: Optional[float] = None  # First claim
+    finished_at: Optional[float] = None
+    checkpoints: Dict[str, Any] = field(default_factory=dict)  # Stage -> saved state
+
+
+def worker_id() -> str:
+    """Lease owner name unique to this host and process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Persistent queue of ingestion jobs in the transcript database.
+
+    A claimed job is leased to one worker for `lease_seconds` and must be kept
+    alive with heartbeats; jobs whose lease runs out (crashed process, reboot)
+    are handed out again. Failures are retried with exponential backoff until
+    `max_attempts` is reached. Claims take the database write lock, so worker
+    threads and processes on one host can pull from the same queue safely.
+
+    Jobs are handed out by priority class first. Within a class, the SJF
+    policy picks the shortest recording, less `aging` seconds of audio for
+    every second the job has waited, so long recordings still get their turn.
+
+    With `max_pending`, enqueueing new content fails with QueueFull while that
+    many jobs are queued or running, so producers have to wait for workers
+    instead of piling up work.
+    """
+
+    def __init__(
+        self,
+        db: TranscriptDatabase,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+        backoff_base: float = 30.0,
+        backoff_max: float = 3600.0,
+        policy: str = SJF,
+        aging: float = 1.0,
+        default_duration: float = 600.0,
+        max_pending: Optional[int] = None
+    ):
+        """
+        Args:
+            db: Database holding the jobs table
+            lease_seconds: How long a claim lasts without a heartbeat
+            max_attempts: Attempts before a job is marked failed
+            backoff_base: Delay before the first retry; doubled on each further failure
+            backoff_max: Upper bound on the retry delay
+            policy: FIFO or SJF order within a priority class
+            aging: Seconds of audio a waiting job is credited per second waited (SJF)
+            default_duration: Duration assumed for jobs whose duration is unknown (SJF)
+            max_pending: Queued and running jobs beyond which new content is refused (unbounded if None)
+        """
+        if policy not in (FIFO, SJF):
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.logger = logging.getLogger(__name__)
+        self.connections = db.connections
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.policy = policy
+        self.aging = aging
+        self.default_duration = default_duration
+        self.max_pending = max_pending
+
+    def enqueue(self, content_hash: str, path: str, priority: int = 0, duration: Optional[float] = None) -> int:
+        """
+        Add a job for a file's content and return its id.
+
+        Content that already has a job keeps it (with its state); only the
+        path is updated if the file has moved, and a missing duration filled in.
+
+        Args:
+            content_hash: Hex SHA-256 of the file
+            path: Where the file is
+            priority: Priority class; higher classes are always served first
+            duration: Seconds of audio, used for shortest-job-first
+
+        Raises:
+            QueueFull: If the content has no job yet and `max_pending` jobs are unfinished
+        """
+        now = time.time()
+        with self.connections.transaction() as conn:
+            if self.max_pending is not None and conn.execute(
+                    "SELECT 1 FROM jobs WHERE content_hash = ?", (content_hash,)).fetchone() is None:
+                pending = conn.execute(
+                    "SELECT count(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)).fetchone()[0]
+                if pending >= self.max_pending:
+                    raise QueueFull(f"{pending} jobs are waiting or running")
+            conn.execute("""
+                INSERT INTO jobs (content_hash, path, priority, duration, max_attempts, available_at,
+                                  created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (content_hash) DO UPDATE
+                SET path = excluded.path, duration = coalesce(jobs.duration, excluded.duration)
+            """, (content_hash, path, priority, duration, self.max_attempts, now, now, now))
+            return conn.execute("SELECT id FROM jobs WHERE content_hash = ?", (content_hash,)).fetchone()[0]
+
+    def known(self, content_hashes: Sequence[str]) -> List[str]:
+        """The content hashes among these that already have a job."""
+        known = []
+        for start in range(0, len(content_hashes), 500):
+            chunk = list(content_hashes[start:start + 500])
+            known.extend(row[0] for row in self.connections.connection().execute(
+                f"SELECT content_hash FROM jobs WHERE content_hash IN ({', '.join('?' * len(chunk))})", chunk))
+        return known
+
+    def claim(self, owner: str) -> Optional[Job]:
+        """
+        Lease the next ready job to `owner`.
+
+        Queued jobs past their backoff come first by priority class, then by
+        the scheduling policy. Running jobs with an expired lease are reclaimed, unless they have
+        used up their attempts (e.g. a file that crashes the process every
+        time), in which case they are marked failed.
+
+        Returns:
+            The job with its checkpoints, or None if nothing is ready
+        """
+        now = time.time()
+        if self.policy == SJF:
+            order, params = "coalesce(duration, ?) - ? * (? - created_at), id", (self.default_duration, self.aging, now)
+        else:
+            order, params = "available_at, id", ()
+        with self.connections.transaction() as conn:
+            while True:
+                row = conn.execute(f"""
+                    SELECT {_JOB_COLUMNS} FROM jobs
+                    WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)
+                    ORDER BY priority DESC, {order}
+                    LIMIT 1
+                """, (JOB_QUEUED, now, JOB_RUNNING, now) + params).fetchone()
+                if row is None:
+                    return None
+                job = Job(*row)
+                if job.status == JOB_RUNNING:
+                    self.logger.warning(f"Reclaiming job {job.id} from {job.lease_owner} (lease expired)")
+                    if job.attempts >= job.max_attempts:
+                        self._finish(conn, job.id, JOB_FAILED, "lease expired on every attempt")
+                        continue
+
+                conn.execute("""
+                    UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,
+                                    started_at = coalesce(started_at, ?), updated_at = ?
+                    WHERE id = ?
+                """, (JOB_RUNNING, owner, now + self.lease_seconds, now, now, job.id))
+                job.started_at = job.started_at or now
+                job.status, job.attempts, job.lease_owner = JOB_RUNNING, job.attempts + 1, owner
+                job.lease_expires = now + self.lease_seconds
+                job.checkpoints = {
+                    stage: json.loads(data) for stage, data in conn.execute(
+                        "SELECT stage, data FROM job_checkpoints WHERE job_id = ?", (job.id,))
+                }
+                return job
+
+    def _owned(self, conn, job: Job, owner: str) -> bool:
+        row = conn.execute("SELECT status, lease_owner FROM jobs WHERE id = ?", (job.id,)).fetchone()
+        return row is not None and row[0] == JOB_RUNNING and row[1] == owner
+
+    def heartbeat(self, job: Job, owner: str) -> bool:
+        """Extend the lease; False if the job is no longer leased to `owner`."""
+        now = time.time()
+        with self.connections.transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND status = ? AND lease_owner = ?
+            """, (now + self.lease_seconds, now, job.id, JOB_RUNNING, owner))
+            return cursor.rowcount == 1
+
+    @contextmanager
+    def keep_alive(self, job: Job, owner: str) -> Iterator[threading.Event]:
+        """
+        Heartbeat the job from a background thread while the block runs.
+
+        Yields an event that is set if the lease is lost.
+        """
+        done, lost = threading.Event(), threading.Event()
+
+        def beat():
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    if not self.heartbeat(job, owner):
+                        self.logger.warning(f"Lost the lease on job {job.id}")
+                        lost.set()
+                        return
+                except Exception as e:
+                    self.logger.error(f"Heartbeat for job {job.id} failed: {e}")
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            done.set()
+            thread.join()
+
+    def checkpoint(self, job: Job, owner: str, stage: str, data: Any = None) -> None:
+        """
+        Save the state reached at a stage so a retry can resume after it.
+
+        Raises:
+            LeaseLost: If the job is no longer leased to `owner`
+        """
+        with self.connections.transaction() as conn:
+            if not self._owned(conn, job, owner):
+                raise LeaseLost(f"Job {job.id} is no longer leased to {owner}")
+            conn.execute("INSERT OR REPLACE INTO job_checkpoints (job_id, stage, data) VALUES (?, ?, ?)",
+                         (job.id, stage, json.dumps(data)))
+            conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job.id))
+        job.checkpoints[stage] = data
+        job.stage = stage
+
+    def complete(self, job: Job, owner: str) -> None:
+        """
+        Mark the job done and drop its checkpoints. Run it inside the transaction
+        that stores the job's results, so both commit or neither does.
+
+        Raises:
+            LeaseLost: If the job is no longer leased to `owner`
+        """
+        with self.connections.transaction() as conn:
+            if not self._owned(conn, job, owner):
+                raise LeaseLost(f"Job {job.id} is no longer leased to {owner}")
+            self._finish(conn, job.id, JOB_DONE, None)
+
+    def fail(self, job: Job, owner: str, error: str) -> bool:
+        """
+        Record a failed attempt: requeue with backoff, or mark the job failed
+        once it has used up its attempts.
+
+        Returns:
+            False once the job has been marked failed
+        """
+        with self.connections.transaction() as conn:
+            if not self._owned(conn, job, owner):
+                return True  # Reclaimed by another worker, which now owns the outcome
+            if job.attempts >= job.max_attempts:
+                self._finish(conn, job.id, JOB_FAILED, error)
+                self.logger.error(f"Job {job.id} failed after {job.attempts} attempts: {error}")
+                return False
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+            now = time.time()
+            conn.execute("""
+                UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL,
+                                error = ?, updated_at = ?
+                WHERE id = ?
+            """, (JOB_QUEUED, now + delay, error, now, job.id))
+            self.logger.warning(f"Job {job.id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+            return True
+
+    def _finish(self, conn, job_id: int, status: str, error: Optional[str]) -> None:
+        now = time.time()
+        conn.execute("""
+            UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ?,
+                            finished_at = ?, updated_at = ?
+            WHERE id = ?
+        """, (status, error, now, now, job_id))
+        if status == JOB_DONE:
+            conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+
+    def retry(self, job_id: int) -> None:
+        """Give a failed job a fresh set of attempts."""
+        with self.connections.transaction() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, attempts = 0, available_at = ?, error = NULL, finished_at = NULL,
+                                updated_at = ?
+                WHERE id = ? AND status = ?
+            """, (JOB_QUEUED, time.time(), time.time(), job_id, JOB_FAILED))
+
+    def get(self, job_id: int) -> Optional[Job]:
+        row = self.connections.connection().execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED)}
+        for status, count in self.connections.connection().execute(
+                "SELECT status, count(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def throughput(self, window: float = 3600.0) -> float:
+        """Jobs completed per hour over the last `window` seconds."""
+        count = self.connections.connection().execute(
+            "SELECT count(*) FROM jobs WHERE status = ? AND finished_at >= ?",
+            (JOB_DONE, time.time() - window)).fetchone()[0]
+        return count * 3600.0 / window
+
+    def latency_report(self, buckets: Sequence[float] = (60.0, 600.0, 3600.0)) -> List[Dict[str, Any]]:
+        """
+        Queue latency (enqueue to first claim) and turnaround (enqueue to done)
+        of started jobs, grouped by recording duration.
+
+        Args:
+            buckets: Upper bounds in seconds of the duration buckets
+
+        Returns:
+            One row per non-empty bucket: label, count and the mean, p50, p95
+            and p99 of the wait, plus the mean and p95 turnaround
+        """
+        rows = self.connections.connection().execute("""
+            SELECT duration, started_at - created_at, CASE WHEN status = ? THEN finished_at - created_at END
+            FROM jobs WHERE started_at IS NOT NULL
+        """, (JOB_DONE,)).fetchall()
+
+        bounds = [0.0, *buckets, float("inf")]
+        labels = [f"{_minutes(lo)}-{_minutes(hi)}" if hi != float("inf") else f">={_minutes(lo)}"
+                  for lo, hi in zip(bounds, bounds[1:])] + ["unknown"]
+        groups: Dict[str, List] = {label: [] for label in labels}
+        for duration, wait, turnaround in rows:
+            if duration is None:
+                label = "unknown"
+            else:
+                label = labels[int(np.searchsorted(buckets, duration, side="right"))]
+            groups[label].append((wait, turnaround))
+
+        report = []
+        for label, values in groups.items():
+            if not values:
+                continue
+            waits = np.array([wait for wait, _ in values])
+            turnarounds = np.array([t for _, t in values if t is not None])
+            report.append({
+                "bucket": label,
+                "count": len(values),
+                "wait_mean": float(waits.mean()),
+                "wait_p50": float(np.percentile(waits, 50)),
+                "wait_p95": float(np.percentile(waits, 95)),
+                "wait_p99": float(np.percentile(waits, 99)),
+                "turnaround_mean": float(turnarounds.mean()) if len(turnarounds) else None,
+                "turnaround_p95": float(np.percentile(turnarounds, 95)) if len(turnarounds) else None
+            })
+        return report
+
+
+def _minutes(seconds: float) -> str:
+    return f"{seconds / 60:g}m"
+
+
+def format_latency_report(report: List[Dict[str, Any]]) -> str:
+    """Render latency_report() rows as a table."""
+    lines = [f"{'duration':>10} {'jobs':>6} {'wait mean':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'done mean':>10} {'p95':>8}"]
+    for row in report:
+        done = (f"{row['turnaround_mean']:>10.1f} {row['turnaround_p95']:>8.1f}"
+                if row["turnaround_mean"] is not None else f"{'-':>10} {'-':>8}")
+        lines.append(f"{row['bucket']:>10} {row['count']:>6} {row['wait_mean']:>10.1f} {row['wait_p50']:>8.1f} "
+                     f"{row['wait_p95']:>8.1f} {row['wait_p99']:>8.1f} {done}")
+    return "\n".join(lines)
@@ -4,7 +4,244 @@ import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
 import json
-from typing import List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from .connection import ConnectionManager
+
+# Segment i of transcript t is row (t << SEGMENT_ROWID_BITS) + i of segments and segments_fts,
+# so all segments of a transcript form one contiguous rowid range
+SEGMENT_ROWID_BITS = 20
+
+_INDEX_SEGMENTS = f"""
+    INSERT INTO segments_fts(rowid, text, speaker, transcript_id, start, "end")
+    SELECT (new.id << {SEGMENT_ROWID_BITS}) + s.key, json_extract(s.value, '$.text'),
+           json_extract(s.value, '$.speaker'), new.id,
+           json_extract(s.value, '$.start'), json_extract(s.value, '$.end')
+    FROM json_each(new.speaker_segments) AS s;
+"""
+_UNINDEX_SEGMENTS = f"""
+    DELETE FROM segments_fts
+    WHERE rowid BETWEEN (old.id << {SEGMENT_ROWID_BITS}) AND (old.id << {SEGMENT_ROWID_BITS}) + {(1 << SEGMENT_ROWID_BITS) - 1};
+"""
+_INSERT_SEGMENTS = f"""
+    INSERT INTO segments (id, transcript_id, speaker, start, "end", text, confidence, cluster)
+    SELECT (new.id << {SEGMENT_ROWID_BITS}) + s.key, new.id, json_extract(s.value, '$.speaker'),
+           json_extract(s.value, '$.start'), json_extract(s.value, '$.end'), json_extract(s.value, '$.text'),
+           json_extract(s.value, '$.confidence'), json_extract(s.value, '$.cluster')
+    FROM json_each(new.speaker_segments) AS s;
+"""
+
+# Schema migrations, applied in order and tracked in PRAGMA user_version
+MIGRATIONS = [
+    # 1: Full-text indexes over transcripts and their speaker segments, kept in sync by triggers
+    f"""
+    CREATE VIRTUAL TABLE transcripts_fts USING fts5(
+        full_text, summary,
+        content='transcripts', content_rowid='id',
+        tokenize='porter unicode61'
+    );
+    CREATE VIRTUAL TABLE segments_fts USING fts5(
+        text, speaker UNINDEXED, transcript_id UNINDEXED, start UNINDEXED, "end" UNINDEXED,
+        tokenize='porter unicode61'
+    );
+
+    CREATE TRIGGER transcripts_fts_insert AFTER INSERT ON transcripts BEGIN
+        INSERT INTO transcripts_fts(rowid, full_text, summary) VALUES (new.id, new.full_text, new.summary);
+        {_INDEX_SEGMENTS}
+    END;
+    CREATE TRIGGER transcripts_fts_delete AFTER DELETE ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, full_text, summary)
+        VALUES ('delete', old.id, old.full_text, old.summary);
+        {_UNINDEX_SEGMENTS}
+    END;
+    CREATE TRIGGER transcripts_fts_update AFTER UPDATE ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, full_text, summary)
+        VALUES ('delete', old.id, old.full_text, old.summary);
+        INSERT INTO transcripts_fts(rowid, full_text, summary) VALUES (new.id, new.full_text, new.summary);
+        {_UNINDEX_SEGMENTS}
+        {_INDEX_SEGMENTS}
+    END;
+
+    INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild');
+    INSERT INTO segments_fts(rowid, text, speaker, transcript_id, start, "end")
+    SELECT (t.id << {SEGMENT_ROWID_BITS}) + s.key, json_extract(s.value, '$.text'),
+           json_extract(s.value, '$.speaker'), t.id,
+           json_extract(s.value, '$.start'), json_extract(s.value, '$.end')
+    FROM transcripts AS t, json_each(t.speaker_segments) AS s;
+    """,
+    # 2: Segments as rows, indexed by speaker and time; segments_fts now indexes this table
+    f"""
+    CREATE TABLE segments (
+        id INTEGER PRIMARY KEY,
+        transcript_id INTEGER NOT NULL REFERENCES transcripts(id),
+        speaker TEXT COLLATE NOCASE,
+        start REAL,
+        "end" REAL,
+        text TEXT,
+        confidence REAL,
+        cluster TEXT
+    );
+    CREATE INDEX idx_segments_speaker ON segments (speaker, transcript_id);
+    CREATE INDEX idx_segments_time ON segments (transcript_id, start);
+
+    DROP TRIGGER transcripts_fts_insert;
+    DROP TRIGGER transcripts_fts_delete;
+    DROP TRIGGER transcripts_fts_update;
+    DROP TABLE segments_fts;
+    CREATE VIRTUAL TABLE segments_fts USING fts5(
+        text, speaker UNINDEXED, transcript_id UNINDEXED, start UNINDEXED, "end" UNINDEXED,
+        content='segments', content_rowid='id',
+        tokenize='porter unicode61'
+    );
+
+    CREATE TRIGGER transcripts_insert AFTER INSERT ON transcripts BEGIN
+        INSERT INTO transcripts_fts(rowid, full_text, summary) VALUES (new.id, new.full_text, new.summary);
+        {_INSERT_SEGMENTS}
+    END;
+    CREATE TRIGGER transcripts_delete AFTER DELETE ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, full_text, summary)
+        VALUES ('delete', old.id, old.full_text, old.summary);
+        DELETE FROM segments WHERE transcript_id = old.id;
+    END;
+    CREATE TRIGGER transcripts_update_text AFTER UPDATE OF full_text, summary ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, full_text, summary)
+        VALUES ('delete', old.id, old.full_text, old.summary);
+        INSERT INTO transcripts_fts(rowid, full_text, summary) VALUES (new.id, new.full_text, new.summary);
+    END;
+    CREATE TRIGGER transcripts_update_segments AFTER UPDATE OF speaker_segments ON transcripts BEGIN
+        DELETE FROM segments WHERE transcript_id = old.id;
+        {_INSERT_SEGMENTS}
+    END;
+
+    CREATE TRIGGER segments_insert AFTER INSERT ON segments BEGIN
+        INSERT INTO segments_fts(rowid, text, speaker, transcript_id, start, "end")
+        VALUES (new.id, new.text, new.speaker, new.transcript_id, new.start, new."end");
+    END;
+    CREATE TRIGGER segments_delete AFTER DELETE ON segments BEGIN
+        INSERT INTO segments_fts(segments_fts, rowid, text, speaker, transcript_id, start, "end")
+        VALUES ('delete', old.id, old.text, old.speaker, old.transcript_id, old.start, old."end");
+    END;
+
+    INSERT INTO segments (id, transcript_id, speaker, start, "end", text, confidence, cluster)
+    SELECT (t.id << {SEGMENT_ROWID_BITS}) + s.key, t.id, json_extract(s.value, '$.speaker'),
+           json_extract(s.value, '$.start'), json_extract(s.value, '$.end'), json_extract(s.value, '$.text'),
+           json_extract(s.value, '$.confidence'), json_extract(s.value, '$.cluster')
+    FROM transcripts AS t, json_each(t.speaker_segments) AS s;
+    INSERT INTO segments_fts(segments_fts) VALUES ('rebuild');
+    """,
+    # 3: Registry of ingested audio files, keyed by content
+    """
+    CREATE TABLE files (
+        content_hash TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        pipeline_version TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        transcript_id INTEGER REFERENCES transcripts(id),
+        error TEXT,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX idx_files_path ON files (path);
+    CREATE INDEX idx_transcripts_file_name ON transcripts (file_name);
+    CREATE TABLE legacy_files (
+        file_name TEXT PRIMARY KEY,
+        transcript_id INTEGER NOT NULL REFERENCES transcripts(id)
+    );
+    INSERT INTO legacy_files (file_name, transcript_id)
+    SELECT file_name, max(id) FROM transcripts GROUP BY file_name;
+    """,
+    # 4: Durable ingestion job queue with leases and per-stage checkpoints
+    """
+    CREATE TABLE jobs (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL UNIQUE,
+        path TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        priority INTEGER NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        available_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_expires REAL,
+        stage TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX idx_jobs_ready ON jobs (status, available_at);
+    CREATE TABLE job_checkpoints (
+        job_id INTEGER NOT NULL REFERENCES jobs(id),
+        stage TEXT NOT NULL,
+        data TEXT,
+        PRIMARY KEY (job_id, stage)
+    );
+    """,
+    # 5: Recording duration for shortest-job-first scheduling, and timings for latency stats
+    """
+    ALTER TABLE jobs ADD COLUMN duration REAL;
+    ALTER TABLE jobs ADD COLUMN started_at REAL;
+    ALTER TABLE jobs ADD COLUMN finished_at REAL;
+    """,
+    # 6: Per-recording speaker clusters with their embeddings, linked across recordings by global ID
+    """
+    CREATE TABLE speaker_clusters (
+        id INTEGER PRIMARY KEY,
+        transcript_id INTEGER NOT NULL REFERENCES transcripts(id),
+        label TEXT NOT NULL,
+        speaker TEXT,
+        confidence REAL,
+        embedding_space TEXT,
+        embedding BLOB,
+        global_id TEXT,
+        UNIQUE (transcript_id, label)
+    );
+    CREATE INDEX idx_speaker_clusters_global_id ON speaker_clusters (global_id);
+    """,
+    # 7: Speaking turns of each cluster
+    """
+    ALTER TABLE speaker_clusters ADD COLUMN turns TEXT;
+    """,
+    # 8: Every path registered content was seen at, so copies are not re-hashed on each scan
+    """
+    CREATE TABLE file_paths (
+        path TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL REFERENCES files(content_hash),
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL
+    );
+    CREATE INDEX idx_file_paths_content_hash ON file_paths (content_hash);
+    INSERT INTO file_paths (path, content_hash, size, mtime_ns)
+    SELECT path, content_hash, size, mtime_ns FROM files;
+    """,
+]
+
+# Status of a registered file
+FILE_PENDING = "pending"
+FILE_DONE = "done"
+FILE_FAILED = "failed"
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word, with punctuation treated literally."""
+    return " ".join('"' + token.replace('"', '""') + '"' for token in text.split())
+
+def file_name_for(path: Path, root: Optional[Path] = None) -> str:
+    """Name a recording is stored under: its path relative to `root`, or the full path outside it."""
+    if root is not None:
+        try:
+            return path.relative_to(root).as_posix()
+        except ValueError:
+            pass
+    return str(path)
+
+def transcript_path_for(output_dir: Path, file_name: str) -> Path:
+    """Formatted transcript file of a stored recording, mirroring its subdirectory under `output_dir`."""
+    # urgent/call.wav and call.wav must not share a transcript
+    relative = Path(file_name)
+    if relative.is_absolute():
+        relative = Path(relative.name)
+    return output_dir / relative.parent / f"{relative.stem}_transcript.txt"
 
 @dataclass
 class TranscriptEntry:
@@ -14,13 +251,63 @@ class TranscriptEntry:
     speaker_segments: str  # JSON string of segments
     summary: Optional[str] = None
 
+@dataclass
+class SpeakerClusterEntry:
+    id: int
+    transcript_id: int
+    label: str  # Per-file cluster label, e.g. SPEAKER_01
+    speaker: Optional[str]  # Identified (or promoted) profile name
+    confidence: float
+    embedding_space: Optional[str]
+    embedding: Optional[np.ndarray]
+    global_id: Optional[str] = None  # Archive-wide ID of an unknown speaker, e.g. UNKNOWN_0042
+    turns: Optional[List[List[float]]] = None  # [start, end] of every diarization turn
+
+@dataclass
+class SegmentEntry:
+    transcript_id: int
+    file_name: str
+    timestamp: datetime
+    speaker: Optional[str]
+    start: Optional[float]
+    end: Optional[float]
+    text: Optional[str]
+    confidence: Optional[float]
+
+@dataclass
+class FileRecord:
+    content_hash: str  # Hex SHA-256 of the file content
+    path: str  # Where the content was last seen
+    size: int
+    mtime_ns: int
+    pipeline_version: Optional[str]  # Pipeline that produced the transcript (None if adopted from before the registry)
+    status: str  # FILE_PENDING, FILE_DONE or FILE_FAILED
+    transcript_id: Optional[int] = None
+    error: Optional[str] = None
+
+@dataclass
+class SearchHit:
+    transcript_id: int
+    file_name: str
+    speaker: Optional[str]
+    start: Optional[float]
+    end: Optional[float]
+    snippet: str  # Matching text with hits wrapped in [ ]
+    score: float  # bm25; lower is more relevant
+
 class TranscriptDatabase:
-    def __init__(self, db_path: Union[str, Path]):
+    def __init__(self, db_path: Union[str, Path], connections: Optional[ConnectionManager] = None):
+        """
+        Args:
+            db_path: Database file
+            connections: Connection manager to share with other users of the same file
+        """
         self.db_path = Path(db_path)
+        self.connections = connections or ConnectionManager(self.db_path)
         self.init_db()
         
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS transcripts (
                     id INTEGER PRIMARY KEY,
@@ -31,32 +318,363 @@ class TranscriptDatabase:
                     summary TEXT
                 )
             """)
+            self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Apply the schema migrations this database has not seen yet (inside the caller's transaction)."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            statement = ""
+            for line in script.splitlines(keepends=True):
+                statement += line
+                # Trigger bodies contain ';', so split on complete statements only
+                if sqlite3.complete_statement(statement):
+                    conn.execute(statement)
+                    statement = ""
+            conn.execute(f"PRAGMA user_version = {number}")
             
-    def add_transcript(self, entry: TranscriptEntry):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO transcripts
-                (file_name, timestamp, full_text, speaker_segments, summary)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                entry.file_name,
-                entry.timestamp.isoformat(),
-                entry.full_text,
-                entry.speaker_segments,
-                entry.summary
-            ))
+    def add_transcript(self, entry: TranscriptEntry) -> int:
+        """Insert a transcript and return its id."""
+        return self.add_transcripts([entry])[0]
+
+    def add_transcripts(self, entries: Iterable[TranscriptEntry]) -> List[int]:
+        """
+        Insert many transcripts (and, through the triggers, their segment rows
+        and search index entries) in one transaction.
+
+        Returns:
+            The id of each entry, in order
+        """
+        ids = []
+        with self.connections.transaction() as conn:
+            for entry in entries:
+                cursor = conn.execute("""
+                    INSERT INTO transcripts
+                    (file_name, timestamp, full_text, speaker_segments, summary)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    entry.file_name,
+                    entry.timestamp.isoformat(),
+                    entry.full_text,
+                    entry.speaker_segments,
+                    entry.summary
+                ))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def add_speaker_clusters(self, transcript_id: int, clusters: Iterable) -> None:
+        """Store the diarization clusters (SpeakerCluster objects) of a transcript."""
+        with self.connections.transaction() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO speaker_clusters
+                (transcript_id, label, speaker, confidence, embedding_space, embedding, turns)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                transcript_id,
+                cluster.label,
+                cluster.speaker,
+                cluster.confidence,
+                cluster.embedding_space,
+                np.asarray(cluster.embedding, dtype=np.float32).tobytes() if cluster.embedding is not None else None,
+                json.dumps(cluster.turns)
+            ) for cluster in clusters])
+
+    @staticmethod
+    def _cluster_filter(
+        embedding_space: Optional[str] = None,
+        unknown_only: bool = False,
+        linked: Optional[bool] = None,
+        global_id: Optional[str] = None,
+        transcript_ids: Optional[List[int]] = None,
+        after_id: Optional[int] = None
+    ) -> Tuple[str, List]:
+        """WHERE clause and parameters selecting speaker clusters (see get_speaker_clusters)."""
+        conditions, params = [], []
+        if embedding_space is not None:
+            conditions.append("embedding_space = ?")
+            params.append(embedding_space)
+        if unknown_only:
+            conditions.append("speaker IS NULL AND embedding IS NOT NULL")
+        if linked is not None:
+            conditions.append("global_id IS NOT NULL" if linked else "global_id IS NULL")
+        if global_id is not None:
+            conditions.append("global_id = ?")
+            params.append(global_id)
+        if transcript_ids is not None:
+            conditions.append(f"transcript_id IN ({', '.join('?' * len(transcript_ids))})")
+            params.extend(transcript_ids)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+    def get_speaker_clusters(
+        self,
+        embedding_space: Optional[str] = None,
+        unknown_only: bool = False,
+        linked: Optional[bool] = None,
+        global_id: Optional[str] = None,
+        transcript_ids: Optional[List[int]] = None,
+        after_id: Optional[int] = None
+    ) -> List[SpeakerClusterEntry]:
+        """
+        Stored clusters in insertion order.
+
+        Args:
+            embedding_space: Only clusters embedded in this space
+            unknown_only: Only clusters no profile was matched to
+            linked: Only clusters with (True) or without (False) a global ID
+            global_id: Only the clusters of this global ID
+            transcript_ids: Only the clusters of these transcripts
+            after_id: Only clusters stored after the cluster with this id
+        """
+        where, params = self._cluster_filter(embedding_space, unknown_only, linked, global_id, transcript_ids, after_id)
+
+        conn = self.connections.connection()
+        cursor = conn.execute(f"""
+            SELECT id, transcript_id, label, speaker, confidence, embedding_space, embedding, global_id, turns
+            FROM speaker_clusters {where}
+            ORDER BY id
+        """, params)
+        return [SpeakerClusterEntry(
+            id=row[0],
+            transcript_id=row[1],
+            label=row[2],
+            speaker=row[3],
+            confidence=row[4],
+            embedding_space=row[5],
+            embedding=np.frombuffer(row[6], dtype=np.float32) if row[6] is not None else None,
+            global_id=row[7],
+            turns=json.loads(row[8]) if row[8] else None
+        ) for row in cursor.fetchall()]
+
+    def count_speaker_clusters(
+        self,
+        embedding_space: Optional[str] = None,
+        unknown_only: bool = False,
+        linked: Optional[bool] = None
+    ) -> int:
+        """Number of stored clusters matching the get_speaker_clusters filters."""
+        where, params = self._cluster_filter(embedding_space, unknown_only, linked)
+        conn = self.connections.connection()
+        return conn.execute(f"SELECT count(*) FROM speaker_clusters {where}", params).fetchone()[0]
+
+    def set_cluster_global_ids(self, assignments: List[Tuple[str, int]]) -> None:
+        """Record (global_id, cluster id) assignments."""
+        with self.connections.transaction() as conn:
+            conn.executemany("UPDATE speaker_clusters SET global_id = ? WHERE id = ?", assignments)
+
+    def get_global_ids(self) -> List[str]:
+        conn = self.connections.connection()
+        cursor = conn.execute("SELECT DISTINCT global_id FROM speaker_clusters WHERE global_id IS NOT NULL")
+        return [row[0] for row in cursor.fetchall()]
+
+    def name_global_id(self, global_id: str, name: str) -> None:
+        """Attach a profile name to every cluster of a global ID."""
+        with self.connections.transaction() as conn:
+            conn.execute("UPDATE speaker_clusters SET speaker = ? WHERE global_id = ?", (name, global_id))
             
-    def search_transcripts(self, query: str) -> List[TranscriptEntry]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                SELECT * FROM transcripts
-                WHERE full_text LIKE ? OR summary LIKE ?
-            """, (f"%{query}%", f"%{query}%"))
+    def get_speaker_segments(self, transcript_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        """(file name, speaker segments JSON) of each transcript id."""
+        conn = self.connections.connection()
+        cursor = conn.execute(f"""
+            SELECT id, file_name, speaker_segments FROM transcripts
+            WHERE id IN ({', '.join('?' * len(transcript_ids))})
+        """, transcript_ids)
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def update_speakers(
+        self,
+        transcript_id: int,
+        speaker_segments: str,
+        cluster_identities: List[Tuple[Optional[str], float, int]]
+    ) -> None:
+        """Rewrite a transcript's segments and its clusters' (speaker, confidence, cluster id) together."""
+        with self.connections.transaction() as conn:
+            conn.execute("UPDATE transcripts SET speaker_segments = ? WHERE id = ?",
+                         (speaker_segments, transcript_id))
+            conn.executemany("UPDATE speaker_clusters SET speaker = ?, confidence = ? WHERE id = ?",
+                             cluster_identities)
             
-            return [TranscriptEntry(
-                file_name=row[1],
-                timestamp=datetime.fromisoformat(row[2]),
-                full_text=row[3],
-                speaker_segments=row[4],
-                summary=row[5]
-            ) for row in cursor.fetchall()]
\ No newline at end of file
+    def get_segments(
+        self,
+        speaker: Optional[str] = None,
+        transcript_id: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> List[SegmentEntry]:
+        """
+        Stored segments in transcript and time order, looked up through the segments indexes.
+
+        Args:
+            speaker: Only segments of this speaker (case-insensitive)
+            transcript_id: Only segments of this transcript
+            start: Only segments ending after this time (seconds)
+            end: Only segments starting before this time (seconds)
+        """
+        conditions, params = [], []
+        if speaker is not None:
+            conditions.append("s.speaker = ?")
+            params.append(speaker)
+        if transcript_id is not None:
+            conditions.append("s.transcript_id = ?")
+            params.append(transcript_id)
+        if start is not None:
+            conditions.append('s."end" > ?')
+            params.append(start)
+        if end is not None:
+            conditions.append("s.start < ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self.connections.connection()
+        cursor = conn.execute(f"""
+            SELECT s.transcript_id, t.file_name, t.timestamp, s.speaker, s.start, s."end", s.text, s.confidence
+            FROM segments AS s
+            JOIN transcripts AS t ON t.id = s.transcript_id
+            {where}
+            ORDER BY s.transcript_id, s.start
+        """, params)
+        return [SegmentEntry(
+            transcript_id=row[0],
+            file_name=row[1],
+            timestamp=datetime.fromisoformat(row[2]),
+            speaker=row[3],
+            start=row[4],
+            end=row[5],
+            text=row[6],
+            confidence=row[7]
+        ) for row in cursor.fetchall()]
+
+    def search_transcripts(self, query: str, limit: Optional[int] = None) -> List[TranscriptEntry]:
+        """Transcripts whose text or summary contains every word of `query`, best bm25 match first."""
+        if not query.split():
+            return []
+        conn = self.connections.connection()
+        cursor = conn.execute("""
+            SELECT t.* FROM transcripts_fts
+            JOIN transcripts AS t ON t.id = transcripts_fts.rowid
+            WHERE transcripts_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (fts_query(query), -1 if limit is None else limit))
+            
+        return [TranscriptEntry(
+            file_name=row[1],
+            timestamp=datetime.fromisoformat(row[2]),
+            full_text=row[3],
+            speaker_segments=row[4],
+            summary=row[5]
+        ) for row in cursor.fetchall()]
+
+    def search_segments(self, query: str, speaker: Optional[str] = None, limit: int = 50) -> List[SearchHit]:
+        """
+        Individual speaker segments containing every word of `query`, ranked by bm25.
+
+        Args:
+            query: Free text to search for
+            speaker: Only segments attributed to this speaker
+            limit: Maximum number of hits
+        """
+        if not query.split():
+            return []
+        conn = self.connections.connection()
+        cursor = conn.execute("""
+            SELECT f.transcript_id, t.file_name, f.speaker, f.start, f."end",
+                   snippet(segments_fts, 0, '[', ']', '...', 16), bm25(segments_fts)
+            FROM segments_fts AS f
+            JOIN transcripts AS t ON t.id = f.transcript_id
+            WHERE segments_fts MATCH ? AND (? IS NULL OR f.speaker = ?)
+            ORDER BY rank
+            LIMIT ?
+        """, (fts_query(query), speaker, speaker, limit))
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def get_files(self) -> Dict[str, FileRecord]:
+        """
+        Every registered path with the record of its content.
+
+        Copies of one content each have their own path, size and mtime, and
+        share the content's status.
+        """
+        conn = self.connections.connection()
+        cursor = conn.execute("""
+            SELECT f.content_hash, p.path, p.size, p.mtime_ns, f.pipeline_version, f.status, f.transcript_id, f.error
+            FROM file_paths AS p JOIN files AS f USING (content_hash)
+        """)
+        return {row[1]: FileRecord(*row) for row in cursor.fetchall()}
+
+    def register_files(
+        self,
+        files: Iterable[Tuple[str, str, int, int]],
+        root: Optional[Path] = None
+    ) -> Dict[str, FileRecord]:
+        """
+        Record where (content hash, path, size, mtime_ns) content is now, keeping its status.
+
+        Every path is remembered with its size and mtime, so each copy of the
+        same content is recognised from its stat on later scans.
+
+        Content never seen before is registered as pending. The one exception
+        is the first registration of a path that already had a transcript when
+        the registry was created (matched by its name relative to `root`):
+        that content is adopted as done. Each such legacy transcript is adopted
+        at most once, so a file overwritten later is processed again.
+
+        Args:
+            files: (content hash, path, size, mtime_ns) of each file
+            root: Watched directory that transcript file names are relative to
+
+        Returns:
+            The record of each content hash
+        """
+        files = list(files)
+        now = datetime.now().isoformat()
+        with self.connections.transaction() as conn:
+            for content_hash, path, size, mtime_ns in files:
+                name = file_name_for(Path(path), root)
+                legacy = conn.execute("SELECT transcript_id FROM legacy_files WHERE file_name = ?",
+                                      (name,)).fetchone()
+                if legacy is not None:
+                    conn.execute("DELETE FROM legacy_files WHERE file_name = ?", (name,))
+                conn.execute("""
+                    INSERT INTO files (content_hash, path, size, mtime_ns, status, transcript_id, updated_at)
+                    VALUES (?1, ?2, ?3, ?4,
+                            CASE WHEN ?5 IS NULL THEN 'pending' ELSE 'done' END, ?5, ?6)
+                    ON CONFLICT (content_hash) DO UPDATE
+                    SET path = excluded.path, size = excluded.size, mtime_ns = excluded.mtime_ns
+                """, (content_hash, path, size, mtime_ns, legacy[0] if legacy else None, now))
+                conn.execute("""
+                    INSERT INTO file_paths (path, content_hash, size, mtime_ns) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (path) DO UPDATE
+                    SET content_hash = excluded.content_hash, size = excluded.size, mtime_ns = excluded.mtime_ns
+                """, (path, content_hash, size, mtime_ns))
+
+            records = {}
+            hashes = [f[0] for f in files]
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                cursor = conn.execute(f"""
+                    SELECT content_hash, path, size, mtime_ns, pipeline_version, status, transcript_id, error
+                    FROM files WHERE content_hash IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+                records.update((row[0], FileRecord(*row)) for row in cursor.fetchall())
+            return records
+
+    def set_file_status(
+        self,
+        content_hash: str,
+        status: str,
+        pipeline_version: Optional[str] = None,
+        transcript_id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Record the outcome of processing a registered file."""
+        with self.connections.transaction() as conn:
+            conn.execute("""
+                UPDATE files
+                SET status = ?, pipeline_version = coalesce(?, pipeline_version),
+                    transcript_id = coalesce(?, transcript_id), error = ?, updated_at = ?
+                WHERE content_hash = ?
+            """, (status, pipeline_version, transcript_id, error, datetime.now().isoformat(), content_hash))
@@ -1,17 +1,41 @@
 # src/main.py
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import argparse
 import logging
+import os
+import signal
+import threading
 import time
-import json  # Add this import
 from watchdog.observers import Observer
 from .utils.file_watcher import AudioFileHandler
-from .audio.processor import AudioProcessor
-from .database.transcript_db import TranscriptDatabase, TranscriptEntry
-from datetime import datetime
+from .utils.file_registry import scan_pending
+from .utils.scheduling import DEFAULT_PRIORITY_RULES, priority_for
+from .utils.threads import available_cores
+from .utils.worker_pool import WorkerPool
+from .audio.ingest import run_ingest_worker
+from .audio.loader import probe_duration
+from .audio.profiles import DEFAULT_EMBEDDING_SPACE
+from .audio.unknown_speakers import UnknownSpeakerLinker
+from .database.transcript_db import TranscriptDatabase
+from .database.job_queue import JobQueue, QueueFull, format_latency_report
 
 # src/main.py
 class TranscriptionSystem:
-    def __init__(self, auth_token: str):
+    def __init__(self, auth_token: str, workers: int = 1, poll_interval: float = 5.0,
+                 priority_rules=DEFAULT_PRIORITY_RULES, threads_per_worker: Optional[int] = None,
+                 max_queued: Optional[int] = 64):
+        """
+        Args:
+            auth_token: HuggingFace token for the diarization models
+            workers: Files transcribed concurrently, each in a worker process with its own models
+            poll_interval: Seconds between checks for jobs that became ready
+                (retries after backoff, expired leases)
+            priority_rules: PriorityRules giving files their priority class by subdirectory or name
+            threads_per_worker: CPU threads of each worker (an even share of the cores by default)
+            max_queued: Unfinished jobs beyond which the watcher waits for the workers (unbounded if None)
+        """
         # Setup directories
         self.base_dir = Path(__file__).parent.parent
         self.watch_dir = self.base_dir / "data" / "audio"
@@ -23,66 +47,147 @@ class TranscriptionSystem:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
         # Initialize components
-        self.processor = AudioProcessor(auth_token=auth_token)
+        self.auth_token = auth_token
         self.db = TranscriptDatabase(self.db_path)
         
+        # Link unknown speakers across recordings in the background
+        self.linker = UnknownSpeakerLinker(self.db, DEFAULT_EMBEDDING_SPACE)
+        self.link_interval = 60.0  # Seconds between linking runs
+        
+        # Files become durable jobs: by priority class, then shortest recording first.
+        # Each worker process loads the models once and claims jobs whenever it is idle,
+        # with its own share of the cores so the workers together never oversubscribe them.
+        # The queue is bounded: when it is full the watcher holds files back until workers make room.
+        self.jobs = JobQueue(self.db, max_pending=max_queued)
+        self.priority_rules = priority_rules
+        self.poll_interval = poll_interval
+        threads_per_worker = threads_per_worker or max(1, len(available_cores()) // workers)
+        processor_options = {
+            # Transcription and diarization run side by side within the worker's share
+            "stage_threads": max(1, threads_per_worker // 2)
+        }
+        self.workers = WorkerPool(
+            run_ingest_worker,
+            args=(self.db_path, self.watch_dir, self.output_dir, auth_token, poll_interval, processor_options),
+            workers=workers, threads_per_worker=threads_per_worker, name="ingest")
+        self._stop = threading.Event()
+        
         # Setup file watcher
-        self.handler = AudioFileHandler(self.processor, self.output_dir)
+        self.handler = AudioFileHandler(self.enqueue_file)
         self.observer = Observer()
-        self.observer.schedule(self.handler, str(self.watch_dir), recursive=False)
+        self.observer.schedule(self.handler, str(self.watch_dir), recursive=True)
         
     def start(self):
-        """Start watching for new files"""
+        """Watch for new files until stop() or Ctrl-C, then let queued files finish"""
+        self.workers.start()
         self.observer.start()
         logging.info(f"Started watching directory: {self.watch_dir}")
         
         try:
-            while True:
-                time.sleep(1)
+            last_link = time.monotonic()
+            while not self._stop.wait(self.poll_interval):
+                self.workers.check()
+                if time.monotonic() - last_link >= self.link_interval:
+                    self.link_unknown_speakers()
+                    logging.info(f"Ingest workers: {self.workers.alive} running, {self.workers.restarts} restarted; "
+                                 f"jobs: {self.jobs.stats()}, {self.jobs.throughput():.1f} files/hour")
+                    logging.info("Queue latency by recording duration (s):\n"
+                                 + format_latency_report(self.jobs.latency_report()))
+                    last_link = time.monotonic()
         except KeyboardInterrupt:
+            pass
+        finally:
             self.observer.stop()
             self.observer.join()
+            self.handler.stop()
+            # Claimed jobs finish; the rest stay queued in the database for the next run
+            self.workers.stop()
+            self.link_unknown_speakers()
             
-    def process_existing_files(self):
-        """Process any existing files in the watch directory"""
-        def segment_to_dict(segment):
-            """Convert SpeakerSegment to dictionary"""
-            return {
-                'speaker': segment.speaker,
-                'start': segment.start,
-                'end': segment.end,
-                'text': segment.text,
-                'confidence': segment.confidence
-            }
+    def stop(self):
+        """Ask start() to return (safe to call from a signal handler)"""
+        self._stop.set()
+            
+    def link_unknown_speakers(self):
+        """Give unidentified speakers of newly stored transcripts their global IDs"""
+        try:
+            self.linker.run()
+        except Exception as e:
+            logging.error(f"Linking unknown speakers failed: {e}")
+            
+    def enqueue_file(self, file_path: Path):
+        """Register a detected file and queue a job for it, unless its content is already done"""
+        pending = scan_pending(self.db, [file_path], root=self.watch_dir)
+        while pending:
+            pending = self.queue_files(pending)
+            self.workers.wake()
+            # Queue full: hold the watcher back until the workers make room
+            if pending and self._stop.wait(self.poll_interval):
+                break
 
-        for file_path in self.watch_dir.glob("*"):
-            if file_path.suffix.lower() in {'.mp3', '.wav', '.m4a', '.flac'}:
-                if file_path not in self.handler.processed_files:
-                    logging.info(f"Processing existing file: {file_path}")
-                    result = self.handler.process_file(file_path)
-                    if result:
-                        # Convert speaker segments to JSON-serializable format
-                        serializable_segments = [
-                            segment_to_dict(segment) 
-                            for segment in result["speaker_segments"]
-                        ]
-                    
-                        # Add to database
-                        entry = TranscriptEntry(
-                            file_name=file_path.name,
-                            timestamp=datetime.now(),
-                            full_text=result["full_transcript"],
-                            speaker_segments=json.dumps(serializable_segments),
-                        )
-                        self.db.add_transcript(entry)
+    def queue_files(self, pending):
+        """
+        Queue jobs for (path, content hash) pairs with their priority class and duration.
+
+        Returns:
+            The pairs that did not fit in the queue
+        """
+        # Durations come from the container headers; content that already has a job keeps its own
+        known = set(self.jobs.known([content_hash for _, content_hash in pending]))
+        new = [path for path, content_hash in pending if content_hash not in known]
+        with ThreadPoolExecutor(min(8, len(new) or 1)) as pool:
+            durations = dict(zip(new, pool.map(probe_duration, new)))
+        
+        with self.db.connections.transaction():
+            for i, (file_path, content_hash) in enumerate(pending):
+                try:
+                    self.jobs.enqueue(
+                        content_hash, str(file_path),
+                        priority=priority_for(file_path, self.watch_dir, self.priority_rules),
+                        duration=durations.get(file_path)
+                    )
+                except QueueFull:
+                    return pending[i:]
+        return []
+
+    def process_existing_files(self):
+        """Queue jobs for any existing files in the watch directory that have not been processed"""
+        # Files written to within the quiet period may still be arriving; the watcher admits them
+        recent = time.time() - self.handler.quiet_period
+        settled = []
+        for file_path in sorted(self.watch_dir.rglob("*")):
+            if file_path.is_file() and file_path.stat().st_mtime > recent:
+                self.handler.track(file_path)
+            else:
+                settled.append(file_path)
+        
+        # Files recorded as done (by content) in the registry are skipped
+        pending = scan_pending(self.db, settled, root=self.watch_dir)
+        overflow = self.queue_files(pending)
+        # The watcher admits the rest as the workers make room
+        for file_path, _ in overflow:
+            self.handler.track(file_path)
+        logging.info(f"Queued {len(pending) - len(overflow)} existing files ({len(overflow)} waiting for room); "
+                     f"jobs: {self.jobs.stats()}")
+        self.workers.wake()
 
 def main():
+    parser = argparse.ArgumentParser(description='Watch data/audio and transcribe new recordings')
+    parser.add_argument('--auth-token', default=os.environ.get('HF_TOKEN'),
+                        help='HuggingFace token (defaults to $HF_TOKEN)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('INGEST_WORKERS', 1)),
+                        help='Worker processes, each with its own models (defaults to $INGEST_WORKERS or 1)')
+    parser.add_argument('--threads-per-worker', type=int,
+                        default=int(os.environ['INGEST_THREADS']) if os.environ.get('INGEST_THREADS') else None,
+                        help='CPU threads of each worker (defaults to $INGEST_THREADS or an even share of the cores)')
+    parser.add_argument('--max-queued', type=int, default=64,
+                        help='Unfinished jobs beyond which new files wait for the workers (0 for no limit)')
+    args = parser.parse_args()
     logging.basicConfig(level=logging.INFO)
     
-    # Your HuggingFace token
-    auth_token = "YOUR_TOKEN_HERE"
-    
-    system = TranscriptionSystem(auth_token)
+    system = TranscriptionSystem(args.auth_token, workers=args.workers, threads_per_worker=args.threads_per_worker,
+                                 max_queued=args.max_queued or None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: system.stop())
     
     # Process any existing files first
     system.process_existing_files()
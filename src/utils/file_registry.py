@@ -0,0 +1,68 @@
+# src/utils/file_registry.py
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import logging
+import os
+from ..audio.loader import file_sha256
+from ..database.transcript_db import FILE_DONE, TranscriptDatabase
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac'}
+
+logger = logging.getLogger(__name__)
+
+
+def scan_pending(
+    db: TranscriptDatabase,
+    paths: Iterable[Path],
+    workers: Optional[int] = None,
+    root: Optional[Path] = None
+) -> List[Tuple[Path, str]]:
+    """
+    Audio files among `paths` that still need processing, with their content hash.
+
+    A file whose path, size and mtime match its registry row is judged from
+    the row alone. Only new or changed files are read and hashed (in a thread
+    pool), then registered. Content that is already done is skipped wherever
+    it now lives, so renamed or copied recordings are not processed twice.
+
+    Args:
+        db: Database holding the file registry
+        paths: Candidate files
+        workers: Hashing threads (defaults to the CPU count, at most 8)
+        root: Watched directory that transcript file names are relative to
+    """
+    known = db.get_files()
+    pending, to_hash = [], []
+    seen = set()  # Content already returned; copies are processed once
+    skipped = 0
+    for path in paths:
+        if path.suffix.lower() not in AUDIO_EXTENSIONS or not path.is_file():
+            continue
+        stat = path.stat()
+        record = known.get(str(path))
+        if record is not None and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+            if record.status == FILE_DONE or record.content_hash in seen:
+                skipped += 1
+            else:
+                pending.append((path, record.content_hash))
+                seen.add(record.content_hash)
+        else:
+            to_hash.append((path, stat))
+
+    if to_hash:
+        with ThreadPoolExecutor(workers or min(8, os.cpu_count() or 1)) as pool:
+            hashes = list(pool.map(file_sha256, [path for path, _ in to_hash]))
+        records = db.register_files([
+            (content_hash, str(path), stat.st_size, stat.st_mtime_ns)
+            for (path, stat), content_hash in zip(to_hash, hashes)
+        ], root)
+        for (path, _), content_hash in zip(to_hash, hashes):
+            if records[content_hash].status == FILE_DONE or content_hash in seen:
+                skipped += 1
+            else:
+                pending.append((path, content_hash))
+            seen.add(content_hash)
+
+    logger.info(f"File scan: {len(pending)} to process, {skipped} already done, {len(to_hash)} hashed")
+    return pending
@@ -1,44 +1,134 @@
 # src/utils/file_watcher.py
 from pathlib import Path
-from typing import Set, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import os
+import threading
 import time
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from .file_registry import AUDIO_EXTENSIONS
 
 class AudioFileHandler(FileSystemEventHandler):
-    def __init__(self, processor, output_dir: Path):
-        self.processor = processor
-        self.output_dir = output_dir
+    """
+    Admits audio files that appear in the watched directory once they are complete.
+
+    Created, modified and moved-in events only mark a path as changing. A
+    background thread polls the marked paths and admits a file once its size
+    and mtime have not changed for `quiet_period` seconds. Files still being
+    uploaded or copied are therefore never read half-written, and a burst of
+    events for one file (or a temp file renamed into place) admits it once.
+    """
+
+    def __init__(
+        self,
+        on_file: Callable[[Path], None],
+        quiet_period: float = 2.0,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            on_file: Called with each admitted file (e.g. to queue a job for it)
+            quiet_period: Seconds a file's size and mtime must stay unchanged
+            poll_interval: Seconds between checks of changing files (a quarter of the quiet period by default)
+        """
+        self.on_file = on_file
+        self.quiet_period = quiet_period
+        self.poll_interval = poll_interval or max(0.05, quiet_period / 4)
         self.logger = logging.getLogger(__name__)
-        self.processed_files: Set[Path] = set()
+
+        # Changing path -> (size, mtime_ns) last seen, and when it was last seen to change
+        self._pending: Dict[Path, Tuple[Optional[Tuple[int, int]], float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
         
-    def process_file(self, file_path: Path):
-        try:
-            # Process the audio file
-            result = self.processor.process_audio(file_path, language="en")
-            
-            # Create output filename
-            transcript_path = self.output_dir / f"{file_path.stem}_transcript.txt"
-            
-            # Save formatted transcript
-            with open(transcript_path, "w", encoding="utf-8") as f:
-                f.write(result["formatted_transcript"])
-                
-            self.logger.info(f"Processed and saved transcript: {transcript_path}")
-            self.processed_files.add(file_path)
-            
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Failed to process {file_path}: {str(e)}")
-            return None
+    def track(self, path: Union[str, bytes]) -> None:
+        """Mark an audio path as changing; it is admitted after it has been quiet."""
+        file_path = Path(os.fsdecode(path))
+        if file_path.suffix.lower() not in AUDIO_EXTENSIONS:
+            return
+        with self._lock:
+            if file_path not in self._pending:
+                self.logger.info(f"New audio file detected: {file_path}")
+            self._pending[file_path] = (None, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="watcher-debounce", daemon=True)
+                self._thread.start()
+
+    def _forget(self, path: Union[str, bytes]) -> None:
+        with self._lock:
+            self._pending.pop(Path(os.fsdecode(path)), None)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Checking changed files failed: {e}")
+
+    def poll(self, now: Optional[float] = None) -> List[Path]:
+        """
+        Admit the changing files that have been stable for the quiet period.
+
+        Returns:
+            The admitted files (those whose on_file callback succeeded)
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            for file_path, (signature, since) in list(self._pending.items()):
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    del self._pending[file_path]
+                    continue
+                current = (stat.st_size, stat.st_mtime_ns)
+                if current != signature:
+                    self._pending[file_path] = (current, now)
+                elif stat.st_size > 0 and now - since >= self.quiet_period:
+                    del self._pending[file_path]
+                    ready.append(file_path)
+
+        admitted = []
+        for file_path in ready:
+            self.logger.info(f"Audio file complete: {file_path}")
+            try:
+                self.on_file(file_path)
+            except Exception as e:
+                # Not lost: the file is offered again after another quiet period
+                self.logger.error(f"Admitting {file_path} failed, will retry: {e}")
+                self.track(file_path)
+            else:
+                admitted.append(file_path)
+        return admitted
+
+    @property
+    def pending(self) -> int:
+        """Files seen changing and not admitted yet."""
+        return len(self._pending)
+
+    def stop(self) -> None:
+        """Stop checking changing files (those not yet admitted are left for the startup scan)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
 
     def on_created(self, event):
-        if event.is_directory:
-            return
-            
-        file_path = Path(event.src_path)
-        if file_path.suffix.lower() in {'.mp3', '.wav', '.m4a', '.flac'}:
-            self.logger.info(f"New audio file detected: {file_path}")
-            self.process_file(file_path)
\ No newline at end of file
+        if not event.is_directory:
+            self.track(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.track(event.src_path)
+
+    def on_moved(self, event):
+        # Temp file renamed into place, or a file moved into the directory
+        if not event.is_directory:
+            self._forget(event.src_path)
+            self.track(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._forget(event.src_path)
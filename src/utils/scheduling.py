@@ -0,0 +1,46 @@
+# src/utils/scheduling.py
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+@dataclass(frozen=True)
+class PriorityRule:
+    """
+    Priority class for files matching a glob.
+
+    The pattern is matched against the path relative to the watched
+    directory (with forward slashes) and against the bare file name, so both
+    "urgent/*" and "*_urgent.wav" work. `*` also matches across subdirectories.
+    """
+    pattern: str
+    priority: int
+
+
+# Drop a recording into urgent/ to have it transcribed first, into backlog/ to have it wait
+DEFAULT_PRIORITY_RULES = (
+    PriorityRule("urgent/*", 10),
+    PriorityRule("backlog/*", -10),
+)
+
+
+def priority_for(path: Path, root: Optional[Path], rules: Iterable[PriorityRule]) -> int:
+    """
+    Priority class of a file: that of the first matching rule, 0 if none match.
+
+    Args:
+        path: The file
+        root: Watched directory the patterns are relative to (None to match names only)
+        rules: Rules in order of precedence
+    """
+    relative = None
+    if root is not None:
+        try:
+            relative = path.relative_to(root).as_posix()
+        except ValueError:
+            pass
+    for rule in rules:
+        if (relative is not None and fnmatch(relative, rule.pattern)) or fnmatch(path.name, rule.pattern):
+            return rule.priority
+    return 0
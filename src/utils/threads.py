@@ -0,0 +1,76 @@
+# src/utils/threads.py
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import os
+import sys
+from threadpoolctl import threadpool_limits
+
+# Read by OpenMP (torch's intra-op pool), MKL, OpenBLAS and numexpr when they are loaded
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def available_cores() -> List[int]:
+    """CPU cores this process may run on (respects affinity masks and cpusets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(workers: int, threads_per_worker: Optional[int] = None) -> List[List[int]]:
+    """
+    Split the available cores into disjoint sets, one per worker.
+
+    Args:
+        workers: Number of worker processes
+        threads_per_worker: Cores per worker (an even share by default)
+
+    Returns:
+        Each worker's cores; workers beyond the core count share them round-robin
+    """
+    cores = available_cores()
+    size = threads_per_worker or max(1, len(cores) // workers)
+    return [[cores[(i * size + j) % len(cores)] for j in range(size)] for i in range(workers)]
+
+
+@contextmanager
+def thread_env(num_threads: int) -> Iterator[None]:
+    """
+    Set the thread-count variables while the block runs.
+
+    Child processes started inside the block see them before any numeric
+    library is imported, which is the only time OpenMP reads them.
+    """
+    saved: Dict[str, Optional[str]] = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(num_threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def limit_threads(num_threads: int) -> None:
+    """
+    Cap every thread pool of this process at `num_threads`.
+
+    Covers BLAS/OpenMP pools already loaded (through threadpoolctl), those
+    loaded later (through the environment) and torch's own pools.
+    """
+    os.environ.update({name: str(num_threads) for name in THREAD_ENV_VARS})
+    threadpool_limits(num_threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(num_threads)
+        except RuntimeError:
+            pass  # Only allowed before torch runs its first parallel operation
@@ -0,0 +1,139 @@
+# src/utils/worker_pool.py
+from typing import Any, Callable, List, Optional, Sequence
+import logging
+import multiprocessing
+import os
+import signal
+from .threads import available_cores, limit_threads, partition_cores, thread_env
+
+
+def _bootstrap(
+    target: Callable[..., None],
+    index: int,
+    threads: int,
+    cores: Optional[List[int]],
+    stop,
+    wake,
+    args: Sequence[Any]
+) -> None:
+    # Ctrl-C reaches the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    limit_threads(threads)
+    target(index, stop, wake, *args)
+
+
+class WorkerPool:
+    """
+    Fixed set of worker processes, each with its own share of the CPU.
+
+    Worker i runs `target(i, stop, wake, *args)` in a spawned process, so it
+    loads its own models once and keeps them. The cores are split evenly:
+    each worker's BLAS, OpenMP and torch thread pools are capped at its
+    share (set in the environment before the child imports anything, then
+    enforced again in the child), and on Linux the worker is pinned to its
+    own cores, so N workers never run more than the core count of threads.
+    Workers coordinate through shared state of their own (e.g. a job
+    queue); the pool only signals them: `wake` when there is new work,
+    `stop` when they should finish what they are doing and exit.
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        args: Sequence[Any] = (),
+        workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        pin_cores: bool = True,
+        name: str = "worker"
+    ):
+        """
+        Args:
+            target: Top-level function run in each worker (it must be picklable)
+            args: Extra arguments passed to `target`
+            workers: Number of worker processes
+            threads_per_worker: Threads each worker may use (an even share of the cores by default)
+            pin_cores: Pin each worker to its own cores, where the platform allows it
+            name: Prefix of the process names
+        """
+        self.logger = logging.getLogger(__name__)
+        self.target = target
+        self.args = tuple(args)
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, len(available_cores()) // workers)
+        self.cores = partition_cores(workers, self.threads_per_worker) if pin_cores else [None] * workers
+        self.name = name
+
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._wakes = [self._context.Event() for _ in range(workers)]
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * workers
+        self.restarts = 0
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=_bootstrap,
+            args=(self.target, index, self.threads_per_worker, self.cores[index],
+                  self._stop, self._wakes[index], self.args),
+            name=f"{self.name}-{index}",
+            daemon=True
+        )
+        with thread_env(self.threads_per_worker):
+            process.start()
+        self._processes[index] = process
+
+    def start(self) -> None:
+        """Start every worker."""
+        for index in range(self.workers):
+            self._spawn(index)
+        self.logger.info(
+            f"Started {self.workers} {self.name} processes with {self.threads_per_worker} threads each")
+
+    def wake(self) -> None:
+        """Tell every worker there may be new work."""
+        for event in self._wakes:
+            event.set()
+
+    @property
+    def alive(self) -> int:
+        """Workers currently running."""
+        return sum(1 for process in self._processes if process is not None and process.is_alive())
+
+    def check(self) -> int:
+        """
+        Restart workers that died (e.g. killed for running out of memory).
+
+        Returns:
+            The number of workers restarted
+        """
+        if self._stop.is_set():
+            return 0
+        restarted = 0
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                self.logger.warning(f"{process.name} exited with code {process.exitcode}; restarting")
+                self._spawn(index)
+                restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Ask the workers to exit and wait for them.
+
+        Args:
+            timeout: Seconds to wait for each worker before terminating it (wait forever if None)
+        """
+        self._stop.set()
+        self.wake()
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                self.logger.warning(f"{process.name} did not stop in time; terminating")
+                process.terminate()
+                process.join()
+        self._processes = [None] * self.workers
+        self.logger.info(f"{self.name} processes stopped")
@@ -1,5 +1,6 @@
 # test_base.py
 from src.audio.diarizer import SpeakerDiarizer
+from src.audio.loader import load_audio, SAMPLE_RATE
 from pathlib import Path
 import logging
 
@@ -16,11 +17,11 @@ def test_audio_loading():
     
     if audio_path.exists():
         try:
-            # Try to convert to WAV
-            wav_path = diarizer._convert_to_wav(audio_path)
-            print(f"Successfully converted to WAV: {wav_path}")
+            # Try to decode into memory
+            audio = load_audio(audio_path)
+            print(f"Successfully decoded {len(audio) / SAMPLE_RATE:.1f}s of audio")
         except Exception as e:
-            print(f"Error converting audio: {e}")
+            print(f"Error decoding audio: {e}")
 
 def test_pipeline_loading():
     auth_token = "Yhf_rbRuwCCgUJjNlkBqWmjJPvfrEiWrBGXFvz"  # Your HF token
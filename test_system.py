@@ -26,14 +26,8 @@ def test_transcription_system():
     print("\nProcessing any existing files...")
     system.process_existing_files()
     
-    # Print results
-    print("\nResults:")
-    if system.handler.processed_files:
-        print("\nProcessed files:")
-        for file in system.handler.processed_files:
-            print(f"- {file}")
-    else:
-        print("No files processed")
+    # Transcription happens in the worker processes started by system.start()
+    print(f"\nJobs: {system.jobs.stats()}")
     
     # List generated transcripts
     print("\nGenerated transcripts:")
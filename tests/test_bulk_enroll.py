@@ -0,0 +1,72 @@
+# tests/test_bulk_enroll.py
+import numpy as np
+from src.audio import bulk_enroll
+from src.audio.bulk_enroll import collect_clips, enroll
+from src.audio.loader import file_sha256
+from src.audio.profile_store import ProfileStore
+
+class FakeIdentifier:
+    """Embeds a waveform as its first samples, so every clip gets a distinct vector."""
+    embedding_space = "test/embedding"
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_waveforms(self, waveforms, batch_size=32):
+        self.batches.append(len(waveforms))
+        return np.stack([waveform[:4] for waveform in waveforms]) if waveforms else np.zeros((0, 4))
+
+def write_clip(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(bytes([value]) * 16)
+    return path
+
+def fake_decode(path):
+    data = path.read_bytes()
+    return None if data[0] == 0 else np.frombuffer(data, np.uint8).astype(np.float32)
+
+def test_collect_clips_from_directory_and_csv(tmp_path):
+    clips = tmp_path / "clips"
+    alice = write_clip(clips / "alice" / "a.wav", 1)
+    bob = write_clip(clips / "bob" / "b.MP3", 2)
+    write_clip(clips / "bob" / "notes.txt", 3)
+    write_clip(clips / "stray.wav", 4)
+    assert collect_clips(clips) == [(alice, "alice"), (bob, "bob")]
+
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("path,name\nclips/alice/a.wav, Alice \nclips/bob/b.MP3,Bob\n", encoding="utf-8")
+    assert collect_clips(manifest) == [(alice.resolve(), "Alice"), (bob.resolve(), "Bob")]
+
+def test_enroll_skips_known_clips_and_writes_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_enroll, "_decode", fake_decode)
+    store = ProfileStore(tmp_path / "store")
+    identifier = FakeIdentifier()
+    known = write_clip(tmp_path / "alice" / "known.wav", 1)
+    store.append(["alice"], np.ones((1, 4)), [str(known)], identifier.embedding_space,
+                 [{"hash": file_sha256(known)}])
+    clips = [
+        (known, "alice"),
+        (write_clip(tmp_path / "alice" / "new.wav", 2), "alice"),
+        (write_clip(tmp_path / "bob" / "b.wav", 3), "bob"),
+        (write_clip(tmp_path / "bob" / "copy.wav", 3), "bob"),  # Same content as b.wav
+        (write_clip(tmp_path / "bob" / "broken.wav", 0), "bob"),  # Fails to decode
+    ]
+    appends = []
+    append = store.append
+    monkeypatch.setattr(store, "append", lambda *args, **kwargs: appends.append(args) or append(*args, **kwargs))
+
+    assert enroll(identifier, store, clips, workers=2, batch_size=2) == 2
+    assert len(appends) == 1 and identifier.batches == [2, 0]
+    assert [r["name"] for r in store.records] == ["alice", "alice", "bob"]
+    assert store.content_hashes(identifier.embedding_space) == {file_sha256(path) for path, _ in clips[:3]}
+
+    # A second run finds nothing new and does not touch the store
+    assert enroll(identifier, store, clips, workers=2) == 0
+    assert len(appends) == 1
+
+def test_known_clips_are_per_embedding_space(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_enroll, "_decode", fake_decode)
+    store = ProfileStore(tmp_path / "store")
+    clip = write_clip(tmp_path / "alice" / "a.wav", 5)
+    store.append(["alice"], np.ones((1, 4)), [str(clip)], "other/space", [{"hash": file_sha256(clip)}])
+    assert enroll(FakeIdentifier(), store, [(clip, "alice")]) == 1
@@ -0,0 +1,39 @@
+# tests/test_connection.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+from src.database.connection import ConnectionManager
+from src.database.transcript_db import TranscriptDatabase, TranscriptEntry
+
+def entry(i):
+    return TranscriptEntry(f"{i}.wav", datetime.now(), f"note {i}",
+                           f'[{{"speaker": "A", "start": 0.0, "end": 1.0, "text": "note {i}"}}]')
+
+def test_connections_use_wal_and_are_reused_per_thread(tmp_path):
+    manager = ConnectionManager(tmp_path / "db.sqlite")
+    conn = manager.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert manager.connection() is conn
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(manager.connection).result() is not conn
+    manager.close()
+
+def test_transactions_roll_back_and_nest(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    with pytest.raises(RuntimeError):
+        with db.connections.transaction():
+            db.add_transcript(entry(0))
+            db.add_transcript(entry(1))  # Joins the outer transaction
+            raise RuntimeError
+    assert db.search_transcripts("note") == [] and db.get_segments() == []
+
+    assert db.add_transcripts(entry(i) for i in range(3)) == [1, 2, 3]
+    assert len(db.get_segments(speaker="a")) == 3
+
+def test_concurrent_writers_wait_instead_of_failing(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: db.add_transcripts([entry(i), entry(i + 100)]), range(40)))
+    # A second manager on the same file (as another process would have)
+    other = TranscriptDatabase(tmp_path / "transcripts.db")
+    assert len(other.search_transcripts("note")) == 80
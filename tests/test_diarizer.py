@@ -0,0 +1,115 @@
+# tests/test_diarizer.py
+import logging
+import numpy as np
+import pytest
+from src.audio.diarizer import SpeakerDiarizer
+from src.audio.profiles import SpeakerProfile
+from src.audio.speaker_identity import SpeakerIdentifier
+
+SAMPLE_RATE = 100
+ALICE, BOB, UNKNOWN = np.eye(3, dtype=np.float32)
+
+class Turn:
+    def __init__(self, start, end):
+        self.start, self.end, self.duration = start, end, end - start
+
+class FakeAnnotation:
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    def itertracks(self, yield_label=False):
+        return iter(self.tracks)
+
+    def labels(self):
+        return sorted({label for _, _, label in self.tracks})
+
+class FakePipeline:
+    """Diarizes every file into the same turns, optionally with per-cluster embeddings."""
+    def __init__(self, tracks, embeddings=None):
+        self.annotation = FakeAnnotation(tracks)
+        self.embeddings = embeddings
+
+    def __call__(self, file, return_embeddings=False):
+        return (self.annotation, self.embeddings) if return_embeddings else self.annotation
+
+class RecordingIdentifier(SpeakerIdentifier):
+    """Real profile matching; embeddings come from each waveform's first sample."""
+    def __init__(self, voices, embedding_space="pyannote/embedding", turn_matches=None):
+        super().__init__(None, "cpu", embedding_model=object(), embedding_space=embedding_space)
+        self.voices = voices
+        self.turn_matches = turn_matches or {}
+        self.matched, self.embedded, self.turns = [], [], []
+
+    def embed_waveforms(self, waveforms, batch_size=32):
+        self.embedded.append(len(waveforms))
+        return np.stack([self.voices[int(w[0])] for w in waveforms])
+
+    def match_batch(self, embeddings):
+        self.matched.append(len(embeddings))
+        return super().match_batch(embeddings)
+
+    def identify_speakers(self, waveforms):
+        self.turns.extend(int(w[0]) for w in waveforms)
+        return [self.turn_matches.get(int(w[0]), (None, 0.0)) for w in waveforms]
+
+def profile(name, embedding, space="pyannote/embedding"):
+    return SpeakerProfile(name, [embedding], [f"{name}.wav"], embedding_space=space)
+
+def make_diarizer(monkeypatch, identifier, pipeline, **options):
+    monkeypatch.setattr(SpeakerDiarizer, "_waveform_file",
+                        staticmethod(lambda audio, sample_rate: {"waveform": audio, "sample_rate": sample_rate}))
+    diarizer = SpeakerDiarizer.__new__(SpeakerDiarizer)
+    diarizer.logger = logging.getLogger("test")
+    diarizer.identification_mode = "cluster"
+    diarizer.cluster_sample_seconds = 30.0
+    diarizer.turn_override_threshold = options.get("turn_override_threshold")
+    diarizer.reuse_pipeline_embeddings = options.get("reuse_pipeline_embeddings", False)
+    diarizer.pipeline = pipeline
+    diarizer.speaker_identifier = identifier
+    return diarizer
+
+# Three turns, each filled with a voice id that the identifier maps to an embedding
+TRACKS = [(Turn(0, 2), "A", "SPEAKER_00"), (Turn(2, 4), "B", "SPEAKER_01"), (Turn(4, 6), "C", "SPEAKER_00")]
+AUDIO = np.repeat(np.array([0, 1, 2], dtype=np.float32), 2 * SAMPLE_RATE)
+
+def test_each_cluster_is_matched_once(monkeypatch):
+    identifier = RecordingIdentifier({0: ALICE, 1: BOB, 2: ALICE})
+    identifier.speakers = {"alice": profile("alice", ALICE), "bob": profile("bob", BOB)}
+    diarizer = make_diarizer(monkeypatch, identifier, FakePipeline(TRACKS))
+
+    segments = diarizer.diarize(AUDIO, SAMPLE_RATE)
+    assert [s.speaker for s in segments] == ["alice", "bob", "alice"]
+    assert [s.cluster for s in segments] == ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00"]
+    # One embedding batch for the sampled turns and one match for both clusters
+    assert identifier.embedded == [3]
+    assert identifier.matched == [2]
+    assert identifier.turns == []
+
+def test_low_confidence_clusters_fall_back_to_turns(monkeypatch):
+    identifier = RecordingIdentifier({0: ALICE, 1: UNKNOWN, 2: ALICE}, turn_matches={1: ("bob", 0.8)})
+    identifier.speakers = {"alice": profile("alice", ALICE), "bob": profile("bob", BOB)}
+    diarizer = make_diarizer(monkeypatch, identifier, FakePipeline(TRACKS), turn_override_threshold=0.5)
+
+    segments = diarizer.diarize(AUDIO, SAMPLE_RATE)
+    # Only the turn of the weak cluster is re-identified
+    assert identifier.turns == [1]
+    assert [(s.speaker, s.confidence) for s in segments] == [
+        ("alice", pytest.approx(1.0)), ("bob", 0.8), ("alice", pytest.approx(1.0))]
+
+def test_pipeline_embeddings_only_match_profiles_from_the_same_space(monkeypatch):
+    identifier = RecordingIdentifier({}, embedding_space="pyannote/wespeaker")
+    identifier.speakers = {
+        "alice": profile("alice", ALICE, "pyannote/wespeaker"),
+        "bob": profile("bob", BOB),  # Enrolled with another model, so not comparable
+    }
+    pipeline = FakePipeline(TRACKS, embeddings=np.stack([ALICE, BOB]))
+    diarizer = make_diarizer(monkeypatch, identifier, pipeline, reuse_pipeline_embeddings=True)
+
+    segments, clusters = diarizer.diarize(AUDIO, SAMPLE_RATE, return_clusters=True)
+    assert [s.speaker for s in segments] == ["alice", "SPEAKER_01", "alice"]
+    # The pipeline's centroids are matched directly, without embedding any audio
+    assert identifier.embedded == []
+    assert identifier.matched == [2]
+    assert {c.label: c.speaker for c in clusters} == {"SPEAKER_00": "alice", "SPEAKER_01": None}
+    assert all(c.embedding_space == "pyannote/wespeaker" for c in clusters)
+    np.testing.assert_array_equal(clusters[1].embedding, BOB)
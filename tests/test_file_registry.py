@@ -0,0 +1,89 @@
+# tests/test_file_registry.py
+from datetime import datetime
+import os
+import sqlite3
+from src.database.transcript_db import FILE_DONE, TranscriptDatabase, TranscriptEntry
+from src.utils.file_registry import scan_pending
+
+def write(path, data):
+    path.write_bytes(data)
+    return path
+
+def test_scan_skips_done_files_and_only_hashes_changes(tmp_path, monkeypatch):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    audio = tmp_path / "audio"
+    audio.mkdir()
+    a = write(audio / "a.wav", b"first")
+    b = write(audio / "b.mp3", b"second")
+    write(audio / "notes.txt", b"ignored")
+
+    pending = scan_pending(db, sorted(audio.iterdir()))
+    assert [p for p, _ in pending] == [a, b]
+    db.set_file_status(pending[0][1], FILE_DONE, "1", transcript_id=None)
+
+    # Unchanged files are judged from their stat alone
+    hashed = []
+    monkeypatch.setattr("src.utils.file_registry.file_sha256", lambda p: hashed.append(p) or "x")
+    assert scan_pending(db, sorted(audio.iterdir())) == [(b, pending[1][1])]
+    assert hashed == []
+    monkeypatch.undo()
+
+    # A renamed copy of done content is skipped; changed content is processed again
+    os.rename(a, audio / "renamed.wav")
+    write(b, b"second, edited")
+    assert [p for p, _ in scan_pending(db, sorted(audio.iterdir()))] == [b]
+
+def test_identical_copies_are_not_rehashed(tmp_path, monkeypatch):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    first = write(tmp_path / "first.wav", b"same recording")
+    copy = write(tmp_path / "copy.wav", b"same recording")
+    assert [p for p, _ in scan_pending(db, [first, copy])] == [first]
+
+    hashed = []
+    monkeypatch.setattr("src.utils.file_registry.file_sha256", lambda p: hashed.append(p) or "x")
+    assert [p for p, _ in scan_pending(db, [first, copy])] == [first]
+    assert hashed == []
+    assert {r.content_hash for r in db.get_files().values()} == {scan_pending(db, [first])[0][1]}
+
+def make_legacy_db(path, *file_names):
+    """A database from before the registry, holding a transcript for each file name."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE transcripts (
+            id INTEGER PRIMARY KEY, file_name TEXT NOT NULL, timestamp DATETIME NOT NULL,
+            full_text TEXT NOT NULL, speaker_segments TEXT NOT NULL, summary TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO transcripts (file_name, timestamp, full_text, speaker_segments) "
+                     "VALUES (?, ?, '', '[]')", [(name, datetime.now().isoformat()) for name in file_names])
+    conn.commit()
+    conn.close()
+    return TranscriptDatabase(path)
+
+def test_transcripts_from_before_the_registry_are_adopted_once(tmp_path):
+    audio = tmp_path / "audio"
+    (audio / "sub").mkdir(parents=True)
+    db = make_legacy_db(tmp_path / "transcripts.db", "old.wav")
+    old = write(audio / "old.wav", b"audio")
+    other = write(audio / "sub" / "old.wav", b"another recording")
+
+    # Only the path the transcript was stored under is adopted
+    assert [p for p, _ in scan_pending(db, [old, other], root=audio)] == [other]
+    record = db.get_files()[str(old)]
+    assert (record.status, record.transcript_id, record.pipeline_version) == (FILE_DONE, 1, None)
+
+    # New content at an adopted path is a new recording
+    write(old, b"overwritten with a new recording")
+    assert [p for p, _ in scan_pending(db, [old], root=audio)] == [old]
+
+def test_new_content_is_pending_despite_a_transcript_of_the_same_name(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    memo = write(tmp_path / "memo.wav", b"first")
+    [(_, content_hash)] = scan_pending(db, [memo], root=tmp_path)
+    transcript_id = db.add_transcript(TranscriptEntry("memo.wav", datetime.now(), "", "[]"))
+    db.set_file_status(content_hash, FILE_DONE, "1", transcript_id)
+    assert scan_pending(db, [memo], root=tmp_path) == []
+
+    # Editing a processed file queues it again
+    write(memo, b"second recording")
+    assert [p for p, _ in scan_pending(db, [memo], root=tmp_path)] == [memo]
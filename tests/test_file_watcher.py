@@ -0,0 +1,82 @@
+# tests/test_file_watcher.py
+import os
+import time
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, FileMovedEvent
+from watchdog.observers import Observer
+from src.utils.file_watcher import AudioFileHandler
+
+def make_handler(tmp_path, **kwargs):
+    admitted = []
+    handler = AudioFileHandler(admitted.append, **kwargs)
+    return handler, admitted
+
+def test_files_are_admitted_once_after_a_quiet_period(tmp_path):
+    handler, admitted = make_handler(tmp_path, quiet_period=10.0, poll_interval=3600)
+    audio = tmp_path / "talk.wav"
+    audio.write_bytes(b"part")
+    handler.on_created(FileCreatedEvent(str(audio)))
+    handler.on_modified(FileModifiedEvent(str(audio)))
+    assert handler.poll(now=0.0) == []  # First sighting
+
+    with open(audio, "ab") as f:
+        f.write(b" more")
+    assert handler.poll(now=9.0) == []  # Still growing: the quiet period restarts
+    assert handler.poll(now=18.0) == []
+    assert handler.poll(now=19.0) == [audio]
+    assert admitted == [audio] and handler.pending == 0
+
+    # A temp file renamed into place is admitted under its final name; other files are ignored
+    temp = tmp_path / "upload.part"
+    temp.write_bytes(b"data")
+    handler.on_created(FileCreatedEvent(str(temp)))
+    final = tmp_path / "upload.mp3"
+    os.rename(temp, final)
+    handler.on_moved(FileMovedEvent(str(temp), str(final)))
+    handler.poll(now=20.0)
+    assert handler.poll(now=30.0) == [final]
+    handler.stop()
+
+def test_burst_of_writes_produces_one_admission_per_file(tmp_path):
+    handler, admitted = make_handler(tmp_path, quiet_period=0.3, poll_interval=0.05)
+    observer = Observer()
+    observer.schedule(handler, str(tmp_path), recursive=False)
+    observer.start()
+    try:
+        for name in ("a.wav", "b.flac"):
+            with open(tmp_path / name, "wb") as f:
+                for _ in range(5):
+                    f.write(b"x" * 1024)
+                    f.flush()
+                    time.sleep(0.05)
+        deadline = time.monotonic() + 5
+        while len(admitted) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.5)
+    finally:
+        observer.stop()
+        observer.join()
+        handler.stop()
+    assert sorted(p.name for p in admitted) == ["a.wav", "b.flac"]
+
+def test_failed_admission_is_retried_without_dropping_the_batch(tmp_path):
+    admitted, failures = [], ["a.wav"]
+
+    def on_file(path):
+        if path.name in failures:
+            failures.remove(path.name)
+            raise RuntimeError("database is locked")
+        admitted.append(path)
+
+    handler = AudioFileHandler(on_file, quiet_period=1.0, poll_interval=3600)
+    files = [tmp_path / "a.wav", tmp_path / "b.wav"]
+    for audio in files:
+        audio.write_bytes(b"data")
+        handler.track(audio)
+    handler.poll(now=0.0)
+    assert handler.poll(now=2.0) == [files[1]]
+    assert handler.pending == 1
+
+    handler.poll(now=3.0)
+    assert handler.poll(now=5.0) == [files[0]]
+    assert admitted == [files[1], files[0]] and handler.pending == 0
+    handler.stop()
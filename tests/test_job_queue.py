@@ -0,0 +1,97 @@
+# tests/test_job_queue.py
+import multiprocessing
+import time
+import pytest
+from src.database.job_queue import JOB_DONE, JOB_FAILED, JOB_QUEUED, JobQueue, LeaseLost, QueueFull
+from src.database.transcript_db import TranscriptDatabase
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(TranscriptDatabase(tmp_path / "transcripts.db"), **kwargs)
+
+def test_claims_follow_priority_and_age_and_enqueue_is_idempotent(tmp_path):
+    jobs = make_queue(tmp_path)
+    first = jobs.enqueue("a", "a.wav")
+    second = jobs.enqueue("b", "b.wav", priority=1)
+    assert jobs.enqueue("a", "moved/a.wav") == first
+
+    assert jobs.claim("w").id == second
+    job = jobs.claim("w")
+    assert (job.id, job.path, job.attempts) == (first, "moved/a.wav", 1)
+    assert jobs.claim("w") is None
+    jobs.complete(job, "w")
+    assert jobs.stats()[JOB_DONE] == 1
+
+def test_enqueue_is_bounded_by_unfinished_jobs(tmp_path):
+    jobs = make_queue(tmp_path, max_pending=2)
+    jobs.enqueue("a", "a.wav")
+    jobs.enqueue("b", "b.wav")
+    with pytest.raises(QueueFull):
+        jobs.enqueue("c", "c.wav")
+    jobs.enqueue("a", "moved/a.wav")  # Known content is only updated
+
+    job = jobs.claim("w")
+    with pytest.raises(QueueFull):
+        jobs.enqueue("c", "c.wav")  # Running jobs count too
+    jobs.complete(job, "w")
+    jobs.enqueue("c", "c.wav")
+    assert jobs.stats()[JOB_QUEUED] == 2
+
+def test_failures_back_off_and_give_up(tmp_path):
+    jobs = make_queue(tmp_path, max_attempts=2, backoff_base=0.05)
+    jobs.enqueue("a", "a.wav")
+    job = jobs.claim("w")
+    assert jobs.fail(job, "w", "decode error")
+    assert jobs.claim("w") is None  # Backing off
+    time.sleep(0.06)
+    job = jobs.claim("w")
+    assert job.attempts == 2
+    assert not jobs.fail(job, "w", "decode error")
+    assert jobs.get(job.id).status == JOB_FAILED
+
+    jobs.retry(job.id)
+    assert jobs.get(job.id).status == JOB_QUEUED
+
+def test_expired_leases_are_reclaimed_with_checkpoints(tmp_path):
+    jobs = make_queue(tmp_path, lease_seconds=0.05)
+    jobs.enqueue("a", "a.wav")
+    job = jobs.claim("crashed")
+    jobs.checkpoint(job, "crashed", "transcribe", {"text": "hello"})
+    assert jobs.claim("other") is None  # Still leased
+
+    time.sleep(0.06)
+    resumed = jobs.claim("other")
+    assert resumed.id == job.id and resumed.checkpoints == {"transcribe": {"text": "hello"}}
+    with pytest.raises(LeaseLost):
+        jobs.complete(job, "crashed")
+    assert not jobs.heartbeat(job, "crashed") and jobs.heartbeat(resumed, "other")
+
+    # Completing inside the storing transaction: a failure rolls both back
+    with pytest.raises(RuntimeError):
+        with jobs.connections.transaction():
+            jobs.complete(resumed, "other")
+            raise RuntimeError
+    assert jobs.get(job.id).status != JOB_DONE
+    jobs.complete(resumed, "other")
+    assert jobs.get(job.id).status == JOB_DONE
+
+def claim_all(db_path, owner, results):
+    jobs = JobQueue(TranscriptDatabase(db_path))
+    while (job := jobs.claim(owner)) is not None:
+        results.put(job.id)
+        jobs.complete(job, owner)
+
+def test_worker_processes_never_claim_the_same_job(tmp_path):
+    jobs = make_queue(tmp_path)
+    with jobs.connections.transaction():
+        ids = [jobs.enqueue(str(i), f"{i}.wav") for i in range(200)]
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=claim_all, args=(tmp_path / "transcripts.db", f"w{i}", results))
+               for i in range(4)]
+    for worker in workers:
+        worker.start()
+    claimed = [results.get(timeout=30) for _ in ids]
+    for worker in workers:
+        worker.join()
+    assert sorted(claimed) == ids
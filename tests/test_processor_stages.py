@@ -0,0 +1,67 @@
+# tests/test_processor_stages.py
+import logging
+import threading
+import pytest
+from src.audio import processor
+from src.audio.processor import AudioProcessor
+
+class FakeThreads:
+    """Stands in for torch's process-wide intra-op thread setting."""
+    def __init__(self, threads):
+        self.threads = threads
+        self.history = []
+
+    def get_num_threads(self):
+        return self.threads
+
+    def set_num_threads(self, threads):
+        self.history.append(threads)
+        self.threads = threads
+
+def make_processor(monkeypatch, concurrent_stages=True):
+    threads = FakeThreads(8)
+    monkeypatch.setattr(processor.torch, "get_num_threads", threads.get_num_threads)
+    monkeypatch.setattr(processor.torch, "set_num_threads", threads.set_num_threads)
+    audio_processor = AudioProcessor.__new__(AudioProcessor)
+    audio_processor.logger = logging.getLogger("test")
+    audio_processor.concurrent_stages = concurrent_stages
+    audio_processor.stage_threads = 3
+    return audio_processor, threads
+
+def test_stages_run_concurrently_and_restore_threads(monkeypatch):
+    audio_processor, threads = make_processor(monkeypatch)
+    # Each stage waits for the other, so this only finishes if they overlap
+    both_running = threading.Barrier(2, timeout=5)
+
+    def transcribe():
+        both_running.wait()
+        return {"text": "hello", "threads": threads.threads}
+
+    def diarize():
+        both_running.wait()
+        return ["segment"]
+
+    assert audio_processor._run_stages(transcribe, diarize) == ({"text": "hello", "threads": 3}, ["segment"])
+    assert threads.history == [3, 8]
+
+def test_failing_stage_propagates_and_restores_threads(monkeypatch):
+    audio_processor, threads = make_processor(monkeypatch)
+    finished = []
+
+    def diarize():
+        raise RuntimeError("diarization failed")
+
+    with pytest.raises(RuntimeError, match="diarization failed"):
+        audio_processor._run_stages(lambda: finished.append("transcribe") or {}, diarize)
+    # The other stage still completes before the error surfaces
+    assert finished == ["transcribe"]
+    assert threads.threads == 8
+
+def test_stages_run_in_order_when_not_concurrent(monkeypatch):
+    audio_processor, threads = make_processor(monkeypatch, concurrent_stages=False)
+    order = []
+    result = audio_processor._run_stages(
+        lambda: order.append("transcribe") or {"text": ""}, lambda: order.append("diarize") or [])
+    assert result == ({"text": ""}, [])
+    assert order == ["transcribe", "diarize"]
+    assert threads.history == []
@@ -0,0 +1,99 @@
+# tests/test_profile_matrix.py
+import numpy as np
+from src.audio.profiles import ProfileMatrix, SpeakerProfile
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+def make_profiles(rng, speakers=5, per_speaker=3, dim=16):
+    return {
+        f"speaker{i}": SpeakerProfile(
+            name=f"speaker{i}",
+            embeddings=[rng.normal(size=dim) for _ in range(per_speaker)],
+            audio_samples=[]
+        )
+        for i in range(speakers)
+    }
+
+def test_scores_match_mean_cosine_similarity():
+    rng = np.random.default_rng(0)
+    profiles = make_profiles(rng)
+    matrix = ProfileMatrix.from_profiles(profiles)
+    query = rng.normal(size=16)
+    scores = matrix.scores(query)[0]
+    for i, name in enumerate(matrix.names):
+        expected = np.mean([cosine(query, e) for e in profiles[name].embeddings])
+        assert np.isclose(scores[i], expected, atol=1e-5)
+
+def test_batch_match_and_threshold():
+    rng = np.random.default_rng(1)
+    profiles = make_profiles(rng, per_speaker=1)
+    matrix = ProfileMatrix.from_profiles(profiles)
+    queries = np.stack([profiles["speaker2"].embeddings[0], -profiles["speaker2"].embeddings[0]])
+    (name, score), (other, other_score) = matrix.match(queries, threshold=0.3)
+    assert name == "speaker2" and np.isclose(score, 1.0)
+    assert other is None and other_score == -1.0
+
+def test_other_embedding_spaces_are_skipped():
+    rng = np.random.default_rng(2)
+    profiles = make_profiles(rng, speakers=2)
+    profiles["speaker1"].embedding_space = "other-model"
+    matrix = ProfileMatrix.from_profiles(profiles, "pyannote/embedding")
+    assert matrix.names == ["speaker0"]
+
+def test_nan_and_empty():
+    empty = ProfileMatrix.from_profiles({})
+    assert empty.match(np.ones(4), 0.3) == [(None, 0.0)]
+    matrix = ProfileMatrix.from_profiles(make_profiles(np.random.default_rng(3)))
+    assert matrix.match(np.full(16, np.nan), 0.3) == [(None, 0.0)]
+
+def test_match_candidates_is_exact_on_shortlist():
+    rng = np.random.default_rng(4)
+    profiles = make_profiles(rng)
+    matrix = ProfileMatrix.from_profiles(profiles)
+    query = profiles["speaker3"].embeddings[0]
+    full = matrix.match(query, threshold=0.0)[0]
+    shortlisted = matrix.match_candidates(query[None], [[full[0], "speaker1"]], threshold=0.0)[0]
+    assert shortlisted[0] == full[0]
+    assert np.isclose(shortlisted[1], full[1], atol=1e-5)
+
+def test_match_candidates_with_interleaved_rows():
+    rng = np.random.default_rng(7)
+    # Rows in append order, as a profile store compiles them
+    row_speakers = np.array([0, 1, 2, 0, 2, 1, 0])
+    matrix = ProfileMatrix(["a", "b", "c"], row_speakers, rng.normal(size=(7, 16)))
+    queries = rng.normal(size=(4, 16))
+    scores = matrix.scores(queries)
+    for query, row in zip(queries, scores):
+        name, score = matrix.match_candidates(query[None], [["c", "a"]], threshold=-1.0)[0]
+        best = max((0, 2), key=lambda s: row[s])
+        assert name == matrix.names[best] and np.isclose(score, row[best], atol=1e-5)
+
+def test_centroid_scores_equal_mean_similarity():
+    rng = np.random.default_rng(5)
+    profiles = make_profiles(rng, per_speaker=4)
+    queries = rng.normal(size=(3, 16))
+    expected = ProfileMatrix.from_profiles(profiles).scores(queries)
+    centroids = ProfileMatrix.from_centroids(profiles)
+    assert len(centroids.row_speakers) == len(profiles)
+    assert np.allclose(centroids.scores(queries), expected, atol=1e-5)
+
+def test_observe_bounds_reservoir_and_tracks_mean():
+    rng = np.random.default_rng(6)
+    profile = SpeakerProfile(name="a", embeddings=[], audio_samples=[])
+    seen = [rng.normal(size=16) for _ in range(50)]
+    for i, embedding in enumerate(seen):
+        profile.observe(embedding, f"{i}.wav", reservoir_size=8, rng=rng)
+    assert len(profile.embeddings) == len(profile.audio_samples) == 8
+    assert profile.count == 50
+    expected = np.mean([e / np.linalg.norm(e) for e in seen], axis=0)
+    assert np.allclose(profile.centroid, expected, atol=1e-5)
+
+def test_adapt_moves_centroid_toward_embedding():
+    rng = np.random.default_rng(7)
+    profile = make_profiles(rng, speakers=1)["speaker0"]
+    target = rng.normal(size=16)
+    before = cosine(profile.mean_embedding(), target)
+    profile.adapt(target, rate=0.5)
+    assert cosine(profile.centroid, target) > before
+    assert profile.count == 3
@@ -0,0 +1,119 @@
+# tests/test_profile_store.py
+import pickle
+import numpy as np
+from src.audio.profile_store import ProfileStore
+from src.audio.profiles import ProfileMatrix, SpeakerProfile
+
+def test_append_and_reopen(tmp_path):
+    rng = np.random.default_rng(0)
+    store = ProfileStore(tmp_path / "store")
+    store.append(["alice", "bob"], rng.normal(size=(2, 8)), ["a.wav", "b.wav"])
+    store.append(["alice"], rng.normal(size=(1, 8)), ["a2.wav"])
+
+    reopened = ProfileStore(tmp_path / "store")
+    assert isinstance(reopened.embeddings, np.memmap)
+    assert len(reopened) == 3
+    assert np.allclose(np.linalg.norm(reopened.embeddings, axis=1), 1.0)
+    profiles = reopened.to_profiles()
+    assert profiles["alice"].audio_samples == ["a.wav", "a2.wav"]
+
+def test_readers_reload_appends_from_other_writers(tmp_path):
+    rng = np.random.default_rng(1)
+    reader = ProfileStore(tmp_path)
+    writer = ProfileStore(tmp_path)
+    assert not reader.refresh()
+    writer.append(["carol"], rng.normal(size=(1, 8)))
+    assert reader.refresh()
+    assert [r["name"] for r in reader.records] == ["carol"]
+
+def test_torn_write_is_discarded(tmp_path):
+    rng = np.random.default_rng(2)
+    store = ProfileStore(tmp_path)
+    store.append(["alice"], rng.normal(size=(1, 8)))
+    # Simulate a writer that crashed after writing data but before the manifest
+    with open(store.embeddings_path, "ab") as f:
+        f.write(b"\0" * 13)
+    with open(store.index_path, "a") as f:
+        f.write('{"name": "ghost"')
+    store.append(["bob"], rng.normal(size=(1, 8)))
+
+    reopened = ProfileStore(tmp_path)
+    assert [r["name"] for r in reopened.records] == ["alice", "bob"]
+    assert reopened.embeddings_path.stat().st_size == 2 * 8 * 4
+
+def test_matrix_matches_in_memory_profiles(tmp_path):
+    rng = np.random.default_rng(3)
+    profiles = {
+        f"speaker{i}": SpeakerProfile(f"speaker{i}", [rng.normal(size=8) for _ in range(2)], ["x.wav"] * 2)
+        for i in range(4)
+    }
+    store = ProfileStore(tmp_path)
+    store.import_profiles(profiles)
+    query = rng.normal(size=(3, 8))
+    expected = ProfileMatrix.from_profiles(profiles).scores(query)
+    assert np.allclose(store.profile_matrix(profiles["speaker0"].embedding_space).scores(query), expected, atol=1e-5)
+
+def test_import_keeps_embeddings_without_samples(tmp_path):
+    rng = np.random.default_rng(6)
+    profiles = {"alice": SpeakerProfile("alice", [rng.normal(size=8) for _ in range(3)], ["a.wav"])}
+    store = ProfileStore(tmp_path)
+    store.import_profiles(profiles)
+    assert len(store) == 3
+    assert [r["sample"] for r in store.records] == ["a.wav", "", ""]
+
+def test_legacy_pickle_is_migrated_once(tmp_path):
+    rng = np.random.default_rng(4)
+    legacy = tmp_path / "speaker_profiles.pkl"
+    with open(legacy, "wb") as f:
+        pickle.dump({"alice": SpeakerProfile("alice", [rng.normal(size=8)], ["a.wav"])}, f)
+    ProfileStore.open(tmp_path / "store", legacy_path=legacy)
+    store = ProfileStore.open(tmp_path / "store", legacy_path=legacy)
+    assert len(store) == 1
+
+def test_centroids_persist_and_fold_in_later_rows(tmp_path):
+    rng = np.random.default_rng(5)
+    store = ProfileStore(tmp_path)
+    store.append(["alice"] * 3, rng.normal(size=(3, 8)))
+    profiles = store.to_profiles(reservoir_size=2)
+    assert len(profiles["alice"].embeddings) == 2 and profiles["alice"].count == 3
+    assert np.allclose(profiles["alice"].centroid, store.embeddings.mean(axis=0), atol=1e-6)
+
+    before = profiles["alice"].centroid
+    profiles["alice"].adapt(rng.normal(size=8), rate=0.5)
+    store.merge_centroids({"alice": profiles["alice"].centroid - before}, "pyannote/embedding")
+    adapted = profiles["alice"].centroid
+    store.append(["alice"], rng.normal(size=(1, 8)))
+
+    reloaded = ProfileStore(tmp_path).to_profiles(reservoir_size=2)["alice"]
+    assert reloaded.count == 4
+    assert np.allclose(reloaded.centroid, (adapted * 3 + store.embeddings[3]) / 4, atol=1e-6)
+
+def test_centroid_merges_add_up_without_reloading_rows(tmp_path):
+    rng = np.random.default_rng(7)
+    first, second = ProfileStore(tmp_path), ProfileStore(tmp_path)
+    first.append(["alice", "bob"], rng.normal(size=(2, 8)))
+    second.refresh()
+    base = first.to_profiles(reservoir_size=2)["alice"].centroid
+    generation, records = second.generation, second.records
+
+    # Two processes adapt the same speaker; both changes survive
+    first.merge_centroids({"alice": np.full(8, 0.1, np.float32)}, "pyannote/embedding")
+    second.merge_centroids({"alice": np.full(8, 0.2, np.float32)}, "pyannote/embedding")
+    assert second.generation == generation and second.records is records
+    assert np.allclose(second.centroids["alice"]["centroid"], base + 0.3, atol=1e-6)
+
+    # Readers pick up the new centroids only
+    assert first.refresh() and first.generation == generation
+    profiles = first.to_profiles(reservoir_size=2)
+    profiles["alice"].centroid = base
+    first.update_centroids(profiles)
+    assert np.allclose(profiles["alice"].centroid, base + 0.3, atol=1e-6)
+    assert "bob" not in first.centroids
+
+def test_content_hashes_are_per_embedding_space(tmp_path):
+    rng = np.random.default_rng(6)
+    store = ProfileStore(tmp_path)
+    store.append(["alice", "bob"], rng.normal(size=(2, 8)), extra=[{"hash": "aa"}, {}])
+    store.append(["alice"], rng.normal(size=(1, 8)), embedding_space="other", extra=[{"hash": "bb"}])
+    assert store.content_hashes("pyannote/embedding") == {"aa"}
+    assert store.content_hashes("other") == {"bb"}
@@ -0,0 +1,61 @@
+# tests/test_relabel.py
+from datetime import datetime
+import json
+import numpy as np
+from src.audio.profile_store import ProfileStore
+from src.audio.relabel import relabel
+from src.audio.segments import SpeakerCluster
+from src.database.transcript_db import TranscriptDatabase, TranscriptEntry
+
+def segment(speaker, cluster, start, text, confidence=-1.0):
+    return {"speaker": speaker, "start": start, "end": start + 1.0, "text": text,
+            "confidence": confidence, "cluster": cluster}
+
+def test_relabel_rewrites_segments_and_transcript_files(tmp_path):
+    rng = np.random.default_rng(0)
+    alice, bob = rng.normal(size=(2, 32))
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    segments = [
+        segment("SPEAKER_00", "SPEAKER_00", 0.0, "Hello."),
+        segment("SPEAKER_01", "SPEAKER_01", 1.0, "Hi."),
+        segment("Carol", "SPEAKER_00", 2.0, "Identified on its own.", 0.8),
+    ]
+    transcript_id = db.add_transcript(TranscriptEntry("meeting.wav", datetime.now(), "", json.dumps(segments)))
+    db.add_speaker_clusters(transcript_id, [
+        SpeakerCluster("SPEAKER_00", embedding=alice, embedding_space="pyannote/embedding", turns=[(0.0, 1.0)]),
+        SpeakerCluster("SPEAKER_01", embedding=bob, embedding_space="pyannote/embedding", turns=[(1.0, 2.0)]),
+    ])
+
+    store = ProfileStore(tmp_path / "store")
+    store.append(["Alice"], alice[None, :])
+    out_dir = tmp_path / "transcripts"
+    out_dir.mkdir()
+
+    assert relabel(db, store.profile_matrix("pyannote/embedding"), transcripts_dir=out_dir) == 1
+    _, stored = db.get_speaker_segments([transcript_id])[transcript_id]
+    speakers = [s["speaker"] for s in json.loads(stored)]
+    assert speakers == ["Alice", "SPEAKER_01", "Carol"]
+    assert (out_dir / "meeting_transcript.txt").read_text().startswith("Alice (100.0%)")
+    assert [c.speaker for c in db.get_speaker_clusters()] == ["Alice", None]
+
+    # Nothing changes on a second run
+    assert relabel(db, store.profile_matrix("pyannote/embedding"), transcripts_dir=out_dir) == 0
+
+def test_relabel_rewrites_transcripts_in_subdirectories(tmp_path):
+    rng = np.random.default_rng(1)
+    alice = rng.normal(size=32)
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    segments = [segment("SPEAKER_00", "SPEAKER_00", 0.0, "Hello.")]
+    transcript_id = db.add_transcript(TranscriptEntry("urgent/call.wav", datetime.now(), "", json.dumps(segments)))
+    db.add_speaker_clusters(transcript_id, [
+        SpeakerCluster("SPEAKER_00", embedding=alice, embedding_space="pyannote/embedding", turns=[(0.0, 1.0)]),
+    ])
+    store = ProfileStore(tmp_path / "store")
+    store.append(["Alice"], alice[None, :])
+    out_dir = tmp_path / "transcripts"
+    (out_dir / "urgent").mkdir(parents=True)
+    (out_dir / "urgent" / "call_transcript.txt").write_text("SPEAKER_00: Hello.")
+
+    assert relabel(db, store.profile_matrix("pyannote/embedding"), transcripts_dir=out_dir) == 1
+    assert (out_dir / "urgent" / "call_transcript.txt").read_text().startswith("Alice")
+    assert not (out_dir / "call_transcript.txt").exists()
@@ -0,0 +1,82 @@
+# tests/test_scheduling.py
+from pathlib import Path
+import wave
+import numpy as np
+from src.audio.loader import probe_duration
+from src.database.job_queue import FIFO, JobQueue, format_latency_report
+from src.database.transcript_db import TranscriptDatabase
+from src.utils.scheduling import DEFAULT_PRIORITY_RULES, PriorityRule, priority_for
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(TranscriptDatabase(tmp_path / "transcripts.db"), **kwargs)
+
+def claim_order(jobs):
+    order = []
+    while (job := jobs.claim("w")) is not None:
+        order.append(job.content_hash)
+    return order
+
+def test_shortest_job_first_within_priority_class(tmp_path):
+    jobs = make_queue(tmp_path, aging=0.0)
+    jobs.enqueue("long", "long.wav", duration=3600)
+    jobs.enqueue("unknown", "unknown.mp3")  # Counts as the default duration
+    jobs.enqueue("short", "short.wav", duration=30)
+    jobs.enqueue("urgent", "urgent.wav", priority=1, duration=7200)
+    assert claim_order(jobs) == ["urgent", "short", "unknown", "long"]
+
+def test_fifo_policy_keeps_arrival_order(tmp_path):
+    jobs = make_queue(tmp_path, policy=FIFO)
+    jobs.enqueue("long", "long.wav", duration=3600)
+    jobs.enqueue("short", "short.wav", duration=30)
+    assert claim_order(jobs) == ["long", "short"]
+
+def test_waiting_jobs_age_ahead_of_newer_short_ones(tmp_path):
+    jobs = make_queue(tmp_path, aging=1.0)
+    jobs.enqueue("long", "long.wav", duration=3600)
+    jobs.enqueue("short", "short.wav", duration=30)
+    with jobs.connections.transaction() as conn:
+        # The long recording has been waiting for an hour
+        conn.execute("UPDATE jobs SET created_at = created_at - 3600 WHERE content_hash = 'long'")
+    assert claim_order(jobs) == ["long", "short"]
+
+def test_enqueue_keeps_known_duration(tmp_path):
+    jobs = make_queue(tmp_path)
+    job_id = jobs.enqueue("a", "a.wav", duration=12.5)
+    jobs.enqueue("a", "moved/a.wav")
+    assert jobs.get(job_id).duration == 12.5
+    assert jobs.known(["a", "b"]) == ["a"]
+
+def test_latency_report_by_duration_bucket(tmp_path):
+    jobs = make_queue(tmp_path)
+    for content_hash, duration in [("a", 30), ("b", 45), ("c", 1200), ("d", None)]:
+        jobs.enqueue(content_hash, f"{content_hash}.wav", duration=duration)
+    for _ in range(3):
+        jobs.complete(jobs.claim("w"), "w")
+    jobs.claim("w")  # Started, not finished
+
+    report = {row["bucket"]: row for row in jobs.latency_report()}
+    assert set(report) == {"0m-1m", "10m-60m", "unknown"}
+    assert report["0m-1m"]["count"] == 2 and report["0m-1m"]["turnaround_mean"] is not None
+    assert report["10m-60m"]["count"] == 1 and report["10m-60m"]["turnaround_mean"] is None
+    assert report["0m-1m"]["wait_p95"] >= report["0m-1m"]["wait_p50"] >= 0
+    assert "unknown" in format_latency_report(jobs.latency_report())
+
+def test_priority_rules_match_subdirectories_and_names():
+    root = Path("/data/audio")
+    rules = [PriorityRule("*_urgent.*", 5), *DEFAULT_PRIORITY_RULES]
+    assert priority_for(root / "urgent" / "call.wav", root, rules) == 10
+    assert priority_for(root / "urgent" / "2024" / "call.wav", root, rules) == 10
+    assert priority_for(root / "backlog" / "call_urgent.wav", root, rules) == 5
+    assert priority_for(root / "backlog" / "old.mp3", root, rules) == -10
+    assert priority_for(root / "call.wav", root, rules) == 0
+    assert priority_for(Path("/elsewhere/call_urgent.wav"), root, rules) == 5
+
+def test_probe_duration_reads_wav_header(tmp_path):
+    path = tmp_path / "tone.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(np.zeros(24000, np.int16).tobytes())
+    assert probe_duration(path) == 1.5
+    assert probe_duration(tmp_path / "missing.mp3") is None
@@ -0,0 +1,68 @@
+# tests/test_search.py
+from datetime import datetime
+import json
+import sqlite3
+from src.database.transcript_db import MIGRATIONS, TranscriptDatabase, TranscriptEntry
+
+def entry(file_name, *segments):
+    segments = [{"speaker": speaker, "start": float(i), "end": i + 1.0, "text": text}
+                for i, (speaker, text) in enumerate(segments)]
+    return TranscriptEntry(file_name, datetime.now(), " ".join(s["text"] for s in segments), json.dumps(segments))
+
+def test_search_ranks_and_maps_hits_to_segments(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    db.add_transcript(entry("standup.wav", ("Alice", "The budget review moved to Friday."), ("Bob", "Fine by me.")))
+    db.add_transcript(entry("planning.wav", ("Bob", "Budget, budget, budget: we are over budget.")))
+
+    assert [t.file_name for t in db.search_transcripts("budget")] == ["planning.wav", "standup.wav"]
+    assert [t.file_name for t in db.search_transcripts("reviews friday")] == ["standup.wav"]  # Stemmed, all words
+    assert db.search_transcripts("") == []
+
+    hits = db.search_segments("budget", speaker="Alice")
+    assert len(hits) == 1
+    assert (hits[0].file_name, hits[0].speaker, hits[0].start, hits[0].end) == ("standup.wav", "Alice", 0.0, 1.0)
+    assert "[budget]" in hits[0].snippet
+    assert db.search_segments('over" OR "x') == []  # Query syntax is treated as text
+
+def test_search_index_follows_updates_and_deletes(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    transcript_id = db.add_transcript(entry("a.wav", ("SPEAKER_00", "Ship the release.")))
+    segments = [{"speaker": "Alice", "start": 0.0, "end": 1.0, "text": "Ship the release."}]
+    db.update_speakers(transcript_id, json.dumps(segments), [])
+    assert [h.speaker for h in db.search_segments("release")] == ["Alice"]
+
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
+    assert db.search_segments("release") == [] and db.search_transcripts("release") == []
+
+def test_existing_databases_are_backfilled(tmp_path):
+    path = tmp_path / "transcripts.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE transcripts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, file_name TEXT NOT NULL, timestamp TEXT NOT NULL,
+                full_text TEXT NOT NULL, speaker_segments TEXT NOT NULL, summary TEXT)
+        """)
+        old = entry("old.wav", ("Carol", "Quarterly numbers look good."))
+        conn.execute("INSERT INTO transcripts VALUES (NULL, ?, ?, ?, ?, NULL)",
+                     (old.file_name, old.timestamp.isoformat(), old.full_text, old.speaker_segments))
+
+    db = TranscriptDatabase(path)
+    assert [h.speaker for h in db.search_segments("quarterly")] == ["Carol"]
+    assert [t.file_name for t in db.search_transcripts("numbers")] == ["old.wav"]
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        assert "turns" in {row[1] for row in conn.execute("PRAGMA table_info(speaker_clusters)")}
+
+def test_segments_table_supports_speaker_and_time_lookups(tmp_path):
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    first = db.add_transcript(entry("a.wav", ("Alice", "One."), ("Bob", "Two."), ("Alice", "Three.")))
+    db.add_transcript(entry("b.wav", ("alice", "Four.")))
+
+    assert [s.text for s in db.get_segments(speaker="ALICE")] == ["One.", "Three.", "Four."]
+    assert [s.text for s in db.get_segments(transcript_id=first, start=0.5, end=2.0)] == ["One.", "Two."]
+
+    with sqlite3.connect(db.db_path) as conn:
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM segments WHERE speaker = ?", ("Alice",)))
+    assert "idx_segments_speaker" in plan
@@ -0,0 +1,56 @@
+# tests/test_segments.py
+from src.audio.segments import SpeakerSegment, align_transcript
+
+def make_turns():
+    return [
+        SpeakerSegment(speaker="A", start=0.0, end=5.0),
+        SpeakerSegment(speaker="B", start=4.0, end=10.0),
+        SpeakerSegment(speaker="C", start=20.0, end=25.0),
+    ]
+
+def test_span_goes_to_max_overlap_only():
+    turns = make_turns()
+    aligned = align_transcript(turns, [{"text": " hello", "start": 3.5, "end": 9.0}])
+    assert [s.speaker for s in aligned] == ["B"]
+    assert aligned[0].text == " hello"
+
+def test_span_without_overlap_goes_to_nearest_turn():
+    aligned = align_transcript(make_turns(), [{"text": " later", "start": 18.0, "end": 19.0}])
+    assert [s.speaker for s in aligned] == ["C"]
+
+def test_split_words_across_speaker_change():
+    segment = {
+        "text": " one two three",
+        "start": 3.0,
+        "end": 7.0,
+        "words": [
+            {"word": " one", "start": 3.0, "end": 3.5},
+            {"word": " two", "start": 3.6, "end": 3.9},
+            {"word": " three", "start": 5.5, "end": 7.0},
+        ],
+    }
+    aligned = align_transcript(make_turns(), [segment], split_words=True)
+    assert [(s.speaker, s.text) for s in aligned] == [("A", "one two"), ("B", "three")]
+
+def test_no_turns():
+    assert align_transcript([], [{"text": "x", "start": 0.0, "end": 1.0}]) == []
+
+def test_zero_length_word_goes_to_the_turn_containing_it():
+    turns = [SpeakerSegment(speaker="A", start=0.0, end=10.0), SpeakerSegment(speaker="B", start=10.0, end=20.0)]
+    segment = {"text": " hi there", "start": 5.0, "end": 15.0, "words": [
+        {"word": " hi", "start": 5.0, "end": 5.0},
+        {"word": " there", "start": 15.0, "end": 15.0},
+    ]}
+    aligned = align_transcript(turns, [segment], split_words=True)
+    assert [(s.speaker, s.text) for s in aligned] == [("A", "hi"), ("B", "there")]
+
+def test_zero_length_word_with_a_single_turn():
+    turns = [SpeakerSegment(speaker="A", start=0.0, end=10.0)]
+    segment = {"text": " hi", "start": 5.0, "end": 5.0, "words": [{"word": " hi", "start": 5.0, "end": 5.0}]}
+    aligned = align_transcript(turns, [segment], split_words=True)
+    assert [(s.speaker, s.text) for s in aligned] == [("A", "hi")]
+
+def test_span_overlapping_only_a_zero_length_turn():
+    turns = [SpeakerSegment(speaker="A", start=5.0, end=5.0)]
+    aligned = align_transcript(turns, [{"text": " hi", "start": 4.0, "end": 6.0}])
+    assert [s.speaker for s in aligned] == ["A"]
@@ -0,0 +1,40 @@
+# tests/test_speaker_index.py
+import numpy as np
+from src.audio.speaker_index import SpeakerIndex
+
+def make_index(rng, speakers=50, per_speaker=20, dim=32):
+    centres = rng.normal(size=(speakers, dim))
+    vectors = centres.repeat(per_speaker, axis=0) + 0.3 * rng.normal(size=(speakers * per_speaker, dim))
+    index = SpeakerIndex(dim)
+    index.add(vectors, [f"s{i // per_speaker}" for i in range(len(vectors))])
+    index.train()
+    return index, centres
+
+def test_search_finds_own_speaker():
+    index, centres = make_index(np.random.default_rng(0))
+    assert [labels[0] for labels in index.candidate_labels(centres[:5], k=5)] == ["s0", "s1", "s2", "s3", "s4"]
+
+def test_incremental_add_is_searchable():
+    rng = np.random.default_rng(1)
+    index, _ = make_index(rng)
+    new = rng.normal(size=32)
+    index.search(new, k=1, nprobe=len(index.centroids))  # Caches every list before the insert
+    index.add(new, ["newcomer"])
+    assert index.candidate_labels(new, k=1) == [["newcomer"]]
+
+def test_batched_search_matches_brute_force_when_probing_every_list():
+    rng = np.random.default_rng(3)
+    index, _ = make_index(rng)
+    queries = rng.normal(size=(20, 32))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    for query, (rows, similarities) in zip(queries, index.search(queries, k=5, nprobe=len(index.centroids))):
+        exact = np.sort(index.vectors @ query)[::-1][:5]
+        assert np.allclose(similarities, exact, atol=1e-5)
+
+def test_save_and_load(tmp_path):
+    index, centres = make_index(np.random.default_rng(2))
+    path = tmp_path / "profiles.index.npz"
+    index.save(path)
+    loaded = SpeakerIndex.load(path)
+    assert len(loaded) == len(index) and loaded.is_trained
+    assert loaded.candidate_labels(centres[:3], k=3) == index.candidate_labels(centres[:3], k=3)
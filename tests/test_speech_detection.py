@@ -0,0 +1,32 @@
+# tests/test_speech_detection.py
+import numpy as np
+from src.audio.transcriber import AudioPreprocessor
+
+SR = 16000
+
+def tone(seconds, amplitude, rng):
+    return (amplitude * rng.normal(size=int(seconds * SR))).astype(np.float32)
+
+def test_speech_between_pauses_is_kept_and_silence_dropped():
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([tone(3, 0.001, rng), tone(2, 0.1, rng), tone(3, 0.001, rng), tone(2, 0.1, rng)])
+    speech_map = AudioPreprocessor.build_speech_map(audio, SR)
+    assert len(speech_map.regions) == 2
+    assert np.allclose(speech_map.regions, [[2.8, 5.2], [7.8, 10.0]], atol=0.05)
+
+def test_recording_without_quiet_frames_is_kept_whole():
+    rng = np.random.default_rng(1)
+    # Continuous speech at a steady level, and speech barely above a loud noise floor
+    for audio in (tone(10, 0.1, rng), tone(10, 0.05, rng) + np.tile(tone(0.5, 0.1, rng), 20)):
+        speech_map = AudioPreprocessor.build_speech_map(audio, SR)
+        assert speech_map.regions.tolist() == [[0.0, 10.0]]
+
+def test_too_little_speech_is_kept_whole():
+    rng = np.random.default_rng(2)
+    audio = np.concatenate([tone(60, 0.001, rng), tone(0.3, 0.1, rng), tone(60, 0.001, rng)])
+    assert AudioPreprocessor.build_speech_map(audio, SR).speech_ratio == 1.0
+    assert AudioPreprocessor.build_speech_map(audio, SR, min_speech_ratio=0.0).speech_ratio < 0.02
+
+def test_silent_recording_has_no_speech():
+    audio = np.zeros(SR * 5, dtype=np.float32)
+    assert AudioPreprocessor.build_speech_map(audio, SR).speech_duration == 0.0
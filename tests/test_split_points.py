@@ -0,0 +1,11 @@
+# tests/test_split_points.py
+import numpy as np
+from src.audio.transcriber import AudioPreprocessor
+
+def test_split_points_snap_to_silence():
+    sr = 16000
+    audio = np.random.default_rng(0).normal(0, 0.1, sr * 100).astype(np.float32)
+    audio[sr * 28:sr * 29] = 0
+    cuts = AudioPreprocessor.find_split_points(audio, sr, target_seconds=30, search_seconds=5)
+    assert cuts[0] == 0 and cuts[-1] == len(audio)
+    assert 28 * sr <= cuts[1] < 29 * sr
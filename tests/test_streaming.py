@@ -0,0 +1,67 @@
+# tests/test_streaming.py
+import io
+import logging
+import numpy as np
+from src.audio import loader, transcriber
+from src.audio.loader import stream_audio
+from src.audio.transcriber import WhisperTranscriber
+
+class FakeFfmpeg:
+    """Stands in for the ffmpeg decoder: serves fixed 16-bit PCM on stdout."""
+    def __init__(self, samples):
+        self.stdout = io.BytesIO(np.asarray(samples, dtype=np.int16).tobytes())
+        self.stderr = io.BytesIO()
+        self.returncode = 0
+
+    def wait(self):
+        return 0
+
+    def poll(self):
+        return 0
+
+class FakeWhisper:
+    """Returns canned segments (in window time) for each successive window."""
+    def __init__(self, windows):
+        self.windows = list(windows)
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        segments = [{"start": s, "end": e, "text": t, "words": [{"word": t, "start": s, "end": e}]}
+                    for s, e, t in self.windows.pop(0)]
+        return {"segments": segments, "language": "en"}
+
+def test_stream_audio_yields_overlapping_windows(tmp_path, monkeypatch):
+    path = tmp_path / "long.m4a"
+    path.write_bytes(b"")
+    samples = np.arange(100)
+    monkeypatch.setattr(loader.subprocess, "Popen", lambda *args, **kwargs: FakeFfmpeg(samples))
+
+    windows = list(stream_audio(path, window_seconds=4, overlap_seconds=1, sample_rate=10))
+    assert [offset for offset, _ in windows] == [0.0, 3.0, 6.0]
+    for offset, window in windows:
+        start = int(offset * 10)
+        assert np.allclose(window * 32768, samples[start:start + 40])
+
+def test_overlap_segments_belong_to_the_window_owning_their_midpoint(tmp_path, monkeypatch):
+    path = tmp_path / "long.wav"
+    path.write_bytes(b"")
+    # Windows of 10 s overlapping by 4 s: the second starts at 6 s and owns midpoints from 8 s
+    monkeypatch.setattr(transcriber, "stream_audio",
+                        lambda *args, **kwargs: iter([(0.0, np.zeros(10)), (6.0, np.zeros(10))]))
+    model = FakeWhisper([
+        [(0.0, 5.0, "a"), (5.0, 7.5, "b"), (7.5, 9.5, "c")],
+        [(0.0, 1.5, "b again"), (1.5, 3.5, "c again"), (3.5, 6.0, "d")],
+    ])
+    whisper = WhisperTranscriber.__new__(WhisperTranscriber)
+    whisper.logger = logging.getLogger(__name__)
+    whisper.model = model
+
+    result = whisper.transcribe_stream(path, preprocess=False, window_seconds=10, overlap_seconds=4)
+    assert [(s["start"], s["end"], s["text"]) for s in result["segments"]] == [
+        (0.0, 5.0, "a"), (5.0, 7.5, "b"), (7.5, 9.5, "c again"), (9.5, 12.0, "d")]
+    assert [s["id"] for s in result["segments"]] == [0, 1, 2, 3]
+    assert result["segments"][3]["words"] == [{"word": "d", "start": 9.5, "end": 12.0}]
+    assert result["text"] == "abc againd"
+    # The second window is prompted with the text kept before its cutoff, in the detected language
+    assert model.calls[1]["initial_prompt"] == "ab" and model.calls[1]["language"] == "en"
@@ -0,0 +1,90 @@
+# tests/test_unknown_speakers.py
+from datetime import datetime
+import numpy as np
+from src.audio.profile_store import ProfileStore
+from src.audio.segments import SpeakerCluster
+from src.audio.unknown_speakers import UnknownSpeakerLinker
+from src.database.transcript_db import TranscriptDatabase, TranscriptEntry
+
+def add_recording(db, clusters):
+    transcript_id = db.add_transcript(TranscriptEntry("a.wav", datetime.now(), "", "[]"))
+    db.add_speaker_clusters(transcript_id, clusters)
+    return transcript_id
+
+def unknown(label, vector):
+    return SpeakerCluster(label=label, embedding=vector, embedding_space="pyannote/embedding")
+
+def test_unknown_speakers_get_stable_ids_across_recordings(tmp_path):
+    rng = np.random.default_rng(0)
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    linker = UnknownSpeakerLinker(db)
+    alice, bob = rng.normal(size=(2, 64))
+    noisy = lambda v: v + 0.3 * rng.normal(size=64)
+
+    add_recording(db, [unknown("SPEAKER_00", noisy(alice)), unknown("SPEAKER_01", noisy(bob))])
+    add_recording(db, [
+        unknown("SPEAKER_00", noisy(bob)),
+        SpeakerCluster("SPEAKER_01", "Carol", 0.9, rng.normal(size=64), "pyannote/embedding")
+    ])
+    assert linker.run() == 3
+
+    # Later runs only link new clusters and reuse the existing IDs
+    add_recording(db, [unknown("SPEAKER_00", noisy(alice)), unknown("SPEAKER_01", noisy(alice))])
+    assert linker.run() == 2
+    ids = {}
+    for cluster in db.get_speaker_clusters(unknown_only=True):
+        ids.setdefault(cluster.transcript_id, []).append(cluster.global_id)
+    assert ids[1] == ["UNKNOWN_0001", "UNKNOWN_0002"]
+    assert ids[2] == ["UNKNOWN_0002"]
+    # Two clusters of one recording never share an ID
+    assert ids[3][0] == "UNKNOWN_0001" and ids[3][1] == "UNKNOWN_0003"
+
+def test_promote_enrolls_stored_embeddings(tmp_path):
+    rng = np.random.default_rng(1)
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    linker = UnknownSpeakerLinker(db)
+    alice = rng.normal(size=64)
+    add_recording(db, [unknown("SPEAKER_00", alice)])
+    add_recording(db, [unknown("SPEAKER_03", alice + 0.1 * rng.normal(size=64))])
+    linker.run()
+
+    store = ProfileStore(tmp_path / "store")
+    assert linker.promote("UNKNOWN_0001", "Alice", store) == 2
+    assert [r["name"] for r in store.records] == ["Alice", "Alice"]
+    assert not db.get_speaker_clusters(unknown_only=True)
+
+def test_later_runs_load_only_newly_linked_clusters(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    db = TranscriptDatabase(tmp_path / "transcripts.db")
+    linker = UnknownSpeakerLinker(db)
+    speakers = rng.normal(size=(3, 64))
+    for _ in range(4):
+        add_recording(db, [unknown(f"SPEAKER_0{i}", v + 0.2 * rng.normal(size=64)) for i, v in enumerate(speakers)])
+    assert linker.run() == 12
+    index, trained_size = linker._index, linker._index.trained_size
+
+    loaded = []
+    get_clusters = db.get_speaker_clusters
+    monkeypatch.setattr(db, "get_speaker_clusters", lambda *args, **kwargs: (
+        lambda found: loaded.extend(found) or found)(get_clusters(*args, **kwargs)))
+    assert linker.run() == 0
+    add_recording(db, [unknown("SPEAKER_00", speakers[0])])
+    assert linker.run() == 1
+    # Only the new pending cluster was read; the held index was extended, not rebuilt
+    assert len(loaded) == 1
+    assert linker._index is index and index.trained_size == trained_size
+
+    # Another process links a cluster: it is picked up by id
+    other = UnknownSpeakerLinker(db)
+    add_recording(db, [unknown("SPEAKER_00", speakers[1])])
+    assert other.run() == 1
+    add_recording(db, [unknown("SPEAKER_00", speakers[2])])
+    loaded.clear()
+    assert linker.run() == 1
+    assert len(loaded) == 2 and linker._size == 15
+
+    # Promotion removes clusters from the unknown pool, which forces a reload
+    linker.promote("UNKNOWN_0001", "Alice", ProfileStore(tmp_path / "store"))
+    add_recording(db, [unknown("SPEAKER_00", speakers[0])])
+    assert linker.run() == 1
+    assert "UNKNOWN_0001" not in linker._counts
@@ -0,0 +1,28 @@
+# tests/test_vad.py
+import numpy as np
+from src.audio.vad import SpeechMap
+
+def make_map():
+    regions = np.array([[2.0, 4.0], [10.0, 11.0]])
+    return SpeechMap(regions=regions, duration=20.0, sample_rate=10)
+
+def test_speech_ratio():
+    speech_map = make_map()
+    assert speech_map.speech_duration == 3.0
+    assert speech_map.speech_ratio == 0.15
+
+def test_compact_keeps_only_speech():
+    audio = np.arange(200, dtype=np.float32)
+    compact = make_map().compact(audio)
+    assert np.array_equal(compact, np.concatenate([audio[20:40], audio[100:110]]))
+
+def test_to_original_maps_across_seams():
+    speech_map = make_map()
+    assert np.allclose(speech_map.to_original([0.0, 1.5, 2.0, 2.5]), [2.0, 3.5, 10.0, 10.5])
+    assert np.isclose(speech_map.to_original(2.0, end=True), 4.0)
+
+def test_remap_transcription():
+    transcription = {"segments": [{"text": "hi", "start": 1.0, "end": 2.5}]}
+    make_map().remap_transcription(transcription)
+    assert transcription["segments"][0]["start"] == 3.0
+    assert transcription["segments"][0]["end"] == 10.5
@@ -0,0 +1,77 @@
+# tests/test_worker_pool.py
+import json
+import os
+import time
+from src.database.job_queue import JOB_DONE, JobQueue, worker_id
+from src.database.transcript_db import TranscriptDatabase
+from src.utils.threads import THREAD_ENV_VARS, available_cores, partition_cores
+from src.utils.worker_pool import WorkerPool
+
+def drain_jobs(index, stop, wake, db_path, results_dir):
+    """Worker target: complete jobs, recording who ran each and with what thread budget."""
+    from threadpoolctl import threadpool_info
+    jobs = JobQueue(TranscriptDatabase(db_path))
+    owner = worker_id()
+    budget = {
+        "env": os.environ["OMP_NUM_THREADS"],
+        "cores": sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None,
+        "blas": max([pool["num_threads"] for pool in threadpool_info()], default=None)
+    }
+    while not stop.is_set():
+        wake.clear()
+        job = jobs.claim(owner)
+        if job is None:
+            wake.wait(0.05)
+            continue
+        (results_dir / job.content_hash).write_text(json.dumps({"worker": index, **budget}))
+        jobs.complete(job, owner)
+
+def crash(index, stop, wake):
+    os._exit(3)
+
+def test_partition_cores_is_disjoint_and_even():
+    cores = available_cores()
+    parts = partition_cores(len(cores))
+    assert all(len(part) == 1 for part in parts)
+    assert sorted(core for part in parts for core in part) == cores
+    assert all(len(part) == 3 for part in partition_cores(2, threads_per_worker=3))
+
+def test_workers_share_the_queue_within_their_thread_budget(tmp_path):
+    saved_env = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    db_path = tmp_path / "transcripts.db"
+    jobs = JobQueue(TranscriptDatabase(db_path))
+    for i in range(12):
+        jobs.enqueue(f"h{i:02d}", f"{i}.wav")
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+
+    pool = WorkerPool(drain_jobs, args=(db_path, results_dir), workers=2, threads_per_worker=1)
+    pool.start()
+    pool.wake()
+    deadline = time.monotonic() + 60
+    while jobs.stats()[JOB_DONE] < 12 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.alive == 2
+    pool.stop(timeout=30)
+    assert pool.alive == 0
+
+    assert jobs.stats()[JOB_DONE] == 12 and jobs.throughput() > 0
+    records = [json.loads(path.read_text()) for path in results_dir.iterdir()]
+    assert len(records) == 12
+    for record in records:
+        assert record["env"] == "1" and record["blas"] in (1, None)
+    cores = {record["worker"]: record["cores"] for record in records}
+    if len(available_cores()) >= 2 and None not in cores.values():
+        # Each worker pinned to a core of its own
+        assert all(len(worker_cores) == 1 for worker_cores in cores.values())
+        assert len({tuple(worker_cores) for worker_cores in cores.values()}) == len(cores)
+    assert {name: os.environ.get(name) for name in THREAD_ENV_VARS} == saved_env
+
+def test_dead_workers_are_restarted(tmp_path):
+    pool = WorkerPool(crash, workers=1)
+    pool.start()
+    deadline = time.monotonic() + 30
+    while pool.alive and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.check() == 1 and pool.restarts == 1
+    pool.stop(timeout=30)